@@ -1,7 +1,6 @@
 import os
 import seaborn as sns
 import matplotlib.pyplot as plt
-import pickle 
 import matplotlib as mpl
 
 import warnings
@@ -12,15 +11,16 @@ sys.path.append('../../')
 
 from infrasim.optimise import *
 from infrasim.utils import *
+from infrasim.archive import results_archive
 
 mpl.rcParams['ytick.direction'] = 'out'
 mpl.rcParams['xtick.direction'] = 'out'
 mpl.rcParams['font.family']      = 'Arial'
 
 
-file = open('../../outputs/results/model_run_results.pkl','rb')
-results = pickle.load(file)
-file.close()
+# summer and winter days of COO
+archive = results_archive('../../outputs/results/archive/')
+results = {'COO' : archive.load('COO',tables=['results_edge_flows'],month=[6,12])}
 
 #----
 # preprocessing
@@ -40,7 +40,7 @@ for s in df[df.from_id.str.contains('storage')].from_id.unique():
     charge = outflow.copy()
     charge['value'] = outflow['value'] - inflow['value']
     charge['from_id'] = s
-    charge['scenario'] = df.scenario.unique()[0]
+    charge['scenario'] = 'COO'
     charge['commodity'] = df.commodity.unique()[0]
     df = df[~df.from_id.isin([s])].reset_index(drop=True)
     df = df.append(charge,ignore_index=True)
@@ -12,6 +12,8 @@ sys.path.append('../')
 
 from infrasim.optimise import *
 from infrasim.utils import *
+from infrasim.executor import *
+from infrasim.archive import results_archive
 
 
 # save
@@ -45,27 +47,25 @@ scenarios = {'BAS' : False,
              #'UTO' : True,
             }
 
-results = {}
-for s in scenarios:
-    start_time = time.time()
-    model_run = nextra(nodes,edges,flows,
-                       scenario=s,
-                       energy_objective=scenarios[s],
-                       timesteps=timesteps,
-                       super_source=super_source,
-                       super_sink=super_sink,
-                       curtailment=curtailment,
-                       #res_factor=99,
-                       #model_name='meow',
-                      )
-
-    model_run.build()
-    model_run.run(pprint=pprint)
-    try:
-        model_results = model_run.get_results()
-        # add scenarios to results
-        if s == 'BAU' and scenarios[s] == False:
-            s = 'BAS'
+if __name__ == '__main__':
+    # run scenarios in parallel (cores are split between workers and gurobi threads)
+    specs = make_scenario_specs(scenarios,
+                                timesteps=timesteps,
+                                super_source=super_source,
+                                super_sink=super_sink,
+                                curtailment=curtailment,
+                                #res_factor=99,
+                                #model_name='meow',
+                                )
+
+    batch = scenario_executor(nodes,edges,flows,specs).run()
+
+    # archive results of each scenario (read with results_archive(...).read/load)
+    archive = results_archive('../outputs/results/archive/')
+    results = {}
+    for s,model_results in batch.results.items():
+        archive.write(s,model_results,scenario=s)
+        # add scenarios to results (pickled for the notebooks reading model_run_results.pkl)
         model_results.results_capacities['scenario']       = s
         model_results.results_storages['scenario']         = s
         model_results.results_edge_flows['scenario']       = s
@@ -73,14 +73,12 @@ for s in scenarios:
         model_results.results_costs['scenario']            = s
         # append results
         results[s] = model_results
-        # get time
-        hours,minutes,seconds = time_elapsed(start_time)
-        print('> Completed: ' + s + ' in ' + '%dh:%dm:%ds' %(hours,minutes,seconds))
-    except:
-        #model_run.debug()
-        print('> FAILED! ' + s)
 
+    print(batch.timings.round(1).to_string(index=False))
+    hours,minutes,seconds = time_elapsed(time.time()-batch.wall_time)
+    print('> Batch completed in ' + '%dh:%dm:%ds' %(hours,minutes,seconds) + \
+          ' (%d workers x %d threads)' % (batch.workers,batch.threads))
 
-save_object(results, '../outputs/results/model_run_results.pkl')
+    save_object(results, '../outputs/results/model_run_results.pkl')
 
-print('> Done.')
\ No newline at end of file
+    print('> Done.')
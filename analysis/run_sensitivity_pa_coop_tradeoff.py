@@ -13,6 +13,7 @@ sys.path.append('../')
 
 from infrasim.optimise import *
 from infrasim.utils import *
+from infrasim.sweep import parameter_sweep
 
 
 def merge_capacity_data(results_dict):
@@ -42,31 +43,30 @@ infrasim_init_directories()
 
 ss_factors = [i/100 for i in np.arange(0,101,10).tolist()]
 
+# build once and solve all self-sufficiency factors as scenarios of one model
+#   (falls back to warm-started solves in sequence if they cannot be scenarios)
+model_run = nextra(nodes,edges,flows,
+                   scenario='COO',
+                   energy_objective=True,
+                   timesteps=timesteps)
+model_run.build()
+
+sweep = parameter_sweep(model_run,'ss_factor',ss_factors).run(pprint=pprint)
+
 results = {}
 for s in ss_factors:
-    print(f'> Running self-sufficiency factor: {s}')
-    model_run = nextra(nodes,edges,flows,
-                       scenario='COO',
-                       energy_objective=True,
-                       timesteps=timesteps,
-                       self_sufficiency_factor=s)
-
-    model_run.build()
-    model_run.run(pprint=False)
-    try:
-        model_results = model_run.get_results()
-        # add scenarios to results
-        if s == 'BAU' and scenarios[s] == False:
-            s = 'BAS'
-        model_results.results_capacities['self_sufficiency_factor']       = s
-        model_results.results_storages['self_sufficiency_factor']         = s
-        model_results.results_edge_flows['self_sufficiency_factor']       = s
-        model_results.results_capacity_change['self_sufficiency_factor']  = s
-        model_results.results_costs['self_sufficiency_factor']            = s
-        # append results
-        results[ 'COO_' + str(s) ] = model_results
-    except:
+    if s not in sweep.results:
         print('> FAILED! ' + str(s))
+        continue
+    model_results = sweep.results[s]
+    # add scenarios to results
+    model_results.results_capacities['self_sufficiency_factor']       = s
+    model_results.results_storages['self_sufficiency_factor']         = s
+    model_results.results_edge_flows['self_sufficiency_factor']       = s
+    model_results.results_capacity_change['self_sufficiency_factor']  = s
+    model_results.results_costs['self_sufficiency_factor']            = s
+    # append results
+    results[ 'COO_' + str(s) ] = model_results
 
 capacities = merge_capacity_data(results)
 capacities = capacities.groupby(by=['territory','self_sufficiency_factor','node']).max().reset_index()
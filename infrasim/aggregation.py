@@ -0,0 +1,390 @@
+'''
+    aggregation.py
+
+        Representative periods for the NexTra model. Days (or weeks) of demand and
+        renewable profiles are clustered into a small number of representative
+        periods, the model is built over those periods only, and each period is
+        weighted by the number of periods it represents. Storage is linked between
+        periods through the level at the start of every original period, following
+        Kotzur et al. (2018), Time series aggregation for energy system design:
+        Modeling seasonal storage, Applied Energy 213.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import numpy as np
+import pandas as pd
+import gurobipy as gp
+
+# relative imports
+from .utils import *
+from .global_variables import *
+
+
+
+#---
+# Clustering
+#---
+
+def hierarchical_medoids(features,n_periods):
+    '''Return medoids of clusters from agglomerative (ward) clustering of features
+    '''
+    # scipy clustering is only loaded for representative periods
+    from scipy.cluster.hierarchy import linkage, fcluster
+    from scipy.spatial.distance import cdist
+    if len(features) <= n_periods:
+        return np.arange(len(features))
+    labels   = fcluster(linkage(features,method='ward'),n_periods,criterion='maxclust')
+    distance = cdist(features,features)
+    medoids  = []
+    for c in np.unique(labels):
+        members = np.flatnonzero(labels==c)
+        medoids.append(members[distance[np.ix_(members,members)].sum(axis=1).argmin()])
+    return np.sort(np.array(medoids))
+
+
+def kmedoids(features,n_periods,max_iter=100):
+    '''Return medoids of k-medoids clustering of features (initialised from hierarchical clustering)
+    '''
+    from scipy.spatial.distance import cdist
+    medoids  = hierarchical_medoids(features,n_periods)
+    distance = cdist(features,features)
+    for i in range(max_iter):
+        labels = distance[:,medoids].argmin(axis=1)
+        update = medoids.copy()
+        for c in range(len(medoids)):
+            members = np.flatnonzero(labels==c)
+            update[c] = members[distance[np.ix_(members,members)].sum(axis=1).argmin()]
+        update = np.sort(update)
+        if (update == medoids).all():
+            break
+        medoids = update
+    return medoids
+
+
+
+#---
+# Representative periods
+#---
+
+class representative_periods():
+
+
+    def __init__(self,flows,n_periods,period_length=24,method='hierarchical'):
+        '''
+
+        Parameters
+        ----------
+        flows : DataFrame
+            Flow data in tidy format (as read by read_flow_data).
+        n_periods : int
+            Number of representative periods in each year (incl. the first period
+            of the horizon in the first year).
+        period_length : int
+            Number of timesteps in a period (e.g. 24 for days, 168 for weeks).
+        method : str, 'hierarchical'/'kmedoids'
+            Clustering method.
+
+        Returns
+        -------
+        None.
+
+        '''
+        if method not in ['hierarchical','kmedoids']:
+            raise ValueError('method must be hierarchical or kmedoids')
+        self.n_periods      = n_periods
+        self.period_length  = period_length
+        self.method         = method
+
+        #---
+        # original periods (periods do not span years; the last period of a year may be shorter)
+        columns  = [c for c in ['timestep','date','hour','day','month','year'] if c in flows.columns]
+        self.ref = flows[columns].drop_duplicates(subset='timestep').sort_values(by='timestep').reset_index(drop=True)
+        position = self.ref.groupby('year').cumcount().to_numpy()
+        start    = (position % period_length == 0)
+        self.ref['period'] = np.cumsum(start) - 1
+        self.ref['step']   = position % period_length
+
+        periods           = self.ref.groupby('period')
+        self.period_year  = periods.year.first().to_numpy()
+        self.period_size  = periods.size().to_numpy()
+
+        #---
+        # profiles of each period, normalised by the maximum of each node
+        wide  = flows.pivot_table(index='timestep',columns='node',values='value',aggfunc='first')
+        self.nodes = wide.columns.to_list()
+        wide  = wide.reindex(index=self.ref.timestep).to_numpy(dtype=float)
+        scale = np.nanmax(np.abs(wide),axis=0)
+        scale[~(scale > 0)] = 1
+        wide  = np.nan_to_num(wide / scale)
+
+        n_nodes  = wide.shape[1]
+        features = np.zeros((len(self.period_size),period_length*n_nodes))
+        mask     = np.zeros((len(self.period_size),period_length*n_nodes),dtype=bool)
+        for p,rows in periods.indices.items():
+            features[p,:len(rows)*n_nodes] = wide[rows].ravel()
+            mask[p,:len(rows)*n_nodes]     = True
+
+        #---
+        # cluster full-length periods of each year and assign every period to its nearest medoid
+        #   the first period is kept as a representative period of its own, since storage
+        #   starts empty (as in the full model) and is filled up in the first period only
+        medoids    = [0]
+        assignment = np.zeros(len(self.period_size),dtype=np.int64)
+        for y in np.unique(self.period_year):
+            in_year = np.flatnonzero((self.period_year==y) & (np.arange(len(self.period_size))>0))
+            if len(in_year) == 0:
+                continue
+            full    = in_year[self.period_size[in_year]==period_length]
+            if len(full) == 0:
+                full = in_year[[self.period_size[in_year].argmax()]]
+            n = max(1,n_periods-1) if y == self.period_year[0] else n_periods
+            if n >= len(in_year):
+                # every period (incl. a shorter last period) is its own representative
+                chosen = in_year
+            elif method == 'hierarchical':
+                chosen = full[hierarchical_medoids(features[full],n)]
+            else:
+                chosen = full[kmedoids(features[full],n)]
+            for p in in_year:
+                d = (((features[chosen] - features[p]) * mask[p])**2).sum(axis=1)
+                d[chosen == p] = -1
+                assignment[p] = len(medoids) + d.argmin()
+            medoids.extend(chosen.tolist())
+
+        self.medoids    = np.array(medoids)
+        self.assignment = assignment
+        self.weights    = np.bincount(assignment,weights=self.period_size,minlength=len(medoids)) / \
+                            self.period_size[self.medoids]
+
+        #---
+        # timesteps of the aggregated model: representative periods in chronological
+        # order, numbered consecutively from 1
+        size   = self.period_size[self.medoids]
+        offset = np.r_[0,np.cumsum(size)[:-1]]
+        rep    = self.ref[self.ref.period.isin(self.medoids)].copy()
+        rep['representative'] = pd.Series(np.arange(len(self.medoids)),index=self.medoids).loc[rep.period].to_numpy()
+        rep['aggregated']     = offset[rep.representative] + rep.step + 1
+        self.timestep_map     = rep[['aggregated','timestep','representative']].reset_index(drop=True)
+        self.offset           = offset
+
+        # aggregated timestep representing each original timestep
+        self.ref['aggregated'] = offset[self.assignment[self.ref.period]] + self.ref.step + 1
+
+
+    def aggregate(self,flows):
+        '''Return flows of the representative periods, with timesteps numbered from 1
+            and the weight and representative period of each timestep
+        '''
+        mapping = self.timestep_map.set_index('timestep')
+        flows   = flows[flows.timestep.isin(mapping.index)].copy()
+        rep     = mapping.representative.loc[flows.timestep].to_numpy()
+        flows['timestep'] = mapping.aggregated.loc[flows.timestep].to_numpy()
+        flows['weight']   = self.weights[rep]
+        flows['period']   = rep
+        return flows.reset_index(drop=True)
+
+
+    def expand(self,results):
+        '''Return results of the aggregated model at every original timestep
+        '''
+        time_columns = [c for c in ['date','hour','day','month','year'] if c in results.columns]
+        expanded = results.drop(columns=time_columns).rename(columns={'timestep':'aggregated'})
+        expanded = expanded.merge(self.ref[['aggregated','timestep']+time_columns],on='aggregated')
+        columns  = [c for c in results.columns if c not in time_columns+['timestep']]
+        return expanded[columns+time_columns+['timestep']].sort_values(by='timestep',kind='stable').reset_index(drop=True)
+
+
+    def profile_error(self,flows):
+        '''Return error of the representative profiles against the original flows of each node
+        '''
+        original = flows.pivot_table(index='timestep',columns='node',values='value',aggfunc='first')
+        original = original.reindex(index=self.ref.timestep)
+        mapping  = self.timestep_map.set_index('aggregated').timestep
+        approx   = original.loc[mapping.loc[self.ref.aggregated].to_numpy()].to_numpy()
+        original = original.to_numpy()
+        error    = pd.DataFrame({'node'      : self.nodes,
+                                 'mean'      : original.mean(axis=0),
+                                 'mean_rep'  : approx.mean(axis=0),
+                                 'rmse'      : np.sqrt(((approx-original)**2).mean(axis=0))})
+        error['mean_error'] = (error.mean_rep - error['mean']) / error['mean'].where(error['mean'] != 0)
+        error['nrmse']      = error.rmse / np.abs(original).max(axis=0)
+        return error
+
+
+    def summary(self):
+        '''Return representative periods with their weights as a dataframe
+        '''
+        first = self.ref.drop_duplicates(subset='period').set_index('period')
+        columns = [c for c in ['date','day','month','year'] if c in first.columns]
+        summary = first.loc[self.medoids,columns].reset_index()
+        summary['weight'] = self.weights
+        return summary
+
+
+
+#---
+# Model components
+#---
+
+def link_storage_between_periods(self):
+    '''Add storage levels at the start of each original period and link them through
+        the change in storage over the representative period it is assigned to
+    '''
+    periods = self.representative_periods
+    storage_nodes = get_storage_nodes(self.nodes)
+    storage_caps  = storage_nodes.set_index(keys=['name','commodity']).to_dict()['capacity']
+    keys          = list(dict.fromkeys((n,k) for n,k,t in self.storage_volume if (n,k) in storage_caps))
+
+    n_original    = len(periods.assignment)
+    n_rep         = len(periods.medoids)
+    rep_of        = dict(zip(periods.timestep_map.aggregated,periods.timestep_map.representative))
+
+    #---
+    # storage at the start of each original period
+    self.storage_inter = self.model.addVars([(n,k,d) for n,k in keys for d in range(n_original)],
+                                            lb=0,name='storage_inter')
+    # highest and lowest volume (relative to the start) within each representative period
+    intra = [(n,k,r) for n,k in keys for r in range(n_rep)]
+    self.storage_intra_max = self.model.addVars(intra,lb=-gp.GRB.INFINITY,name='storage_intra_max')
+    self.storage_intra_min = self.model.addVars(intra,lb=-gp.GRB.INFINITY,name='storage_intra_min')
+
+    self.model.addConstrs(
+        (self.storage_intra_max[n,k,rep_of[t]] >= self.storage_volume[n,k,t] \
+            for n,k,t in self.storage_volume if (n,k) in storage_caps),'stor_intra_max')
+    self.model.addConstrs(
+        (self.storage_intra_min[n,k,rep_of[t]] <= self.storage_volume[n,k,t] \
+            for n,k,t in self.storage_volume if (n,k) in storage_caps),'stor_intra_min')
+
+    #---
+    # storage is empty at the start (as at t=1 in the full model)
+    self.model.addConstrs(
+        (self.storage_inter[n,k,0] == 0 for n,k in keys),'storage_inter_init')
+
+    # storage carried over from one period to the next
+    last = periods.offset[periods.assignment] + periods.period_size
+    self.model.addConstrs(
+        (self.storage_inter[n,k,d+1] == self.storage_inter[n,k,d] + self.storage_volume[n,k,last[d]] \
+            for n,k in keys for d in range(n_original-1)),'storage_inter_balance')
+
+    #---
+    # storage within capacity and above the minimum battery level in every original period
+    #   the minimum level applies after t=10 (as in the full model): to whole periods starting
+    #   after t=10, and at every timestep after t=10 of the periods starting before (e.g. the
+    #   first period, which is its own representative and starts empty)
+    first_timestep = periods.ref.groupby('period').timestep.first().to_numpy()
+    self.model.addConstrs(
+        (self.storage_inter[n,k,d] + self.storage_intra_max[n,k,periods.assignment[d]] \
+            <= self.annual_capacity.sum(n,k,periods.period_year[d]) \
+                for n,k in keys for d in range(n_original)),'stor_cap_max')
+    self.model.addConstrs(
+        (self.storage_inter[n,k,d] + self.storage_intra_min[n,k,periods.assignment[d]] >= 0 \
+            for n,k in keys for d in range(n_original)),'stor_cap_min')
+    self.model.addConstrs(
+        (self.storage_inter[n,k,d] + self.storage_intra_min[n,k,periods.assignment[d]] \
+            >= global_variables['battery_minimum_level'] * self.annual_capacity.sum(n,k,periods.period_year[d]) \
+                for n,k in keys for d in range(n_original) if first_timestep[d]>10),'bat_min_lev')
+    early = periods.ref[(periods.ref.timestep>10) & (first_timestep[periods.ref.period]<=10)]
+    self.model.addConstrs(
+        (self.storage_inter[n,k,d] + self.storage_volume[n,k,t] \
+            >= global_variables['battery_minimum_level'] * self.annual_capacity.sum(n,k,periods.period_year[d]) \
+                for n,k in keys for d,t in zip(early.period,early.aggregated)),'bat_min_lev_early')
+
+
+def weight_annual_constrs(self):
+    '''Weight flows in constraints summed over the year (i.e. curtailment, emissions and
+        energy targets) by the number of timesteps each representative timestep stands for
+    '''
+    self.model.update()
+    weight_of = dict(zip(self.time.timesteps,self.time.weight.tolist()))
+    index     = np.array([v.index for v in self.arcFlows.values()],dtype=np.int64)
+    timestep  = np.full(self.model.NumVars,-1,dtype=np.int64)
+    timestep[index] = [t for i,j,k,t in self.arcFlows.keys()]
+    weight    = np.ones(self.model.NumVars)
+    weight[index]   = [weight_of[t] for t in timestep[index]]
+
+    # constraints over the year are rows with flows in more than two timesteps
+    #   (rows of ramping and storage balances link two consecutive timesteps at most)
+    A       = self.model.getA().tocoo()
+    on_arc  = timestep[A.col] >= 0
+    pairs   = np.unique(np.c_[A.row[on_arc],timestep[A.col[on_arc]]],axis=0)
+    annual  = np.bincount(pairs[:,0],minlength=self.model.NumConstrs) > 2
+    select  = annual[A.row] & (weight[A.col] != 1)
+
+    constrs = self.model.getConstrs()
+    columns = self.model.getVars()
+    for r,c,coef in zip(A.row[select],A.col[select],A.data[select]):
+        self.model.chgCoeff(constrs[r],columns[c],coef * weight[c])
+
+    # keep weights when factors are updated in place
+    def weighted(expr):
+        terms = [(expr.getCoeff(n) * weight[expr.getVar(n).index],expr.getVar(n)) for n in range(expr.size())]
+        return gp.LinExpr(terms) + expr.getConstant()
+
+    for factor,constrs in self.factor_constrs.items():
+        self.factor_constrs[factor] = [(c,weighted(lhs),weighted(rhs)) for c,lhs,rhs in constrs]
+
+
+
+#---
+# Error report
+#---
+
+def compare_to_full_resolution(full,aggregated,periods,full_objective=None,aggregated_objective=None):
+    '''Compare results of a model built over representative periods against the full model
+
+    Parameters
+    ----------
+    full : nextra_postprocess
+        Results of the full resolution model.
+    aggregated : nextra_postprocess
+        Results of the representative period model.
+    periods : representative_periods
+        Representative periods of the aggregated model.
+    full_objective, aggregated_objective : float, optional
+        Objective values of both models.
+
+    Returns
+    -------
+    dict of DataFrames (objective, capacities, generation)
+
+    '''
+    def relative(a,b):
+        return (b - a) / a.where(a.abs() > 1e-9)
+
+    report = {}
+
+    #---
+    # objective
+    if full_objective is not None and aggregated_objective is not None:
+        report['objective'] = pd.DataFrame({'full'           : [full_objective],
+                                            'aggregated'     : [aggregated_objective]})
+        report['objective']['relative_error'] = relative(report['objective'].full,report['objective'].aggregated)
+
+    #---
+    # capacities in each year
+    capacities = []
+    for label,results in [('full',full),('aggregated',aggregated)]:
+        caps = results.results_capacities.merge(results.time.ref[['timestep','year']],on='timestep')
+        caps = caps.groupby(by=['node','technology','territory','year']).value.max()
+        capacities.append(caps.rename(label))
+    capacities = pd.concat(capacities,axis=1).reset_index()
+    capacities['error']          = capacities.aggregated - capacities.full
+    capacities['relative_error'] = relative(capacities.full,capacities.aggregated)
+    report['capacities'] = capacities
+
+    #---
+    # annual flow out of each node (aggregated flows expanded to every original timestep)
+    generation = []
+    for label,flows in [('full',full.results_edge_flows),('aggregated',periods.expand(aggregated.results_edge_flows))]:
+        generation.append(flows.groupby(by=['from_id','year']).value.sum().rename(label))
+    generation = pd.concat(generation,axis=1).reset_index()
+    generation['error']          = generation.aggregated - generation.full
+    generation['relative_error'] = relative(generation.full,generation.aggregated)
+    report['generation'] = generation
+
+    return report
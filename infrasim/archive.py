@@ -0,0 +1,275 @@
+'''
+    archive.py
+
+        Archive of results of NexTra runs as Parquet datasets. Each results table of
+        a run is stored as <path>/<table>/run=<run>/part-0.parquet, next to the nodes
+        of the run and a table of runs (run, scenario and any metadata). Tables are
+        read with only the columns asked for and filtered by run, scenario,
+        territory, node or month, so that only matching partitions and row groups
+        are read (e.g. one month of edge flows of one scenario). The archive is a
+        hive-partitioned dataset, also readable in R with arrow::open_dataset.
+        pyarrow is imported when the archive is read or written, so that scripts
+        importing results_archive run (up to using it) without pyarrow.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# relative imports
+from .postprocess import nextra_postprocess
+
+# tables of nextra_postprocess written by default
+RESULTS_TABLES = ['results_edge_flows',
+                  'results_storages',
+                  'results_capacities',
+                  'results_capacity_change',
+                  'results_annual_energy',
+                  'results_costs',
+                  'results_marginal_prices',
+                  'results_shadow_prices']
+
+# node attributes kept with each run (to map technology and territory)
+NODE_COLUMNS = ['name','type','subtype','territory','capacity']
+
+# rows per row group (the unit skipped by filters on column statistics)
+ROW_GROUP_SIZE = 2**16
+
+
+
+#---
+# Functions
+#---
+
+def import_pyarrow():
+    '''Return pyarrow modules (pa, ds, pq, fs) used by the archive
+    '''
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+        from pyarrow import fs
+    except ImportError as error:
+        raise ImportError('results_archive requires pyarrow (see environment.yml)') from error
+    return pa,ds,pq,fs
+
+
+def get_partitioning():
+    '''Return hive partitioning by run id (read as a string, e.g. run=2030)
+    '''
+    pa,ds,pq,fs = import_pyarrow()
+    return ds.partitioning(pa.schema([('run',pa.string())]),flavor='hive')
+
+
+def sort_for_filters(df):
+    '''Return table sorted by month, then node (if any), so that row groups cover few
+        months and nodes and are skipped by filters on their statistics
+    '''
+    columns = [c for c in ['month','day','hour','node','from_id'] if c in df.columns]
+    if not columns or df.empty:
+        return df
+    return df.sort_values(by=columns,kind='stable').reset_index(drop=True)
+
+
+def as_list(value):
+    '''Return filter value as a list
+    '''
+    if isinstance(value,(list,tuple,set,np.ndarray,pd.Series,pd.Index)):
+        return list(value)
+    return [value]
+
+
+
+#---
+# Archive class
+#---
+
+class results_archive():
+
+
+    def __init__(self,path='../outputs/results/archive/'):
+        '''
+
+        Parameters
+        ----------
+        path : str
+            Directory of the archive (created on first write).
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.path = path
+
+
+    def get_runs(self):
+        '''Return table of runs in the archive (run, scenario and metadata)
+        '''
+        path = os.path.join(self.path,'runs.parquet')
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=['run','scenario'])
+        pa,ds,pq,fs = import_pyarrow()
+        return pq.read_table(path).to_pandas()
+
+
+    def get_tables(self):
+        '''Return names of tables in the archive
+        '''
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(t for t in os.listdir(self.path) if os.path.isdir(os.path.join(self.path,t)))
+
+
+    def write_table(self,table,run,df):
+        '''Write a table of a run, replacing it if it is already archived
+        '''
+        pa,ds,pq,fs = import_pyarrow()
+        directory = os.path.join(self.path,table,'run=' + str(run))
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        df = sort_for_filters(df.drop(columns=[c for c in ['run','geometry'] if c in df.columns]))
+        pq.write_table(pa.Table.from_pandas(df,preserve_index=False),
+                       os.path.join(directory,'part-0.parquet'),
+                       row_group_size=ROW_GROUP_SIZE)
+
+
+    def write(self,run,results,tables=None,**metadata):
+        '''Write results of a run (a nextra_postprocess object) to the archive
+
+        Parameters
+        ----------
+        run : str
+            Id of the run (e.g. the scenario, or COO_0.3 for a point of a sweep).
+        results : nextra_postprocess
+            Results of the run.
+        tables : list, optional
+            Tables to write (default: RESULTS_TABLES).
+        metadata :
+            Attributes of the run kept in the table of runs (e.g. scenario='COO',
+            ss_factor=0.3). The scenario defaults to the run id.
+
+        Returns
+        -------
+        self
+
+        '''
+        run = str(run)
+        for table in tables or RESULTS_TABLES:
+            df = getattr(results,table,None)
+            if df is not None:
+                self.write_table(table,run,df)
+        self.write_table('nodes',run,results.nodes[[c for c in NODE_COLUMNS if c in results.nodes.columns]])
+        # table of runs
+        runs = self.get_runs()
+        runs = runs[runs.run != run]
+        metadata.setdefault('scenario',run)
+        runs = pd.concat([runs,pd.DataFrame([dict(run=run,**metadata)])],ignore_index=True)
+        pa,ds,pq,fs = import_pyarrow()
+        pq.write_table(pa.Table.from_pandas(runs,preserve_index=False),os.path.join(self.path,'runs.parquet'))
+        return self
+
+
+    def get_dataset(self,table,memory_map=True):
+        '''Return a table of the archive as a pyarrow dataset
+        '''
+        path = os.path.join(self.path,table)
+        if not os.path.isdir(path):
+            raise ValueError('No table ' + table + ' in archive ' + self.path)
+        pa,ds,pq,fs = import_pyarrow()
+        return ds.dataset(path,format='parquet',partitioning=get_partitioning(),
+                          filesystem=fs.LocalFileSystem(use_mmap=memory_map))
+
+
+    def get_filter(self,dataset,strict=True,**filters):
+        '''Return filter expression over a dataset from {column : value(s)}. Besides
+            columns of the table: scenario (runs of the scenario), node (node, from_id
+            or to_id) and territory (nodes of the territory, if not a column). Filters
+            that do not apply to the table raise an error, or are ignored if not strict.
+        '''
+        pa,ds,pq,fs = import_pyarrow()
+        columns = dataset.schema.names
+        if not strict:
+            node_columns = any(c in columns for c in ['node','from_id','to_id','name'])
+            filters = {k : v for k,v in filters.items() \
+                        if k in columns or k == 'scenario' or (k in ['node','territory'] and node_columns)}
+        expression = None
+        def add(e):
+            return e if expression is None else expression & e
+        for key,value in filters.items():
+            if value is None:
+                continue
+            values = as_list(value)
+            if key == 'scenario' and key not in columns:
+                runs = self.get_runs()
+                expression = add(ds.field('run').isin(runs.run[runs.scenario.isin(values)].tolist()))
+            elif key == 'territory' and key not in columns:
+                nodes = self.read('nodes',columns=['name'],territory=values,run=filters.get('run',None))
+                expression = add(self.get_node_filter(columns,nodes.name.unique().tolist()))
+            elif key == 'node' and key not in columns:
+                expression = add(self.get_node_filter(columns,values))
+            elif key in columns:
+                values = [str(v) for v in values] if key == 'run' else values
+                expression = add(ds.field(key).isin(values))
+            else:
+                raise ValueError('Cannot filter ' + key + ': not a column of the table')
+        return expression
+
+
+    def get_node_filter(self,columns,nodes):
+        '''Return filter expression on node columns of a table (node, from_id or to_id)
+        '''
+        node_columns = [c for c in ['node','from_id','to_id','name'] if c in columns]
+        if not node_columns:
+            raise ValueError('Cannot filter by node: no node columns in the table')
+        pa,ds,pq,fs = import_pyarrow()
+        expression = ds.field(node_columns[0]).isin(nodes)
+        for c in node_columns[1:]:
+            expression = expression | ds.field(c).isin(nodes)
+        return expression
+
+
+    def read(self,table,columns=None,memory_map=True,strict=True,**filters):
+        '''Read a table of the archive as a dataframe
+
+        Parameters
+        ----------
+        table : str
+            Name of the table (e.g. results_edge_flows).
+        columns : list, optional
+            Columns to read (default: all, including run).
+        memory_map : bool, optional
+            Memory-map files rather than reading them into buffers (default: True).
+        strict : bool, optional
+            Raise an error for filters that do not apply to the table (default: True)
+            or ignore them.
+        filters :
+            Values (or lists of values) of columns to keep, e.g. month=[6,12], and
+            run, scenario, node or territory.
+
+        Returns
+        -------
+        DataFrame
+
+        '''
+        dataset = self.get_dataset(table,memory_map)
+        return dataset.to_table(columns=columns,filter=self.get_filter(dataset,strict,**filters)).to_pandas()
+
+
+    def load(self,run,tables=None,**filters):
+        '''Return results of a run as a nextra_postprocess object with the given tables
+            (filtered by filters that apply to each), e.g. to use its plotting methods
+        '''
+        tables = tables or [t for t in RESULTS_TABLES if t in self.get_tables()]
+        nodes  = self.read('nodes',run=run).drop(columns='run')
+        return nextra_postprocess.from_tables(nodes,**{t : self.read(t,strict=False,run=run,**filters).drop(columns='run') \
+                                                            for t in tables})
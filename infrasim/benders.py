@@ -0,0 +1,597 @@
+'''
+    benders.py
+
+        Benders decomposition of a built NexTra model. Timesteps are split into
+        blocks (months, representative periods or chunks of timesteps), each block
+        becomes a dispatch subproblem and the remaining variables (capacities,
+        storage linking) form the master problem. Annual energy of arcs (see
+        energy.py) is replaced by the flows it is linked to, so that rows spanning
+        several blocks, i.e. RES targets, emission_reduction, max_curtail and
+        storage/ramping rows at block boundaries, are split into one part per
+        block whose value is a master variable: the part of each block of an
+        inequality is bounded by its value (an allocation of the rhs to blocks),
+        that of an equality is fixed at it. Subproblems are solved at the master
+        values in parallel worker processes: a feasible subproblem returns an
+        optimality cut, an infeasible one a feasibility cut (from the duals of its
+        minimum infeasibility, i.e. total slack between the master values it takes
+        and values it can meet). The lower bound of the master is valid at every
+        iteration and the upper bound is only updated at master values that all
+        subproblems meet, so that a converged run is optimal.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import time
+import warnings
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import gurobipy as gp
+
+# relative imports
+from .utils import get_thread_budget
+
+
+
+#---
+# Decomposition
+#---
+
+def get_column_timesteps(model_run):
+    '''Return timestep of each model variable (-1 for variables that are not time-indexed)
+    '''
+    col_time = np.full(model_run.model.NumVars,-1,dtype=np.int64)
+    for variables,position in [(model_run.arcFlows,3),(model_run.storage_volume,2)]:
+        keys = list(variables.keys())
+        col_time[[variables[k].index for k in keys]] = [k[position] for k in keys]
+    return col_time
+
+
+def get_timestep_blocks(model_run,blocks='month'):
+    '''Return block of each timestep as an array indexed by timestep value
+
+    Parameters
+    ----------
+    blocks : str or int
+        'month', 'period' (representative periods) or a number of consecutive timesteps.
+
+    '''
+    time_index = model_run.time
+    if blocks == 'month':
+        block = time_index.month
+    elif blocks == 'period':
+        if model_run.representative_periods is None:
+            raise ValueError("blocks='period' requires a model run with representative periods")
+        block = model_run.flows.drop_duplicates(subset='timestep').period.to_numpy()
+    elif isinstance(blocks,int):
+        block = np.arange(len(time_index.timestep)) // blocks
+    else:
+        raise ValueError('blocks must be month, period or an int')
+    # renumber blocks 0..n-1
+    block = np.unique(block,return_inverse=True)[1]
+    block_of = np.full(time_index.timestep.max()+1,-1,dtype=np.int64)
+    block_of[time_index.timestep] = block
+    return block_of
+
+
+def get_column_blocks(model_run,blocks='month'):
+    '''Return block of each model variable (-1 for master variables)
+
+    Parameters
+    ----------
+    blocks : str, int or array
+        'month', 'period', a number of consecutive timesteps (time-indexed variables
+        by block of timesteps) or the block of each variable (e.g. by component of
+        the network, see components.py).
+
+    '''
+    if isinstance(blocks,np.ndarray):
+        if len(blocks) != model_run.model.NumVars:
+            raise ValueError('blocks must have one entry per model variable')
+        return blocks.astype(np.int64)
+    col_time = get_column_timesteps(model_run)
+    block_of = get_timestep_blocks(model_run,blocks)
+    return np.where(col_time >= 0,block_of[np.maximum(col_time,0)],-1)
+
+
+def eliminate_annual_energy(model_run,A,obj,constraints):
+    '''Replace annual energy accumulators (see energy.py) by the flows they are linked
+        to: returns A and obj with the accumulators replaced, rows other than their
+        links, columns of the accumulators and the matrix of their flows (accumulators
+        = matrix @ variables)
+    '''
+    energy = list(getattr(model_run,'annual_energy',{}).values())
+    if not energy:
+        return A,obj,np.arange(A.shape[0]),np.zeros(0,dtype=np.int64),None
+    cols  = np.array([v.index for v in energy],dtype=np.int64)
+    names = model_run.model.getAttr('ConstrName',constraints)
+    link  = {name : r for r,name in enumerate(names) if name.startswith('annual_energy')}
+    rows  = np.array([link[v.VarName] for v in energy],dtype=np.int64)
+    # links: coef x annual_energy + (-1) x flows = 0
+    keep_cols = np.ones(A.shape[1])
+    keep_cols[cols] = 0
+    keep_cols = sp.diags(keep_cols)
+    A_link = A[rows]
+    coef   = np.asarray(A_link[np.arange(len(rows)),cols]).ravel()
+    flows  = (-sp.diags(1 / coef) @ A_link @ keep_cols).tocsr()
+    rest   = np.setdiff1d(np.arange(A.shape[0]),rows)
+    A_rest = A[rest]
+    A      = (A_rest @ keep_cols + A_rest[:,cols] @ flows).tocsr()
+    obj    = obj * keep_cols.diagonal() + flows.T @ obj[cols]
+    return A,obj,rest,cols,flows
+
+
+def decompose(A,col_block,n_blocks):
+    '''Classify rows of A by the blocks of their columns
+
+    Returns
+    -------
+    (master rows, block rows as {s : rows}, split rows, (row,block) pairs of split rows)
+
+    '''
+    coo   = A.tocoo()
+    rows,blocks = coo.row,col_block[coo.col]
+    keep  = blocks >= 0
+    pairs = np.unique(np.stack([rows[keep],blocks[keep]],axis=1),axis=0) if keep.any() \
+                else np.zeros((0,2),dtype=np.int64)
+    n_row_blocks = np.bincount(pairs[:,0],minlength=A.shape[0])
+    owner = np.full(A.shape[0],-1,dtype=np.int64)
+    owner[pairs[:,0]] = pairs[:,1]
+    master_rows = np.flatnonzero(n_row_blocks == 0)
+    block_rows  = {s : np.flatnonzero((n_row_blocks == 1) & (owner == s)) for s in range(n_blocks)}
+    split_rows  = np.flatnonzero(n_row_blocks > 1)
+    split_pairs = pairs[np.isin(pairs[:,0],split_rows)]
+    return master_rows,block_rows,split_rows,split_pairs
+
+
+
+def get_gap(lower_bound,upper_bound):
+    '''Return the gap between bounds relative to the upper bound (infinite without bounds)
+    '''
+    if not np.isfinite(upper_bound) or not np.isfinite(lower_bound):
+        return np.inf
+    return (upper_bound - lower_bound) / max(abs(upper_bound),1e-9)
+
+
+
+#---
+# Subproblem
+#---
+
+class benders_subproblem():
+
+
+    def __init__(self,data,solver_params={}):
+        '''Build a dispatch subproblem from its matrix data
+
+        Parameters
+        ----------
+        data : dict
+            A (rows x [block columns, linked columns]), sense, rhs, lb, ub and obj of
+            block columns and the number of linked (master) columns.
+
+        '''
+        n_cols,n_linked = len(data['obj']),data['n_linked']
+        self.obj   = data['obj']
+        self.model = gp.Model()
+        self.model.setParam('OutputFlag',0)
+        # infeasible and unbounded subproblems are told apart
+        self.model.setParam('DualReductions',0)
+        for param,value in solver_params.items():
+            self.model.setParam(param,value)
+        self.x      = self.model.addMVar(n_cols,lb=data['lb'],ub=data['ub'],obj=data['obj'])
+        self.linked = self.model.addMVar(n_linked,lb=-gp.GRB.INFINITY)
+        # slack between linked columns and master values (fixed at zero but in phase one)
+        self.slack  = self.model.addMVar(2*n_linked,lb=0,ub=0)
+        self.model.addMConstr(data['A'],gp.MVar.fromlist(self.x.tolist()+self.linked.tolist()),
+                              data['sense'],data['rhs'])
+        # linked columns take master values
+        self.copy = self.model.addConstr(self.linked - self.slack[:n_linked] + self.slack[n_linked:] == np.zeros(n_linked))
+
+
+    def solve(self,values,solution=False):
+        '''Solve at master values, returning (feasible, objective, duals of master values, x).
+            If the subproblem is infeasible, the objective is its minimum infeasibility
+            (see solve_infeasibility) and x is None.
+        '''
+        self.copy.RHS = values
+        self.model.optimize()
+        if self.model.Status == gp.GRB.INFEASIBLE:
+            return self.solve_infeasibility()
+        if self.model.Status != gp.GRB.OPTIMAL:
+            raise ValueError('Subproblem not solved to optimality (status %d)' % self.model.Status)
+        return (True,
+                self.model.ObjVal,
+                np.asarray(self.copy.Pi),
+                self.x.X if solution else None)
+
+
+    def solve_infeasibility(self):
+        '''Phase one: minimise total slack between linked columns and master values,
+            returning (False, minimum slack, duals of master values, None)
+        '''
+        self.x.Obj     = np.zeros(len(self.obj))
+        self.slack.UB  = np.full(self.slack.shape[0],gp.GRB.INFINITY)
+        self.slack.Obj = np.ones(self.slack.shape[0])
+        try:
+            self.model.optimize()
+            if self.model.Status != gp.GRB.OPTIMAL:
+                raise ValueError('Subproblem infeasible at any master values (status %d)' % self.model.Status)
+            output = (False,self.model.ObjVal,np.asarray(self.copy.Pi),None)
+        finally:
+            self.x.Obj     = self.obj
+            self.slack.UB  = np.zeros(self.slack.shape[0])
+            self.slack.Obj = np.zeros(self.slack.shape[0])
+        return output
+
+
+def run_subproblem_worker(connection,data,solver_params):
+    '''Build subproblems and solve them at the master values received on connection
+    '''
+    subproblems = {s : benders_subproblem(d,solver_params) for s,d in data.items()}
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        values,solution = message
+        connection.send({s : subproblems[s].solve(values[s],solution) for s in subproblems})
+    connection.close()
+
+
+
+#---
+# Benders class
+#---
+
+class benders_decomposition():
+
+
+    def __init__(self,model_run,blocks='month',**kwargs):
+        '''
+
+        Parameters
+        ----------
+        model_run : nextra
+            Built (not necessarily solved) model run.
+        blocks : str, int or array
+            Subproblems by 'month', by representative 'period', by chunks of a
+            number of timesteps or by a given block of each variable (default: 'month').
+        workers : int, optional
+            Number of worker processes solving subproblems (default: 1, i.e. in this
+            process; on the runs measured, workers were slower than solving serially
+            since subproblems are small next to the cost of passing them values).
+        threads : int, optional
+            Gurobi threads per worker (default: cores // workers).
+        tolerance : float, optional
+            Relative gap between upper and lower bound at which to stop (default: 1e-4).
+        max_iterations : int, optional
+            Maximum number of master iterations (default: 50 per block, at least
+            200). A run that stops at the limit has status ITERATION_LIMIT, no
+            objective and raises a warning.
+        level : float, optional
+            Level stabilisation: fraction of the gap above the lower bound at which
+            master values are projected from the incumbent (default: 0.5; 0 for
+            plain Benders).
+        start_level : float, optional
+            Level stabilisation until an upper bound is found: fraction of the
+            lower bound above it at which master values are projected from the
+            previous ones (default: 0.01; 0 for plain Benders).
+        solver_params : dict, optional
+            Gurobi parameters set on master and subproblems.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.model_run      = model_run
+        self.tolerance      = kwargs.get('tolerance',1e-4)
+        self.solver_params  = kwargs.get('solver_params',{})
+        self.level          = kwargs.get('level',0.5)
+        self.start_level    = kwargs.get('start_level',0.01)
+
+        #---
+        # model in matrix form
+        model = model_run.model
+        model.update()
+        if model.ModelSense != gp.GRB.MINIMIZE:
+            raise ValueError('Benders decomposition requires a minimisation')
+        variables   = model.getVars()
+        constraints = model.getConstrs()
+        A     = model.getA().tocsr()
+        obj   = np.array(model.getAttr('Obj',variables))
+        lb    = np.array(model.getAttr('LB',variables))
+        ub    = np.array(model.getAttr('UB',variables))
+        A,obj,rows,self.energy_cols,self.energy_flows = eliminate_annual_energy(model_run,A,obj,constraints)
+        sense = np.array(model.getAttr('Sense',constraints))[rows]
+        rhs   = np.array(model.getAttr('RHS',constraints))[rows]
+
+        #---
+        # blocks of columns (-1 for master columns, -2 for annual energy) and rows
+        col_block = get_column_blocks(model_run,blocks)
+        col_block[self.energy_cols] = -2
+        self.n_blocks = int(col_block.max()) + 1
+        self.max_iterations = kwargs.get('max_iterations',max(200,50*self.n_blocks))
+        master_rows,block_rows,split_rows,split_pairs = decompose(A,col_block,self.n_blocks)
+
+        #---
+        # master variables: master columns, then the value of each split row in each block
+        self.master_cols = np.flatnonzero(col_block == -1)
+        n_master  = len(self.master_cols)
+        n_split   = len(split_pairs)
+        self.n_master_values = n_master + n_split
+        self.master_obj = obj[self.master_cols]
+
+        #---
+        # subproblems
+        master_pos = np.full(len(variables),-1,dtype=np.int64)
+        master_pos[self.master_cols] = np.arange(n_master)
+        split_pos  = {r : i for i,r in enumerate(split_rows)}
+        self.block_cols   = {}
+        self.linked_index = {}
+        self.subproblems  = {}
+        for s in range(self.n_blocks):
+            cols     = np.flatnonzero(col_block == s)
+            rows     = block_rows[s]
+            A_rows   = A[rows]
+            # master columns used by block rows
+            used     = np.flatnonzero(np.asarray(abs(A_rows[:,self.master_cols]).sum(axis=0)).ravel())
+            # split rows touching this block: block part - value (sense of the row) 0
+            pairs    = np.flatnonzero(split_pairs[:,1] == s)
+            A_split  = A[split_pairs[pairs,0]][:,cols]
+            n_linked = len(used) + len(pairs)
+            block_A  = sp.vstack([sp.hstack([A_rows[:,cols],A_rows[:,self.master_cols[used]],
+                                             sp.csr_matrix((len(rows),len(pairs)))]),
+                                  sp.hstack([A_split,sp.csr_matrix((len(pairs),len(used))),
+                                             -sp.identity(len(pairs))])]).tocsr()
+            self.block_cols[s]   = cols
+            self.linked_index[s] = np.concatenate([used,n_master + pairs]).astype(np.int64)
+            self.subproblems[s]  = {'A'        : block_A,
+                                    'sense'    : np.concatenate([sense[rows],sense[split_pairs[pairs,0]]]),
+                                    'rhs'      : np.concatenate([rhs[rows],np.zeros(len(pairs))]),
+                                    'lb'       : lb[cols],
+                                    'ub'       : ub[cols],
+                                    'obj'      : obj[cols],
+                                    'n_linked' : n_linked}
+
+        #---
+        # master problem
+        self.master = gp.Model(model.ModelName + '_master')
+        self.master.setParam('OutputFlag',0)
+        for param,value in self.solver_params.items():
+            self.master.setParam(param,value)
+        self.y     = self.master.addMVar(n_master,lb=lb[self.master_cols],ub=ub[self.master_cols],obj=obj[self.master_cols])
+        self.e     = self.master.addMVar(n_split,lb=-gp.GRB.INFINITY)
+        # cost of each subproblem is at least that of its columns at their cheapest bound
+        with np.errstate(invalid='ignore'):
+            cheapest = np.where(obj > 0,obj * lb,np.where(obj < 0,obj * ub,0))
+        theta_lb   = [cheapest[self.block_cols[s]].sum() for s in range(self.n_blocks)]
+        theta_lb   = np.maximum(np.nan_to_num(theta_lb,nan=-np.inf),-gp.GRB.INFINITY)
+        self.theta = self.master.addMVar(self.n_blocks,lb=theta_lb,obj=1)
+        y_e = gp.MVar.fromlist(self.y.tolist()+self.e.tolist())
+        if len(master_rows):
+            self.master.addMConstr(sp.hstack([A[master_rows][:,self.master_cols],
+                                              sp.csr_matrix((len(master_rows),n_split))]).tocsr(),
+                                   y_e,sense[master_rows],rhs[master_rows])
+        if len(split_rows):
+            E = sp.csr_matrix((np.ones(n_split),([split_pos[r] for r in split_pairs[:,0]],np.arange(n_split))),
+                              shape=(len(split_rows),n_split))
+            self.master.addMConstr(sp.hstack([A[split_rows][:,self.master_cols],E]).tocsr(),
+                                   y_e,sense[split_rows],rhs[split_rows])
+        self.y_e  = y_e
+        self.cost = gp.LinExpr(self.master_obj.tolist() + [1.0]*self.n_blocks,self.y.tolist() + self.theta.tolist())
+        # level stabilisation: distance (L1) of master values from the incumbent and
+        #   cost of the cutting plane model below a level (inactive until set)
+        self.deviation    = self.master.addMVar((2,self.n_master_values),lb=0)
+        self.incumbent    = self.master.addConstr(y_e - self.deviation[0] + self.deviation[1] == np.zeros(self.n_master_values))
+        self.level_constr = self.master.addLConstr(self.cost,gp.GRB.LESS_EQUAL,gp.GRB.INFINITY)
+        self.distance     = gp.LinExpr([1.0]*2*self.n_master_values,self.deviation.tolist()[0] + self.deviation.tolist()[1])
+
+        self.workers,self.threads = get_thread_budget(self.n_blocks,
+                                                      workers=kwargs.get('workers',1),
+                                                      threads=kwargs.get('threads',None))
+        self.results_iterations = pd.DataFrame()
+        self.status      = None
+        self.converged   = False
+        self.lower_bound = None
+        self.upper_bound = None
+        self.solution    = None
+        self.objective   = None
+
+
+    def start_workers(self):
+        '''Start worker processes, each holding a fixed share of the subproblems
+        '''
+        params = dict(self.solver_params,Threads=self.threads)
+        shares = np.array_split(np.arange(self.n_blocks),self.workers)
+        if self.workers == 1:
+            self.local = {s : benders_subproblem(self.subproblems[s],params) for s in shares[0]}
+            return
+        # spawn: workers must not inherit the gurobi environment of the parent
+        context = multiprocessing.get_context('spawn')
+        self.connections,self.processes = [],[]
+        for share in shares:
+            parent,child = context.Pipe()
+            process = context.Process(target=run_subproblem_worker,
+                                      args=(child,{s : self.subproblems[s] for s in share},params))
+            process.start()
+            self.connections.append((parent,share))
+            self.processes.append(process)
+
+
+    def stop_workers(self):
+        '''Stop worker processes
+        '''
+        if self.workers == 1:
+            self.local = None
+            return
+        for (connection,share),process in zip(self.connections,self.processes):
+            if process.is_alive():
+                connection.send(None)
+        for process in self.processes:
+            process.join()
+        self.connections,self.processes = [],[]
+
+
+    def solve_subproblems(self,values,solution=False):
+        '''Solve all subproblems at master values, returning {s : (feasible, objective, duals, x)}
+        '''
+        linked = {s : values[self.linked_index[s]] for s in range(self.n_blocks)}
+        if self.workers == 1:
+            return {s : sub.solve(linked[s],solution) for s,sub in self.local.items()}
+        for connection,share in self.connections:
+            connection.send(({s : linked[s] for s in share},solution))
+        outputs = {}
+        for (connection,share),process in zip(self.connections,self.processes):
+            # a worker that failed (e.g. scripts without a __main__ guard) never replies
+            while not connection.poll(1):
+                if not process.is_alive():
+                    self.stop_workers()
+                    raise RuntimeError('Subproblem worker exited with code %s' % process.exitcode)
+            outputs.update(connection.recv())
+        return outputs
+
+
+    def run(self,pprint=True):
+        '''Iterate master and subproblems until the relative gap is within tolerance. The
+            status is OPTIMAL if the run converged, INFEASIBLE if the master became
+            infeasible (no master values that all subproblems meet) or ITERATION_LIMIT;
+            objective is only set for an optimal run (solution, if any, is that of the
+            best master values met by all subproblems).
+        '''
+        iterations  = []
+        lower_bound = -gp.GRB.INFINITY
+        upper_bound = gp.GRB.INFINITY
+        incumbent   = None
+        previous    = None
+        status      = gp.GRB.ITERATION_LIMIT
+        solution    = None
+        self.start_workers()
+        try:
+            for iteration in range(self.max_iterations):
+                # master (cutting plane model): lower bound
+                start_time = time.time()
+                self.master.setObjective(self.cost,gp.GRB.MINIMIZE)
+                if not self.optimize_master():
+                    status = gp.GRB.INFEASIBLE
+                    break
+                lower_bound = self.master.ObjVal
+                values      = self.y_e.X
+                if incumbent is not None and get_gap(lower_bound,upper_bound) <= self.tolerance:
+                    status = gp.GRB.OPTIMAL
+                    break
+                # level stabilisation: next values are the closest (L1) to the incumbent
+                #   with cost <= lower bound + level x gap in the cutting plane model or,
+                #   until an upper bound is found, the closest to the previous values with
+                #   cost <= lower bound + start_level x |lower bound|
+                if incumbent is not None and self.level > 0:
+                    values = self.project(incumbent,lower_bound + self.level * (upper_bound - lower_bound))
+                elif previous is not None and self.start_level > 0 and np.isfinite(lower_bound):
+                    values = self.project(previous,lower_bound + self.start_level * abs(lower_bound))
+                previous    = values
+                master_time = time.time() - start_time
+
+                # subproblems: upper bound (at master values all subproblems meet)
+                start_time = time.time()
+                outputs    = self.solve_subproblems(values)
+                sub_time   = time.time() - start_time
+                infeasible = [s for s,o in outputs.items() if not o[0]]
+                if not infeasible:
+                    value = float(self.master_obj @ values[:len(self.master_cols)]) \
+                                + sum(o[1] for o in outputs.values())
+                    if value < upper_bound:
+                        upper_bound,incumbent = value,values
+
+                gap = get_gap(lower_bound,upper_bound)
+                iterations.append({'iteration'   : iteration,
+                                   'lower_bound' : lower_bound,
+                                   'upper_bound' : upper_bound,
+                                   'gap'         : gap,
+                                   'infeasible'  : len(infeasible),
+                                   'infeasibility' : sum(outputs[s][1] for s in infeasible),
+                                   'master'      : master_time,
+                                   'subproblems' : sub_time})
+                if pprint:
+                    print('> Iteration %d: lower bound %.6e, upper bound %.6e, gap %.2e (%d infeasible subproblems)' \
+                            % (iteration,lower_bound,upper_bound,gap,len(infeasible)))
+                if gap <= self.tolerance:
+                    status = gp.GRB.OPTIMAL
+                    break
+
+                # cuts: theta_s >= v_s + pi_s (y - y_s) (optimality) or
+                #   0 >= w_s + pi_s (y - y_s), w_s being the minimum infeasibility (feasibility)
+                master_vars = self.y_e.tolist()
+                theta       = self.theta.tolist()
+                for s,(feasible,objective,pi,x) in outputs.items():
+                    index = self.linked_index[s]
+                    terms = gp.LinExpr((-pi).tolist(),[master_vars[i] for i in index])
+                    if feasible:
+                        terms.add(theta[s])
+                    self.master.addLConstr(terms,gp.GRB.GREATER_EQUAL,objective - pi @ values[index])
+
+            # solution at the incumbent
+            if incumbent is not None:
+                outputs  = self.solve_subproblems(incumbent,solution=True)
+                solution = np.zeros(self.model_run.model.NumVars)
+                solution[self.master_cols] = incumbent[:len(self.master_cols)]
+                for s,(feasible,objective,pi,x) in outputs.items():
+                    solution[self.block_cols[s]] = x
+                if len(self.energy_cols):
+                    solution[self.energy_cols] = self.energy_flows @ solution
+        finally:
+            self.stop_workers()
+
+        self.results_iterations = pd.DataFrame(iterations)
+        self.status      = status
+        self.converged   = status == gp.GRB.OPTIMAL
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+        self.solution    = solution
+        self.objective   = upper_bound if self.converged else None
+        if not self.converged:
+            warnings.warn('Benders decomposition not solved to optimality (status %d after %d iterations, '
+                          'lower bound %.6e, upper bound %.6e)' % (status,len(iterations),lower_bound,upper_bound))
+        return self
+
+
+    def project(self,center,level):
+        '''Return master values closest (L1) to center with cost at most level in the
+            cutting plane model
+        '''
+        self.incumbent.RHS    = center
+        self.level_constr.RHS = level
+        self.master.setObjective(self.distance,gp.GRB.MINIMIZE)
+        try:
+            self.optimize_master()
+            return self.y_e.X
+        finally:
+            self.level_constr.RHS = gp.GRB.INFINITY
+
+
+    def optimize_master(self):
+        '''Solve master problem, returning False if it is infeasible
+        '''
+        self.master.optimize()
+        if self.master.Status in [gp.GRB.INFEASIBLE,gp.GRB.INF_OR_UNBD]:
+            return False
+        if self.master.Status != gp.GRB.OPTIMAL:
+            raise ValueError('Master problem not solved to optimality (status %d)' % self.master.Status)
+        return True
+
+
+    def get_values(self,variables):
+        '''Return values of a tupledict of model variables (e.g. annual_capacity) as {key : value}
+        '''
+        return {k : self.solution[v.index] for k,v in variables.items()}
+
+
+    def get_capacity_plan(self):
+        '''Return capacities as {(n,k,y) : capacity} (e.g. for rolling_dispatch)
+        '''
+        return self.get_values(self.model_run.annual_capacity)
@@ -0,0 +1,210 @@
+'''
+    cache.py
+
+        Content-addressed cache of preprocessed inputs. Cleaned nodes, edges with
+        topology (i,j) and tidy flows are stored column by column under a key made
+        from the content hash of the input files and the kwargs used to read them,
+        so that unchanged inputs are loaded without reading shapefiles or snapping
+        edges to nodes. The cache is opt-in (nextra(..., cache=True)), since it
+        writes files next to the working directory.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+# relative imports
+from .utils import *
+from .global_variables import *
+from .profiling import profiler
+
+# bump when preprocessing changes so that stale entries are not read
+CACHE_VERSION = 2
+
+# shapefile components read by geopandas
+SHAPEFILE_EXTENSIONS = ['.shp','.shx','.dbf','.prj','.cpg']
+
+
+
+#---
+# Keys
+#---
+
+def get_input_files(path):
+    '''Return files making up an input (i.e. all components of a shapefile)
+    '''
+    base,ext = os.path.splitext(path)
+    if ext.lower() == '.shp':
+        return [base+e for e in SHAPEFILE_EXTENSIONS if os.path.exists(base+e)]
+    return [path]
+
+
+def hash_input_files(paths):
+    '''Return sha256 of the content of input files
+    '''
+    sha = hashlib.sha256()
+    for path in paths:
+        for f in get_input_files(path):
+            sha.update(os.path.splitext(f)[1].lower().encode())
+            with open(f,'rb') as data:
+                for block in iter(lambda: data.read(1<<20),b''):
+                    sha.update(block)
+    return sha.hexdigest()
+
+
+def make_cache_key(paths,**kwargs):
+    '''Return cache key of inputs and the kwargs used to read them
+    '''
+    sha = hashlib.sha256()
+    sha.update(('v%d' % CACHE_VERSION).encode())
+    sha.update(hash_input_files(paths).encode())
+    sha.update(repr(sorted(kwargs.items())).encode())
+    return sha.hexdigest()[:32]
+
+
+
+#---
+# Columnar storage
+#---
+
+def write_frames(path,**frames):
+    '''Write dataframes to a single .npz archive with one array per column
+    '''
+    arrays = {}
+    for name,df in frames.items():
+        arrays[name+'/__columns__'] = np.array(df.columns.tolist(),dtype=object)
+        arrays[name+'/__crs__']     = np.array([df.crs.to_string() if getattr(df,'crs',None) else ''],dtype=object)
+        arrays[name+'/__index__']   = df.index.to_numpy()
+        for i,c in enumerate(df.columns):
+            if c == 'geometry':
+                arrays[name+'/%d' % i] = df.geometry.to_wkb().to_numpy(dtype=object)
+            elif df[c].dtype == object:
+                # dictionary encode strings (e.g. node names, dates) as integer codes
+                codes,uniques = pd.factorize(df[c])
+                arrays[name+'/%d/codes' % i]   = codes
+                arrays[name+'/%d/uniques' % i] = np.asarray(uniques,dtype=object)
+            else:
+                arrays[name+'/%d' % i] = df[c].to_numpy()
+    # write to a temporary file first: concurrent runs may share the cache
+    tmp = path + '.%d.tmp' % os.getpid()
+    with open(tmp,'wb') as f:
+        np.savez(f,**arrays)
+    os.replace(tmp,path)
+
+
+def read_column(arrays,key):
+    '''Read a column written by write_frames
+    '''
+    if key+'/codes' in arrays.files:
+        codes   = arrays[key+'/codes']
+        uniques = np.append(arrays[key+'/uniques'],np.nan).astype(object)
+        return uniques[codes]
+    return arrays[key]
+
+
+def read_frames(path,names):
+    '''Read dataframes from a .npz archive written by write_frames
+    '''
+    frames = []
+    with np.load(path,allow_pickle=True) as arrays:
+        for name in names:
+            columns = arrays[name+'/__columns__'].tolist()
+            crs     = arrays[name+'/__crs__'][0]
+            df = pd.DataFrame({c : read_column(arrays,name+'/%d' % i) for i,c in enumerate(columns)},
+                              columns=columns,
+                              index=arrays[name+'/__index__'])
+            if 'geometry' in columns:
+                from .spatial import to_geodataframe
+                df = to_geodataframe(df,crs)
+            frames.append(df)
+    return frames
+
+
+
+#---
+# Cached readers
+#---
+
+def read_network_data(path_to_nodes,path_to_edges,timer=None):
+    '''Read nodes and edges, clean nodal names and add topology to edges with geometry
+        (recorded as phase init/topology by a profiler, if given); edges without
+        geometry (e.g. from csv) must have from_id and to_id
+    '''
+    timer       = timer or profiler(enabled=False)
+    nodes       = read_node_data(path_to_nodes)
+    nodes.name  = adjust_nodal_names(nodes.name)
+    edges       = read_edge_data(path_to_edges)
+    if 'geometry' in edges.columns:
+        from .spatial import add_toplogy
+        with timer.phase('init/topology'):
+            edges = add_toplogy(nodes,edges)
+    elif not {'from_id','to_id'}.issubset(edges.columns):
+        raise ValueError('edges without geometry must have from_id and to_id columns')
+    else:
+        edges.from_id = adjust_nodal_names(edges.from_id)
+        edges.to_id   = adjust_nodal_names(edges.to_id)
+    return nodes,edges
+
+
+def read_clean_flow_data(path_to_flows,**kwargs):
+    '''Read flow data in tidy format and clean nodal names
+    '''
+    flows       = read_flow_data(path_to_flows,**kwargs)
+    flows.node  = adjust_nodal_names(flows.node)
+    return flows
+
+
+def read_input_data(path_to_nodes,path_to_edges,path_to_flows,cache=False,**kwargs):
+    '''Return (nodes,edges,flows), read from the cache if the inputs are unchanged
+
+    Parameters
+    ----------
+    cache : bool or str
+        Read inputs directly (False, default), or use the cache in
+        global_variables['cache_directory'] (True) or a given cache directory (str).
+    kwargs : year, timesteps
+        Passed to read_flow_data.
+    profiler : profiler, optional
+        Records reading the network and flows as phases init/network and
+        init/flows (and adding topology to edges not read from the cache as
+        init/topology).
+
+    '''
+    flow_kwargs = {'year' : kwargs.get('year',False), 'timesteps' : kwargs.get('timesteps',False)}
+    timer       = kwargs.get('profiler',None) or profiler(enabled=False)
+    if not cache:
+        with timer.phase('init/network'):
+            nodes,edges = read_network_data(path_to_nodes,path_to_edges,timer)
+        with timer.phase('init/flows'):
+            flows = read_clean_flow_data(path_to_flows,**flow_kwargs)
+        return nodes,edges,flows
+
+    cache_dir = cache if isinstance(cache,str) else global_variables['cache_directory']
+    create_dir(cache_dir)
+
+    # network
+    with timer.phase('init/network'):
+        path = os.path.join(cache_dir,'network_' + make_cache_key([path_to_nodes,path_to_edges]) + '.npz')
+        if os.path.exists(path):
+            nodes,edges = read_frames(path,['nodes','edges'])
+        else:
+            nodes,edges = read_network_data(path_to_nodes,path_to_edges,timer)
+            write_frames(path,nodes=nodes,edges=edges)
+
+    # flows
+    with timer.phase('init/flows'):
+        path = os.path.join(cache_dir,'flows_' + make_cache_key([path_to_flows],**flow_kwargs) + '.npz')
+        if os.path.exists(path):
+            flows, = read_frames(path,['flows'])
+        else:
+            flows = read_clean_flow_data(path_to_flows,**flow_kwargs)
+            write_frames(path,flows=flows)
+
+    return nodes,edges,flows
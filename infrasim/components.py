@@ -0,0 +1,288 @@
+'''
+    components.py
+
+        Decomposition of a built NexTra model by connected components of the
+        network. Once arc bounds are applied (e.g. cross-border links closed
+        under NCO), the arc graph may fall apart into independent networks, one
+        per territory. Variables are assigned to the component of their node. A
+        model whose rows all lie within one component is solved as one smaller
+        model per component, in parallel. Rows coupling components (e.g.
+        region-wide emission_reduction or max_curtail, which join every territory
+        under NCO) are made the only link between components of a Benders
+        decomposition (coupled='benders', default) or merged into one component
+        (coupled='merge').
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import time
+import multiprocessing
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import gurobipy as gp
+from scipy.sparse.csgraph import connected_components
+
+# relative imports
+from .benders import decompose, benders_decomposition
+from .utils import get_thread_budget
+
+
+
+#---
+# Functions
+#---
+
+def get_node_components(model_run):
+    '''Return connected components of the arc graph (arcs with a positive upper bound)
+        as {node : component}. Arcs to nodes outside the node data (super_source,
+        super_sink and curtailment sinks) do not connect nodes.
+    '''
+    nodes = model_run.nodes.name.unique().tolist()
+    index = {n : i for i,n in enumerate(nodes)}
+    arcs  = {(i,j) for (i,j,k,t),ub in zip(model_run.arc_indicies,model_run.params.ub) \
+                if ub > 0 and i in index and j in index}
+    graph = sp.coo_matrix((np.ones(len(arcs)),([index[i] for i,j in arcs],[index[j] for i,j in arcs])),
+                          shape=(len(nodes),len(nodes)))
+    n,labels = connected_components(graph,directed=False)
+    return dict(zip(nodes,labels.tolist()))
+
+
+def get_column_components(model_run,node_component):
+    '''Return component of each model variable from the node it belongs to. Variables
+        of nodes on no arc form one more component and variables fixed at zero (e.g.
+        closed arcs kept with prune_arcs=False) are -1.
+    '''
+    model = model_run.model
+    isolated = max(node_component.values(),default=-1) + 1
+    col_component = np.full(model.NumVars,isolated,dtype=np.int64)
+    for (i,j,k,t),v in model_run.arcFlows.items():
+        col_component[v.index] = node_component.get(i,node_component.get(j,isolated))
+    for variables in [model_run.storage_volume,model_run.annual_capacity,model_run.capacity_change,
+                      getattr(model_run,'annual_energy',{})]:
+        for key,v in variables.items():
+            col_component[v.index] = node_component.get(key[0],isolated)
+    variables = model.getVars()
+    fixed = (np.array(model.getAttr('LB',variables)) == 0) & (np.array(model.getAttr('UB',variables)) == 0)
+    col_component[fixed] = -1
+    return col_component
+
+
+def merge_components(n_components,coupling):
+    '''Return merged component of each component, merging components joined by
+        coupling rows (given as a list of arrays of components)
+    '''
+    pairs = [(c[0],d) for c in coupling for d in c[1:]]
+    graph = sp.coo_matrix((np.ones(len(pairs)),([p[0] for p in pairs],[p[1] for p in pairs])),
+                          shape=(n_components,n_components))
+    return connected_components(graph,directed=False)[1]
+
+
+def solve_component(data,solver_params={}):
+    '''Build and solve the model of a component from its matrix data
+
+    Returns
+    -------
+    (status, objective or None, solution or None, build time, solve time)
+
+    '''
+    start_time = time.time()
+    model = gp.Model()
+    model.setParam('OutputFlag',0)
+    for param,value in solver_params.items():
+        model.setParam(param,value)
+    x = model.addMVar(len(data['obj']),lb=data['lb'],ub=data['ub'],obj=data['obj'])
+    if data['A'].shape[0]:
+        model.addMConstr(data['A'],x,data['sense'],data['rhs'])
+    model.update()
+    build_time = time.time() - start_time
+    start_time = time.time()
+    model.optimize()
+    solve_time = time.time() - start_time
+    status = model.Status
+    if status != gp.GRB.OPTIMAL:
+        output = (status,None,None,build_time,solve_time)
+    else:
+        output = (status,model.ObjVal,x.X,build_time,solve_time)
+    model.dispose()
+    return output
+
+
+
+#---
+# Components class
+#---
+
+class component_decomposition():
+
+
+    def __init__(self,model_run,**kwargs):
+        '''
+
+        Parameters
+        ----------
+        model_run : nextra
+            Built (not necessarily solved) model run.
+        coupled : str, optional
+            Components coupled by rows are linked only by those rows in a Benders
+            decomposition ('benders', default) or merged ('merge').
+        workers : int, optional
+            Number of worker processes solving components (default: one per component,
+            up to the number of cores). workers=1 solves components in this process.
+        threads : int, optional
+            Gurobi threads per worker (default: cores // workers).
+        solver_params : dict, optional
+            Gurobi parameters set on the model of every component.
+        kwargs :
+            Passed to benders_decomposition with coupled='benders' (e.g. tolerance).
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.model_run     = model_run
+        self.coupled       = kwargs.get('coupled','benders')
+        self.solver_params = kwargs.get('solver_params',{})
+        self.kwargs        = kwargs
+        if self.coupled not in ['merge','benders']:
+            raise ValueError('coupled must be merge or benders')
+
+        #---
+        # components of the network
+        model = model_run.model
+        model.update()
+        self.A = model.getA().tocsr()
+        node_component = get_node_components(model_run)
+        col_component  = get_column_components(model_run,node_component)
+        isolated       = max(node_component.values(),default=-1) + 1
+        # components of nodes, including nodes on no arc
+        node_component = {n : node_component.get(n,isolated) for n in model_run.nodes.name}
+
+        # merge components without variables or coupled by rows
+        n_components = isolated + 1
+        used = np.unique(col_component[col_component >= 0])
+        constraints = model.getConstrs()
+        split_rows,split_pairs = decompose(self.A,col_component,n_components)[2:]
+        self.coupling_constrs = [constraints[r].ConstrName for r in split_rows]
+        coupling = [split_pairs[split_pairs[:,0] == r,1] for r in split_rows] if self.coupled == 'merge' else []
+        merged = merge_components(n_components,coupling)
+        labels = np.full(n_components,-1,dtype=np.int64)
+        labels[used] = np.unique(merged[used],return_inverse=True)[1]
+        self.col_component = np.where(col_component >= 0,labels[np.maximum(col_component,0)],-1)
+        self.n_components  = int(labels.max()) + 1
+        self.master_rows,self.block_rows,self.split_rows,split_pairs = \
+            decompose(self.A,self.col_component,self.n_components)
+
+        #---
+        # territories of each component
+        territory = model_run.nodes.set_index('name').territory
+        self.results_components = pd.DataFrame(
+            [{'component'   : s,
+              'territories' : ', '.join(sorted({territory[n] for n,c in node_component.items() if labels[c] == s})),
+              'variables'   : int((self.col_component == s).sum()),
+              'constraints' : len(self.block_rows[s])} for s in range(self.n_components)])
+
+        self.workers,self.threads = get_thread_budget(self.n_components,
+                                                      workers=kwargs.get('workers',None),
+                                                      threads=kwargs.get('threads',None))
+        self.solution  = None
+        self.objective = None
+        self.status    = None
+
+
+    def is_decomposable(self):
+        '''Return True if the model splits into more than one component
+        '''
+        return self.n_components > 1
+
+
+    def get_component_data(self):
+        '''Return matrix data (A, sense, rhs, lb, ub, obj) of each component
+        '''
+        model     = self.model_run.model
+        variables = model.getVars()
+        constrs   = model.getConstrs()
+        lb    = np.array(model.getAttr('LB',variables))
+        ub    = np.array(model.getAttr('UB',variables))
+        obj   = np.array(model.getAttr('Obj',variables))
+        sense = np.array(model.getAttr('Sense',constrs))
+        rhs   = np.array(model.getAttr('RHS',constrs))
+        data  = {}
+        for s in range(self.n_components):
+            cols,rows = np.flatnonzero(self.col_component == s),self.block_rows[s]
+            data[s] = {'cols'  : cols,
+                       'A'     : self.A[rows][:,cols].tocsr(),
+                       'sense' : sense[rows],
+                       'rhs'   : rhs[rows],
+                       'lb'    : lb[cols],
+                       'ub'    : ub[cols],
+                       'obj'   : obj[cols]}
+        # rows over fixed (zero) variables only must hold at zero
+        rows = self.master_rows
+        violated = ((sense[rows] == '<') & (rhs[rows] < 0)) | ((sense[rows] == '>') & (rhs[rows] > 0)) \
+                        | ((sense[rows] == '=') & (rhs[rows] != 0))
+        if violated.any():
+            raise ValueError('Infeasible constraints over fixed variables: ' \
+                                + str([constrs[r].ConstrName for r in rows[violated]][:5]))
+        return data
+
+
+    def run(self,pprint=True):
+        '''Solve components (in parallel) and merge their solutions into one solution vector
+        '''
+        model = self.model_run.model
+        self.solution = np.zeros(model.NumVars)
+        if len(self.split_rows):
+            self.run_benders(pprint)
+            return self
+
+        data = self.get_component_data()
+        params = dict(self.solver_params,Threads=self.threads)
+        if self.workers == 1:
+            outputs = [solve_component(data[s],params) for s in range(self.n_components)]
+        else:
+            # spawn: workers must not inherit the gurobi environment of the parent
+            context = multiprocessing.get_context('spawn')
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,mp_context=context) as pool:
+                futures = [pool.submit(solve_component,data[s],params) for s in range(self.n_components)]
+                outputs = [f.result() for f in futures]
+
+        statuses,objectives = [],[]
+        for s,(status,objective,x,build_time,solve_time) in enumerate(outputs):
+            statuses.append(status)
+            objectives.append(objective)
+            if x is not None:
+                self.solution[data[s]['cols']] = x
+            self.results_components.loc[s,'status'] = status
+            self.results_components.loc[s,'objective'] = objective
+            self.results_components.loc[s,'build'] = build_time
+            self.results_components.loc[s,'solve'] = solve_time
+            if pprint:
+                print('> Component %d (%s): status %d in %.1fs' \
+                        % (s,self.results_components.territories[s],status,build_time+solve_time))
+        # status of the model: optimal if all components are optimal
+        failed = [st for st in statuses if st != gp.GRB.OPTIMAL]
+        self.status = failed[0] if failed else gp.GRB.OPTIMAL
+        self.objective = sum(objectives) + model.ObjCon if not failed else None
+        return self
+
+
+    def run_benders(self,pprint=True):
+        '''Solve components linked by coupling rows by Benders decomposition
+        '''
+        kwargs = {k : v for k,v in self.kwargs.items() if k != 'coupled'}
+        benders = benders_decomposition(self.model_run,blocks=self.col_component,**kwargs)
+        benders.run(pprint=pprint)
+        self.benders   = benders
+        self.status    = benders.status
+        # no objective unless converged (the solution of a run stopped early is not optimal)
+        self.solution  = benders.solution if benders.solution is not None else self.solution
+        self.objective = benders.objective + self.model_run.model.ObjCon if benders.converged else None
+        return self
@@ -0,0 +1,179 @@
+'''
+    energy.py
+
+        Annual energy of arcs in the NexTra model. Constraints over the year
+        (emission_reduction, max_curtail and the RES, natural gas, shale and
+        self-sufficiency targets) sum the same generation and supply arcs over
+        every timestep. Instead of repeating these sums in each row, one
+        accumulator per arc and year is linked to the hourly flows of the arc
+        once (annual_energy - sum of flows = 0) and aggregate constraints are
+        rows over accumulators. Accumulators are added on demand (arcs in no
+        aggregate constraint have none) and give totals of energy and emissions
+        of a solved model.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import gurobipy as gp
+
+# relative imports
+from .utils import *
+from .global_variables import *
+
+# emission intensity (g/kWh) of technologies (node subtypes)
+EMISSION_INTENSITY = {'diesel'      : co2['Diesel'],
+                      'natural gas' : co2['Gas'],
+                      'ccgt'        : co2['Gas'],
+                      'coal'        : co2['Coal'],
+                      'shale'       : co2['Shale']}
+
+# arcs of curtailed solar and wind and of energy supplied to demand (see add_max_curtailment)
+CURTAILED_ARCS = [('gaza_solar','curtailment'),('israel_solar','curtailment'),
+                  ('israel_wind','curtailment'),('jordan_solar','curtailment'),
+                  ('jordan_wind','curtailment'),('west_bank_solar','curtailment'),
+                  ('west_bank_wind','curtailment')]
+SUPPLIED_ARCS  = [('gaza_generation','gaza_energy_demand'),('israel_generation','gaza_energy_demand'),
+                  ('israel_generation','israel_energy_demand'),('israel_generation','jordan_energy_demand'),
+                  ('israel_generation','west_bank_energy_demand'),('jordan_generation','israel_energy_demand'),
+                  ('jordan_generation','jordan_energy_demand'),('jordan_generation','west_bank_energy_demand'),
+                  ('west_bank_generation','israel_energy_demand'),('west_bank_generation','jordan_energy_demand'),
+                  ('west_bank_generation','west_bank_energy_demand')]
+
+
+
+#---
+# Functions
+#---
+
+def get_arc_lookup(self):
+    '''Return arc flow variables of electricity as (positions, codes, years, arc_codes):
+        positions of the variables in arcFlows (i.e. make_edge_indices) sorted by arc,
+        the code of their arc and their year, and codes of arcs as {(from_id,to_id) : code}
+    '''
+    edges = self.edge_indices.loc[~get_zero_capacity_edges(self).to_numpy(),['from_id','to_id','commodity','timestep']]
+    from_code,from_ids = pd.factorize(edges.from_id)
+    to_code,to_ids     = pd.factorize(edges.to_id)
+    code      = from_code * len(to_ids) + to_code
+    positions = np.flatnonzero((edges.commodity == 'electricity').to_numpy())
+    positions = positions[np.argsort(code[positions],kind='stable')]
+    years     = self.time.year[self.time.position[edges.timestep.to_numpy(dtype=np.int64)[positions]]]
+    arc_codes = {(from_ids[c // len(to_ids)],to_ids[c % len(to_ids)]) : c for c in np.unique(code)}
+    return positions,code[positions],years,arc_codes
+
+
+def get_arc_flows(lookup,arcs):
+    '''Return arcs (by position in arcs, a dataframe of from_id and to_id), positions of
+        their arc flow variables and the year of each, as three aligned arrays
+    '''
+    positions,codes,arc_years,arc_codes = lookup
+    arc_code = np.array([arc_codes.get(arc,-1) for arc in zip(arcs.from_id,arcs.to_id)],dtype=np.int64)
+    left   = np.searchsorted(codes,arc_code,side='left')
+    counts = np.searchsorted(codes,arc_code,side='right') - left
+    arc    = np.repeat(np.arange(len(arcs)),counts)
+    index  = np.arange(counts.sum()) + np.repeat(left - np.cumsum(counts) + counts,counts)
+    return arc,positions[index],np.asarray(arc_years)[index]
+
+
+def add_annual_energy(self,arcs):
+    '''Return annual energy of arcs in years (dataframe of from_id, to_id and year) as
+        {(from_id,to_id,commodity,year) : variable}, adding the accumulators that are
+        not in the model yet with their links to hourly flows (one block of rows).
+        Arcs with no flows in a year (e.g. pruned) have no accumulator.
+    '''
+    keys    = [(i,j,'electricity',int(y)) for i,j,y in zip(arcs.from_id,arcs.to_id,arcs.year)]
+    missing = pd.DataFrame([key for key in dict.fromkeys(keys) if key not in self.annual_energy],
+                           columns=['from_id','to_id','commodity','year'])
+    if not missing.empty:
+        by_arc = missing[['from_id','to_id']].drop_duplicates().reset_index(drop=True)
+        arc,positions,flow_years = get_arc_flows(get_arc_lookup(self),by_arc)
+        # one accumulator (and row) per arc and year, coded as arc * len(years) + year
+        years  = np.unique(flow_years)
+        code   = arc * len(years) + np.searchsorted(years,flow_years)
+        arc_of = {a : k for k,a in enumerate(zip(by_arc.from_id,by_arc.to_id))}
+        wanted = [arc_of[i,j] * len(years) + np.searchsorted(years,y) \
+                    for i,j,y in zip(missing.from_id,missing.to_id,missing.year) if y in years]
+        keep   = np.isin(code,wanted)
+        codes,row = np.unique(code[keep],return_inverse=True)
+        positions = positions[keep]
+        if len(codes):
+            # rows: annual_energy - sum of flows = 0 (flows of distinct arcs are distinct columns)
+            n = len(codes)
+            A = sp.csr_matrix((np.r_[np.ones(n),-np.ones(len(row))],
+                               (np.r_[np.arange(n),row],np.arange(n + len(row)))),
+                              shape=(n,n + len(row)))
+            flows  = list(self.arcFlows.values())
+            energy = self.model.addMVar(n,lb=0,name='annual_energy').tolist()
+            x = gp.MVar.fromlist(energy + [flows[p] for p in positions.tolist()])
+            constrs = self.model.addMConstr(A,x,np.full(n,'='),np.zeros(n)).tolist()
+            self.model.update()
+            new_keys = [(by_arc.from_id[c // len(years)],by_arc.to_id[c // len(years)],'electricity',
+                         int(years[c % len(years)])) for c in codes.tolist()]
+            names    = ['annual_energy[%s,%s,%s,%d]' % key for key in new_keys]
+            self.model.setAttr('VarName',energy,names)
+            self.model.setAttr('ConstrName',constrs,names)
+            for key,v in zip(new_keys,energy):
+                self.annual_energy[key] = v
+    return {key : self.annual_energy[key] for key in keys if key in self.annual_energy}
+
+
+def get_energy_terms(self,terms,years):
+    '''Return terms on arcs (dataframe of from_id, to_id and coef) in years as
+        [(variable,coef)] over the annual energy of the arcs
+    '''
+    years  = [int(y) for y in years]
+    energy = add_annual_energy(self,terms.merge(pd.DataFrame({'year' : years}),how='cross'))
+    return [(energy[i,j,'electricity',y],c) for i,j,c in zip(terms.from_id,terms.to_id,terms.coef) \
+                for y in years if (i,j,'electricity',y) in energy]
+
+
+def add_max_curtailment(self):
+    '''Add max_curtail: curtailment of solar and wind over the model years is at most
+        maximum_curtailment (in global variables) of the energy supplied to demand
+    '''
+    terms = pd.concat([pd.DataFrame(CURTAILED_ARCS,columns=['from_id','to_id']).assign(coef=1.0),
+                       pd.DataFrame(SUPPLIED_ARCS,columns=['from_id','to_id']) \
+                            .assign(coef=-global_variables['maximum_curtailment'])],ignore_index=True)
+    terms = get_energy_terms(self,terms,sorted(self.years))
+    return self.model.addLConstr(gp.LinExpr([c for v,c in terms],[v for v,c in terms]),'<',0,'max_curtail')
+
+
+def expand_annual_energy(self,expr):
+    '''Return a linear expression with annual energy variables replaced by the
+        (weighted) hourly flows they are linked to
+    '''
+    energy = {v.index for v in getattr(self,'annual_energy',{}).values()}
+    coeffs,variables = [],[]
+    for n in range(expr.size()):
+        v,c = expr.getVar(n),expr.getCoeff(n)
+        if v.index not in energy:
+            coeffs.append(c)
+            variables.append(v)
+            continue
+        column = self.model.getCol(v)
+        links  = [m for m in range(column.size()) if column.getConstr(m).ConstrName.startswith('annual_energy')]
+        row    = self.model.getRow(column.getConstr(links[0]))
+        scale  = column.getCoeff(links[0])
+        for m in range(row.size()):
+            if row.getVar(m).index != v.index:
+                coeffs.append(-c * row.getCoeff(m) / scale)
+                variables.append(row.getVar(m))
+    return gp.LinExpr(coeffs,variables) + expr.getConstant()
+
+
+def fetch_annual_energy_results(model_run):
+    '''Get annual energy of arcs (from_id,to_id,commodity,year,subtype,value) and their
+        emissions (intensity in g/kWh times energy in MWh, i.e. kg of co2) from model run
+    '''
+    energy  = getattr(model_run,'annual_energy',{})
+    results = pd.DataFrame(list(energy.keys()),columns=['from_id','to_id','commodity','year'])
+    results['subtype'] = results.from_id.map(model_run.nodes.drop_duplicates(subset='name').set_index('name').subtype)
+    results['value']   = get_variable_array(model_run,energy) if len(energy) else np.zeros(0)
+    results['emissions'] = results.subtype.map(EMISSION_INTENSITY).fillna(0).to_numpy(dtype=float) * results.value
+    return results
@@ -0,0 +1,215 @@
+'''
+    executor.py
+
+        Run a batch of NexTra scenarios across a process pool. The machine's cores
+        are split between workers and gurobi threads, each worker returns either a
+        nextra_postprocess object or a failure record, and the wall-clock time of
+        each phase (init, build, solve, postprocess) is reported per scenario.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import time
+import traceback
+import multiprocessing
+import concurrent.futures
+
+import pandas as pd
+
+# relative imports
+from .optimise import nextra
+from .utils import get_thread_budget, get_solve_status
+
+
+
+#---
+# Functions
+#---
+
+def make_scenario_specs(scenarios,**kwargs):
+    '''Return list of scenario specs from {name : energy_objective} (kwargs are shared by all specs)
+    '''
+    specs = []
+    for name,energy_objective in scenarios.items():
+        spec = {'name'             : name,
+                'scenario'         : name,
+                'energy_objective' : energy_objective}
+        spec.update(kwargs)
+        specs.append(spec)
+    return specs
+
+
+def run_scenario(nodes,edges,flows,spec,threads=0,engine='standard',solver_params={}):
+    '''Initialise, build, solve and postprocess a single scenario
+
+    Returns
+    -------
+    (name, nextra_postprocess or None, failure record or None, timings)
+
+    '''
+    spec   = dict(spec)
+    name   = spec.pop('name',spec['scenario'])
+    timing = {'scenario' : name}
+    phase  = 'init'
+    model_run = None
+    try:
+        start_time = time.time()
+        model_run  = nextra(nodes,edges,flows,**spec)
+        timing['init'] = time.time() - start_time
+
+        phase = 'build'
+        start_time = time.time()
+        model_run.build(engine=engine)
+        timing['build'] = time.time() - start_time
+
+        phase = 'solve'
+        start_time = time.time()
+        model_run.model.setParam('Threads',threads)
+        for param,value in solver_params.items():
+            model_run.model.setParam(param,value)
+        model_run.run(pprint=False,write=False)
+        timing['solve'] = time.time() - start_time
+        if get_solve_status(model_run) != 2:
+            raise ValueError('Model not solved to optimality (status %d)' % get_solve_status(model_run))
+
+        phase = 'postprocess'
+        start_time = time.time()
+        results = model_run.get_results()
+        timing['postprocess'] = time.time() - start_time
+
+        timing['status'] = get_solve_status(model_run)
+        return name,results,None,timing
+
+    except Exception as e:
+        failure = {'scenario'  : name,
+                   'phase'     : phase,
+                   'status'    : get_model_status(model_run),
+                   'error'     : type(e).__name__,
+                   'message'   : str(e),
+                   'traceback' : traceback.format_exc()}
+        timing['status'] = failure['status']
+        return name,None,failure,timing
+
+    finally:
+        if model_run is not None and hasattr(model_run,'model'):
+            model_run.model.dispose()
+
+
+def get_model_status(model_run):
+    '''Return gurobi status code of a model (None if no model was created)
+    '''
+    try:
+        return get_solve_status(model_run)
+    except Exception:
+        return None
+
+
+
+#---
+# Executor class
+#---
+
+class scenario_executor():
+
+
+    def __init__(self,path_to_nodes,path_to_edges,path_to_flows,specs,**kwargs):
+        '''
+
+        Parameters
+        ----------
+        path_to_nodes : str
+            Path to nodal data.
+        path_to_edges : str
+            Path to edge data.
+        path_to_flows : str
+            Path to flow data.
+        specs : list
+            Scenario specs, i.e. dicts of nextra arguments (scenario, energy_objective
+            and any kwargs) with an optional 'name' used to label results.
+        workers : int, optional
+            Number of worker processes (default: one per scenario, up to the number
+            of cores). workers=1 runs the batch sequentially in this process.
+        threads : int, optional
+            Gurobi threads per worker (default: cores // workers).
+        engine : str, optional
+            Model builder passed to nextra.build (default: 'standard').
+        solver_params : dict, optional
+            Gurobi parameters set on every model before solving.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.nodes = path_to_nodes
+        self.edges = path_to_edges
+        self.flows = path_to_flows
+        self.specs = specs
+
+        names = [s.get('name',s['scenario']) for s in specs]
+        if len(set(names)) != len(names):
+            raise ValueError('Scenario names must be unique: ' + str(names))
+
+        self.workers,self.threads = get_thread_budget(len(specs),
+                                                      workers=kwargs.get('workers',None),
+                                                      threads=kwargs.get('threads',None))
+        self.engine         = kwargs.get('engine','standard')
+        self.solver_params  = kwargs.get('solver_params',{})
+
+        self.results  = {}
+        self.failures = {}
+        self.timings  = pd.DataFrame()
+        self.wall_time = None
+
+
+    def run(self,pprint=True):
+        '''Run all scenarios and collect results, failures and phase timings
+        '''
+        start_time = time.time()
+        args = [(self.nodes,self.edges,self.flows,spec,self.threads,self.engine,self.solver_params)
+                for spec in self.specs]
+
+        if self.workers == 1:
+            outputs = [run_scenario(*a) for a in args]
+        else:
+            # spawn: workers must not inherit the gurobi environment of the parent
+            context = multiprocessing.get_context('spawn')
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,mp_context=context) as pool:
+                futures = [pool.submit(run_scenario,*a) for a in args]
+                outputs = [f.result() for f in futures]
+
+        timings = []
+        for name,results,failure,timing in outputs:
+            if failure is None:
+                self.results[name] = results
+            else:
+                self.failures[name] = failure
+            timings.append(timing)
+            if pprint:
+                self.print_outcome(name,timing,failure)
+
+        phases = ['init','build','solve','postprocess']
+        self.timings = pd.DataFrame(timings).reindex(columns=['scenario']+phases+['status'])
+        self.timings['total'] = self.timings[phases].sum(axis=1)
+        self.wall_time = time.time() - start_time
+        return self
+
+
+    def print_outcome(self,name,timing,failure):
+        '''Print outcome of a scenario
+        '''
+        if failure is None:
+            print('> Completed: ' + name + ' in %.1fs' % sum(timing[p] for p in ['init','build','solve','postprocess']))
+        else:
+            print('> FAILED! ' + name + ' in ' + failure['phase'] + ' (' + failure['error'] + ': ' + failure['message'] + ')')
+
+
+    def failures_to_frame(self):
+        '''Return failure records as a DataFrame
+        '''
+        return pd.DataFrame(list(self.failures.values()),
+                            columns=['scenario','phase','status','error','message','traceback'])
@@ -8,8 +8,11 @@
 global_variables = {
                     # -DIRECTORIES
                     'results_directory'                 : '../nextra_results/',
+                    'cache_directory'                   : '../nextra_cache/',
                     # -INDICES
                     'edge_index_variables'              : ['from_id','to_id','commodity','timestep'],
+                    # -TOPOLOGY
+                    'topology_snap_tolerance'           : 1e-3,         # max. distance (CRS units, ~100m in EPSG:4326) from an edge end to its node
                     # -ELECTRICITY SYSTEM
                     'baseload_coefficient'              : 0.5,
                     'storage_loss_coefficient'          : 0.1,
@@ -75,6 +78,11 @@ global_variables = {
                     'eag_ng_target_2030'                : 0.5,          # %
                     # -OTHER
                     'super_source_maximum'              : 10**12,
+                    'target_tolerance'                  : 1e-6,         # relative violation of an annual target before it is reported (rolling dispatch)
+                    # -SCALING
+                    'unbounded_limit'                   : 10**7,        # MW, limits at or above this are no limit (e.g. 10**9 interconnectors)
+                    'max_matrix_range'                  : 10**6,        # largest/smallest absolute coefficient before warning
+                    'max_rhs_bound'                     : 10**8,        # largest absolute rhs or finite bound before warning
                     'mask_value'                        : -999,
                     'maximum_capacity'                  : 20000,        # MW
                     }
@@ -0,0 +1,215 @@
+'''
+    gsa.py
+
+        Append-only store of runs of a global sensitivity analysis (e.g. Morris).
+        The samples (parameter sets) are written once when the store is created and
+        each completed run is appended as one line of runs.jsonl: sample,
+        parameters, capacity of each territory, objective, solve status and the
+        time of each phase. A run that is interrupted resumes from the samples
+        without a record, and outputs are exported as arrays aligned with the
+        samples (as SALib's analyze functions expect).
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import os
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+# relative imports
+from .executor import run_scenario
+
+
+
+#---
+# Functions
+#---
+
+def get_territory_capacities(results):
+    '''Return capacity of each territory (largest capacity of a node in the territory)
+    '''
+    return results.results_capacities.groupby(by='territory').value.max().to_dict()
+
+
+def run_gsa_sample(nodes,edges,flows,spec,**kwargs):
+    '''Initialise, build, solve and postprocess a parameter set (spec of nextra
+        arguments, see executor.run_scenario) and return its record
+    '''
+    name,results,failure,timing = run_scenario(nodes,edges,flows,dict(spec,name='sample'),**kwargs)
+    record = {p : timing.get(p,None) for p in ['init','build','solve','postprocess']}
+    record['status'] = timing['status']
+    if failure is None:
+        record['objective'] = results.objective
+        record.update(get_territory_capacities(results))
+    else:
+        record['objective'] = None
+        record['error']     = failure['error'] + ': ' + failure['message']
+    return record
+
+
+def to_json(value):
+    '''Return numpy scalars and arrays as python values (for json)
+    '''
+    if isinstance(value,np.generic):
+        return value.item()
+    if isinstance(value,np.ndarray):
+        return value.tolist()
+    raise TypeError('Cannot write ' + type(value).__name__ + ' to the run store')
+
+
+
+#---
+# Store class
+#---
+
+class gsa_run_store():
+
+
+    def __init__(self,path):
+        '''
+
+        Parameters
+        ----------
+        path : str
+            Directory of the store (created if it does not exist). Samples of an
+            existing store are read from it.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.path = path
+        os.makedirs(path,exist_ok=True)
+        self.problem      = None
+        self.param_values = None
+        if os.path.exists(os.path.join(path,'samples.csv')):
+            with open(os.path.join(path,'problem.json')) as f:
+                self.problem = json.load(f)
+            self.param_values = pd.read_csv(os.path.join(path,'samples.csv'))[self.problem['names']].to_numpy()
+
+
+    def set_samples(self,problem,param_values):
+        '''Write the problem (num_vars, names, bounds) and samples of the analysis to a
+            new store, or check that they are those of the store
+        '''
+        param_values = np.asarray(param_values,dtype=float)
+        if self.param_values is not None:
+            if list(problem['names']) != list(self.problem['names']) or \
+                    self.param_values.shape != param_values.shape or not np.allclose(self.param_values,param_values):
+                raise ValueError('Samples differ from those of the store at ' + self.path)
+            return self
+        with open(os.path.join(self.path,'problem.json'),'w') as f:
+            json.dump(problem,f,default=to_json,indent=4)
+        # samples last, as they mark the store as created
+        samples = pd.DataFrame(param_values,columns=problem['names'])
+        samples.to_csv(os.path.join(self.path,'samples.tmp'),index_label='sample')
+        os.replace(os.path.join(self.path,'samples.tmp'),os.path.join(self.path,'samples.csv'))
+        self.problem      = dict(problem)
+        self.param_values = param_values
+        return self
+
+
+    def read_records(self):
+        '''Return records of completed runs in the order they were appended. Lines cut
+            short (e.g. by a crash while writing) are ignored.
+        '''
+        path = os.path.join(self.path,'runs.jsonl')
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+
+    def append(self,record):
+        '''Append the record of a completed run (written to disk before returning)
+        '''
+        line = json.dumps(record,default=to_json)
+        with open(os.path.join(self.path,'runs.jsonl'),'ab+') as f:
+            # start a new line after a line cut short
+            if f.tell() > 0:
+                f.seek(-1,os.SEEK_END)
+                if f.read(1) != b'\n':
+                    line = '\n' + line
+            f.write((line + '\n').encode())
+            f.flush()
+            os.fsync(f.fileno())
+
+
+    def get_pending(self,retry_failed=False):
+        '''Return samples without a record (or whose last run failed) as [(sample, param_set)]
+        '''
+        if self.param_values is None:
+            raise ValueError('No samples in the store at ' + self.path + ' (see set_samples)')
+        last = {r['sample'] : r for r in self.read_records()}
+        done = {s for s,r in last.items() if not (retry_failed and r.get('error') is not None)}
+        return [(s,p) for s,p in enumerate(self.param_values) if s not in done]
+
+
+    def run(self,run_sample,retry_failed=False,pprint=True):
+        '''Run pending samples in order, appending a record after each
+
+        Parameters
+        ----------
+        run_sample : function
+            Returns the record of a parameter set (e.g. from run_gsa_sample).
+        retry_failed : bool, optional
+            Run samples whose last run failed again (default: False).
+        pprint : bool, optional
+            Print progress.
+
+        Returns
+        -------
+        self
+
+        '''
+        pending = self.get_pending(retry_failed)
+        if pprint:
+            print('> %d of %d samples to run' % (len(pending),len(self.param_values)))
+        for n,(sample,param_set) in enumerate(pending):
+            start_time = time.time()
+            record = {'sample' : sample}
+            record.update(zip(self.problem['names'],param_set))
+            record.update(run_sample(param_set))
+            record['time'] = time.time() - start_time
+            self.append(record)
+            if pprint:
+                print('> Sample %d (%d/%d): status %s in %.1fs' \
+                        % (sample,n+1,len(pending),record.get('status',None),record['time']))
+        return self
+
+
+    def get_results(self):
+        '''Return last record of each sample as a dataframe, with a row for every sample
+        '''
+        records = pd.DataFrame(self.read_records())
+        if records.empty:
+            records = pd.DataFrame(columns=['sample'])
+        records = records.drop_duplicates(subset='sample',keep='last').set_index('sample')
+        return records.reindex(np.arange(len(self.param_values))).reset_index()
+
+
+    def get_outputs(self,column,fill=0):
+        '''Return an output (e.g. capacity of a territory) of every sample as an array
+            aligned with param_values (failed runs are filled with fill)
+        '''
+        results = self.get_results()
+        missing = len(self.get_pending())
+        if missing:
+            raise ValueError('%d samples have not been run' % missing)
+        if column not in results.columns:
+            raise ValueError('No output ' + column + ' in the store')
+        return results[column].astype(float).fillna(fill).to_numpy()
@@ -0,0 +1,546 @@
+'''
+    matrix.py
+
+        Sparse matrix assembly of the NexTra model. The node-arc incidence and
+        time-coupling structure is built once as index arrays, and each time-indexed
+        constraint family is added with a single call to the Gurobi matrix API
+        (addMConstr) rather than term-by-term through tupledicts.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import gurobipy as gp
+
+# relative imports
+from .utils import *
+from .global_variables import *
+from .scaling import is_unbounded
+from .energy import add_max_curtailment
+
+
+
+#---
+# Index structure
+#---
+
+def make_node_index(self):
+    '''Make lookup of node names (incl. super nodes found only on arcs) to integer positions
+    '''
+    names = list(self.nodes.name.unique())
+    for n in self.edge_indices.from_id.unique().tolist() + self.edge_indices.to_id.unique().tolist():
+        if n not in names:
+            names.append(n)
+    self.node_names = names
+    self.node_pos   = {n:i for i,n in enumerate(names)}
+    return self
+
+
+def make_time_lookup(timesteps,max_timestep):
+    '''Return array mapping timestep values to their position in timesteps (-1 if absent)
+    '''
+    lookup = np.full(max_timestep+2,-1,dtype=np.int64)
+    lookup[np.asarray(timesteps,dtype=np.int64)] = np.arange(len(timesteps))
+    return lookup
+
+
+def add_variable_block(self,name,indices,node_columns,**kwargs):
+    '''Add a block of variables as an MVar and register its (node,commodity,timestep) arrays.
+        If periods are given (e.g. years), the last index is stored as its position in periods
+    '''
+    # create variables
+    mvar = self.model.addMVar(len(indices),
+                              lb=kwargs.get('lb',0),
+                              ub=kwargs.get('ub',float('inf')),
+                              name=name)
+    # register block
+    keys  = pd.DataFrame(indices,columns=node_columns+['commodity','timestep'])
+    if 'periods' in kwargs:
+        keys['timestep'] = keys.timestep.map({p:i for i,p in enumerate(kwargs['periods'])})
+    block = {'offset'    : self.num_columns,
+             'size'      : len(indices),
+             'commodity' : keys.commodity.to_numpy(),
+             'timestep'  : keys.timestep.to_numpy(dtype=np.int64),
+             'mvar'      : mvar,
+             'indices'   : indices}
+    for c in node_columns:
+        block[c] = keys[c].map(self.node_pos).fillna(-1).to_numpy(dtype=np.int64)
+    self.blocks[name] = block
+    self.num_columns += len(indices)
+    return mvar
+
+
+def name_variable_block(self,name):
+    '''Name variables of a block as tupledict.addVars would (e.g. arcflow[i,j,k,t])
+    '''
+    block = self.blocks[name]
+    names = [name + '[' + ','.join(str(v) for v in idx) + ']' for idx in block['indices']]
+    self.model.setAttr('VarName',block['mvar'].tolist(),names)
+
+
+def block_to_tupledict(self,name):
+    '''Return a tupledict view of a variable block for index-based constraints and results
+    '''
+    block = self.blocks[name]
+    return gp.tupledict(zip(block['indices'],block['mvar'].tolist()))
+
+
+
+#---
+# Matrix builders
+#---
+
+def node_time_matrix(self,block,nodes,timesteps,on='node',commodity=None,lag=0,coef=1.0):
+    '''Return sparse matrix of variable sums at each (node,timestep), i.e. the
+        matrix form of tupledict.sum(n,'*',k,t-lag). Rows are ordered node-major.
+    '''
+    b = self.blocks[block]
+    timesteps   = np.asarray(timesteps,dtype=np.int64)
+    # node lookup (nodes not in network get empty rows)
+    node_lookup = np.full(len(self.node_names)+1,-1,dtype=np.int64)
+    for r,n in enumerate(nodes):
+        if n in self.node_pos:
+            node_lookup[self.node_pos[n]] = r
+    # time lookup (variables at t map onto the row of t+lag)
+    max_t       = int(timesteps.max()) if len(timesteps) else 0
+    time_lookup = make_time_lookup(timesteps,max_t)
+    row_time    = b['timestep'] + lag
+    valid       = (row_time >= 0) & (row_time <= max_t)
+    row_t       = np.full(b['size'],-1,dtype=np.int64)
+    row_t[valid] = time_lookup[row_time[valid]]
+    # variables at nodes outside the network map onto the trailing -1 entry
+    row_node    = node_lookup[b[on]]
+    # mask
+    mask = (row_node >= 0) & (row_t >= 0)
+    if commodity is not None:
+        mask = mask & (b['commodity'] == commodity)
+    idx  = np.flatnonzero(mask)
+    rows = row_node[idx] * len(timesteps) + row_t[idx]
+    vals = np.full(len(idx),coef,dtype=float)
+    return sp.csr_matrix((vals,(rows,b['offset']+idx)),
+                         shape=(len(nodes)*len(timesteps),self.num_columns))
+
+
+def period_time_matrix(self,block,nodes,timesteps,periods,commodity=None,coef=1.0):
+    '''Return sparse matrix of per-period variables (e.g. annual capacity) at each
+        (node,timestep), i.e. the variable of the year that each timestep falls in
+    '''
+    A = node_time_matrix(self,block,nodes,np.arange(len(periods)),commodity=commodity,coef=coef)
+    # row of (node,period) for each (node,timestep)
+    years     = self.time.year[self.time.position[np.asarray(timesteps,dtype=np.int64)]]
+    period_of = np.searchsorted(periods,years)
+    rows      = (np.arange(len(nodes))[:,None] * len(periods) + period_of[None,:]).ravel()
+    return A[rows]
+
+
+def arc_matrix(self,mask,coef=1.0):
+    '''Return sparse matrix with one row per selected arc
+    '''
+    idx = np.flatnonzero(mask)
+    return sp.csr_matrix((np.full(len(idx),coef,dtype=float),
+                          (np.arange(len(idx)),self.blocks['arcflow']['offset']+idx)),
+                         shape=(len(idx),self.num_columns))
+
+
+def arc_time_matrix(self,arcs,timesteps,coef=1.0,aggregate=False):
+    '''Return sparse matrix summing named arcs [(i,j)] at each timestep, or over all
+        timesteps as a single row if aggregate is True
+    '''
+    b = self.blocks['arcflow']
+    timesteps = np.asarray(timesteps,dtype=np.int64)
+    mask = np.zeros(b['size'],dtype=bool)
+    for i,j in arcs:
+        if i in self.node_pos and j in self.node_pos:
+            mask |= (b['from_id'] == self.node_pos[i]) & (b['to_id'] == self.node_pos[j])
+    mask &= np.isin(b['timestep'],timesteps)
+    idx = np.flatnonzero(mask)
+    if aggregate:
+        rows,size = np.zeros(len(idx),dtype=np.int64),1
+    else:
+        rows,size = make_time_lookup(timesteps,int(timesteps.max()))[b['timestep'][idx]],len(timesteps)
+    return sp.csr_matrix((np.full(len(idx),coef,dtype=float),(rows,b['offset']+idx)),
+                         shape=(size,self.num_columns))
+
+
+def add_matrix_constrs(self,A,sense,b,name):
+    '''Add constraint family A @ x (sense) b over all model variables
+    '''
+    if A.shape[0] == 0:
+        return None
+    b = np.broadcast_to(np.asarray(b,dtype=float),(A.shape[0],)).copy()
+    return self.model.addMConstr(A,None,sense,b,name=name)
+
+
+
+#---
+# Model assembly
+#---
+
+def build_matrix_model(self):
+    '''Build decision variables, objective and time-indexed constraints with the matrix API
+    '''
+
+    #======================================================================
+    # DECISION VARIABLES
+    #======================================================================
+
+    self = make_node_index(self)
+    self.blocks      = {}
+    self.num_columns = 0
+    ts               = np.asarray(self.timesteps,dtype=np.int64)
+    starts           = np.isin(ts,list(self.time.starts))
+
+    # arcflows
+    #   upper/lower bounds are set as variable bounds and zero capacity arcs are left out
+    self.arc_indicies = make_edge_indices(self)
+    add_variable_block(self,'arcflow',self.arc_indicies,['from_id','to_id'],
+                       lb=self.params.lb,
+                       ub=self.params.ub)
+
+    # storage volumes
+    #   with representative periods, volumes are relative to the start of each period
+    storage_indices = make_storage_indices(self)
+    add_variable_block(self,'storage_volume',storage_indices,['node'],lb=get_storage_volume_lb(self))
+
+    # capacity at each node in each year
+    years            = sorted(self.years)
+    capacity_indices = make_capacity_indices(self)
+    add_variable_block(self,'capacity_indices',capacity_indices,['node'],periods=years)
+
+    # capacity variation at each node in each year
+    add_variable_block(self,'capacity_change',capacity_indices,['node'],lb=-10000,periods=years)
+
+    self.model.update()
+    for b in self.blocks:
+        name_variable_block(self,b)
+
+    # tupledict views (used by 2030 targets and results)
+    self.arcFlows           = arcflows(block_to_tupledict(self,'arcflow'),pruned=make_pruned_edge_indices(self))
+    self.storage_volume     = block_to_tupledict(self,'storage_volume')
+    self.annual_capacity    = block_to_tupledict(self,'capacity_indices')
+    self.capacity_change    = block_to_tupledict(self,'capacity_change')
+    self.capacity_indices   = map_capacity_to_timesteps(self,self.annual_capacity)
+
+    arcs = self.blocks['arcflow']
+    caps = self.blocks['capacity_indices']
+    stor = self.blocks['storage_volume']
+
+
+    #======================================================================
+    # OBJECTIVE FUNCTION
+    #======================================================================
+
+    # (1) Cost of flow -> min.
+    #   superseded by (2), which was set as the same objective (0)
+
+    # (2) Capacity of nodes -> min.
+    self.model.setObjective(make_capex_objective(self),gp.GRB.MINIMIZE)
+
+
+    #======================================================================
+    # CONSTRAINTS
+    #======================================================================
+
+    def outflow(nodes,timesteps=ts,k=None,lag=0):
+        return node_time_matrix(self,'arcflow',nodes,timesteps,on='from_id',commodity=k,lag=lag)
+
+    def inflow(nodes,timesteps=ts,k=None,lag=0):
+        return node_time_matrix(self,'arcflow',nodes,timesteps,on='to_id',commodity=k,lag=lag)
+
+    def capacity(nodes,timesteps=ts,k=None):
+        return period_time_matrix(self,'capacity_indices',nodes,timesteps,years,commodity=k)
+
+    def annual(nodes,periods,k=None,lag=0):
+        return node_time_matrix(self,'capacity_indices',nodes,periods,commodity=k,lag=lag)
+
+    def change(nodes,periods,k=None):
+        return node_time_matrix(self,'capacity_change',nodes,periods,commodity=k)
+
+    def volume(nodes,timesteps=ts,k=None,lag=0):
+        return node_time_matrix(self,'storage_volume',nodes,timesteps,commodity=k,lag=lag)
+
+    #------------------
+    # SUPER NODES
+    #------------------
+
+    for k in self.commodities:
+        if self.super_source and not (self.scaling and is_unbounded(self.global_variables['super_source_maximum'])):
+            add_matrix_constrs(self,outflow(['super_source'],k=k),'<',
+                               self.global_variables['super_source_maximum'],'super_source_supply')
+        if self.super_sink:
+            add_matrix_constrs(self,inflow(['super_sink'],k=k),'>',0,'super_sink_demand')
+        if self.curtailment:
+            add_matrix_constrs(self,inflow(['res_curtailment_sink'],k=k),'>',0,'res_curtailment')
+
+    #------------------
+    # CAPACITY CHANGES
+    #------------------
+
+    cap_nodes = list(dict.fromkeys(n for n,k,t in capacity_indices))
+
+    # capacity is held constant within each year and can only change in the
+    #   first modelled year after the 2019 baseline (periods are year positions)
+    change_year = get_capacity_change_year(self)
+    periods     = np.arange(len(years))
+    if 2019 in years:
+        # capacity in 2019 as defined in nodal file
+        first = periods[[years.index(2019)]]
+        add_matrix_constrs(self,annual(cap_nodes,first),'=',
+                           self.params.initial_capacity(cap_nodes),'init_cap')
+    # capacity after the first year
+    later = periods[1:]
+    add_matrix_constrs(self,annual(cap_nodes,later) - annual(cap_nodes,later,lag=1) \
+                            - change(cap_nodes,later),'=',0,'cap_after_init')
+    # no change in capacity in 2019 or after the first change
+    fixed = periods[[y==2019 or y>change_year for y in years]]
+    add_matrix_constrs(self,change(cap_nodes,fixed),'=',0,'cap_changes')
+
+    #------------------
+    # ENERGY DEMAND
+    #------------------
+
+    sink_nodes = get_sink_nodes(self.nodes).name.to_list()
+    demand = add_matrix_constrs(self,inflow(sink_nodes,k='electricity'),'=',
+                                self.params.flow(sink_nodes,ts) * self.global_variables['peak_demand_factor'],
+                                'energy_demand')
+    # rows as {(t,j) : constr} (ordered by node, then timestep) for marginal prices
+    self.demand_constrs = gp.tupledict(zip([(t,j) for j in sink_nodes for t in self.timesteps],
+                                           demand.tolist() if demand is not None else []))
+
+    #------------------
+    # ENERGY SUPPLY
+    #------------------
+
+    source_nodes = get_source_nodes(self.nodes).name.to_list()
+    source_nodes = [i for i in source_nodes if 'solar' not in i]
+    source_nodes = [i for i in source_nodes if 'wind' not in i]
+
+    add_matrix_constrs(self,outflow(source_nodes,k='electricity') \
+                            - capacity(source_nodes,k='electricity'),'<',0,'electricity_supply')
+
+    # baseload supplies
+    def baseload_supply(technology,ramping_rate):
+        '''Constraint supply from baseload technologies by capacity and ramp rate
+        '''
+        if technology in self.technologies:
+            idx_nodes = get_nodes_by_technology(self.nodes,technology=technology).name.to_list()
+            factor    = global_variables['loss_factor_seasonal'] * \
+                            global_variables['loss_factor_maintenance_thermo'] * \
+                                global_variables['reserve_capacity_factor'] * \
+                                    global_variables['loss_factor_transmission']
+            add_matrix_constrs(self,outflow(idx_nodes,k='electricity') \
+                                    - factor * capacity(idx_nodes,k='electricity'),'<',0,technology+'_baseload')
+            # ramping rate
+            if 'hour' in self.flows.columns:
+                later = ts[~starts]
+                ramp  = outflow(idx_nodes,later,k='electricity') - outflow(idx_nodes,later,k='electricity',lag=1)
+                add_matrix_constrs(self,ramp,'<',ramping_rate,technology+'_supply')
+                add_matrix_constrs(self,ramp,'>',-ramping_rate,technology+'_supply')
+                # ramping from supply preceding the first timestep (e.g. previous window)
+                initial_dispatch = get_initial_dispatch(self)
+                nodes = [i for i in idx_nodes if (i,'electricity') in initial_dispatch]
+                if nodes:
+                    first   = ts[starts]
+                    initial = np.repeat([initial_dispatch[i,'electricity'] for i in nodes],len(first))
+                    ramp    = outflow(nodes,first,k='electricity')
+                    add_matrix_constrs(self,ramp,'<',initial + ramping_rate,technology+'_supply_init')
+                    add_matrix_constrs(self,ramp,'>',initial - ramping_rate,technology+'_supply_init')
+
+    baseload_supply(technology='ccgt',ramping_rate=self.global_variables['ccgt_ramping_rate'])
+    baseload_supply(technology='coal',ramping_rate=self.global_variables['coal_ramping_rate'])
+    baseload_supply(technology='diesel',ramping_rate=self.global_variables['diesel_ramping_rate'])
+    baseload_supply(technology='biogas',ramping_rate=self.global_variables['ccgt_ramping_rate'])
+    baseload_supply(technology='shale',ramping_rate=self.global_variables['shale_ramping_rate'])
+    baseload_supply(technology='natural gas',ramping_rate=self.global_variables['nat_gas_ramping_rate'])
+
+    #------------------
+    # STORAGES
+    #------------------
+
+    storage_nodes = get_storage_nodes(self.nodes)
+    storage_caps  = storage_nodes.set_index(keys=['name','commodity']).to_dict()['capacity']
+    storage_nodes = storage_nodes.name.to_list()
+
+    for k in self.commodities:
+        nodes = [j for j in storage_nodes if (j,k) in storage_caps]
+        # volume below capacity (with representative periods, see link_storage_between_periods)
+        if self.representative_periods is None:
+            add_matrix_constrs(self,volume(nodes,k=k) - capacity(nodes,k=k),'<',0,'stor_cap_max')
+        # t=1 (volumes start at 0 unless carried over from a previous window)
+        first   = ts[starts]
+        initial = np.repeat([get_initial_storage(self).get((j,k),0) for j in nodes],len(first))
+        add_matrix_constrs(self,volume(nodes,first,k=k) - inflow(nodes,first,k=k) \
+                                + outflow(nodes,first,k=k),'=',initial,'storage_init')
+        # t>1
+        later = ts[~starts]
+        add_matrix_constrs(self,volume(nodes,later,k=k) - volume(nodes,later,k=k,lag=1) \
+                                - inflow(nodes,later,k=k) + outflow(nodes,later,k=k),'=',0,'storage_balance')
+        # battery minimum level
+        if self.representative_periods is None:
+            later = ts[ts>10]
+            add_matrix_constrs(self,volume(nodes,later,k=k) \
+                                    - global_variables['battery_minimum_level'] * capacity(nodes,later,k=k),
+                               '>',0,'bat_min_lev')
+
+    #------------------
+    # JUNCTIONS
+    #------------------
+
+    junction_nodes = get_junction_nodes(self.nodes).name.to_list()
+    for k in self.commodities:
+        add_matrix_constrs(self,inflow(junction_nodes,k=k) - outflow(junction_nodes,k=k),'=',0,'junction_balance')
+
+    #------------------
+    # SOLAR AND WIND
+    #------------------
+
+    res_factor = global_variables['loss_factor_transmission'] * \
+                    global_variables['reserve_capacity_factor'] * \
+                        global_variables['loss_factor_maintenance_res']
+
+    for technology in ['solar','wind']:
+        tech_nodes = get_nodes_by_technology(self.nodes,technology=technology)
+        for region in adjust_nodal_names(self.nodes.territory).unique():
+            assets = tech_nodes[tech_nodes.name.str.contains(region)].name.to_list()
+            if not assets:
+                continue
+            cf = self.params.flow([region+'_'+technology],ts)
+            cf = np.tile(cf,len(assets))
+            for k in self.commodities:
+                add_matrix_constrs(self,outflow(assets,k=k) \
+                                        - sp.diags(res_factor*cf) @ capacity(assets,k=k),
+                                   '=',0,technology+'_supply')
+
+    #------------------
+    # BATTERIES
+    #------------------
+
+    battery_nodes = ['israel_battery_storage','jordan_battery_storage','gaza_battery_storage','west_bank_battery_storage']
+
+    for k in self.commodities:
+        for i in ['israel','jordan','west_bank','gaza']:
+            res_assets = [i+'_solar',i+'_wind'] if i != 'gaza' else [i+'_solar']
+            res_caps   = sum(annual([n],periods,k=k) for n in res_assets)
+            # minimum capacity
+            add_matrix_constrs(self,annual([i+'_battery_storage'],periods,k=k) \
+                                    - global_variables['battery_capacity_min_percentage'] * res_caps,'>',0,'bat_min')
+            # maximum capacity
+            add_matrix_constrs(self,annual([i+'_battery_storage'],periods,k=k) \
+                                    - global_variables['battery_capacity_max_percentage'] * res_caps,'<',0,'bat_min')
+
+    for k in self.commodities:
+        # inflow/outflow cannot exceed capacity
+        add_matrix_constrs(self,inflow(battery_nodes,k=k) - capacity(battery_nodes,k=k),'<',0,'stor_inflow')
+        add_matrix_constrs(self,outflow(battery_nodes,k=k) - capacity(battery_nodes,k=k),'<',0,'stor_outflow')
+
+    # charging/discharging rates
+    arc_from = np.array(['battery' in self.node_names[n] for n in arcs['from_id']],dtype=bool)
+    arc_to   = np.array(['battery' in self.node_names[n] for n in arcs['to_id']],dtype=bool)
+    add_matrix_constrs(self,arc_matrix(self,arc_from),'<',self.global_variables['battery_charge_rate'],'battery_charge_rate')
+    add_matrix_constrs(self,arc_matrix(self,arc_to),'<',self.global_variables['battery_discharge_rate'],'battery_discharge_rate')
+
+    # charging windows
+    add_matrix_constrs(self,outflow(battery_nodes,self.time.select(charging=True),k='electricity'),'=',0,'bat_chg')
+    add_matrix_constrs(self,inflow(battery_nodes,self.time.select(charging=False),k='electricity'),'=',0,'bat_dischg')
+
+    #------------------
+    # IMPORTS AND BASELOAD OUTPUT
+    #------------------
+
+    egypt = arc_time_matrix(self,[('egypt_generation','gaza_energy_demand')],ts)
+    for k in self.commodities:
+        add_matrix_constrs(self,egypt,'<',self.global_variables['egypt_to_gaza_export'],'egypt_import')
+
+    minimum_output = [('israel_coal','isr_min_coal_output','isr_coal_base'),
+                      ('israel_ccgt','isr_min_gas_output','isr_ng_base'),
+                      ('jordan_shale','jor_min_shale_output','shale_base'),
+                      ('jordan_natural_gas','jor_min_gas_output','ng_base'),
+                      ('west_bank_natural_gas','jor_min_gas_output','ng_base'),
+                      ('gaza_natural_gas','jor_min_gas_output','ng_base')]
+    for n,factor,name in minimum_output:
+        add_matrix_constrs(self,outflow([n],k='electricity') \
+                                - self.global_variables[factor] * capacity([n],k='electricity'),'>',0,name)
+
+    #------------------
+    # RENEWABLE DECONSTRUCTION
+    #------------------
+
+    renewable_assets = ['israel_solar','israel_wind','west_bank_solar','west_bank_wind',
+                        'jordan_solar','jordan_wind','gaza_solar']
+    add_matrix_constrs(self,annual(renewable_assets,periods,k='electricity'),'>',
+                       np.repeat(self.params.initial_capacity(renewable_assets),len(periods)),'res_decom')
+
+    #------------------
+    # CURTAILMENT
+    #------------------
+
+    # sums over the year are annual energy of arcs (see energy.py), added last as
+    #   accumulators are columns outside the variable blocks of the matrices above
+    if self.curtailment:
+        add_max_curtailment(self)
+
+    return self
+
+
+
+#---
+# Model comparison
+#---
+
+def canonical_rows(model,digits=9):
+    '''Return the set of distinct constraint rows of a model in a canonical, name-based form
+    '''
+    model.update()
+    A      = model.getA().tocsr()
+    names  = np.array(model.getAttr('VarName',model.getVars()))
+    sense  = model.getAttr('Sense',model.getConstrs())
+    rhs    = model.getAttr('RHS',model.getConstrs())
+    rows   = set()
+    for r in range(A.shape[0]):
+        lo,hi = A.indptr[r],A.indptr[r+1]
+        terms = sorted(zip(names[A.indices[lo:hi]],A.data[lo:hi]))
+        terms = [(n,v) for n,v in terms if v != 0]
+        s,b   = sense[r],rhs[r]
+        # drop vacuous rows (e.g. 0 >= 0)
+        if not terms:
+            if (s == '<' and b >= 0) or (s == '>' and b <= 0) or (s == '=' and b == 0):
+                continue
+        # orient rows
+        sign = -1 if (s == '>' or (s == '=' and terms and terms[0][1] < 0)) else 1
+        s    = '<' if s == '>' else s
+        rows.add((s,round(sign*b,digits),tuple((n,round(sign*v,digits)) for n,v in terms)))
+    return rows
+
+
+def compare_models(model_a,model_b,digits=9):
+    '''Compare two gurobi models for equivalence (variables, bounds, objectives and distinct rows)
+    '''
+    report = {}
+    # variables and bounds
+    bounds = lambda m: {v.VarName:(v.LB,v.UB) for v in m.getVars()}
+    report['variables'] = bounds(model_a) == bounds(model_b)
+    # objectives
+    objectives = []
+    for m in [model_a,model_b]:
+        objs = []
+        if not m.IsMultiObj:
+            objs.append({v.VarName:round(v.Obj,digits) for v in m.getVars() if v.Obj != 0})
+        for i in range(m.NumObj if m.IsMultiObj else 0):
+            m.setParam('ObjNumber',i)
+            objs.append({v.VarName:round(v.ObjN,digits) for v in m.getVars() if v.ObjN != 0})
+        objectives.append(objs)
+    report['objective'] = objectives[0] == objectives[1]
+    # constraints
+    rows_a = canonical_rows(model_a,digits)
+    rows_b = canonical_rows(model_b,digits)
+    report['rows_only_in_a'] = len(rows_a - rows_b)
+    report['rows_only_in_b'] = len(rows_b - rows_a)
+    report['constraints']    = rows_a == rows_b
+    report['equivalent']     = report['variables'] and report['objective'] and report['constraints']
+    return report
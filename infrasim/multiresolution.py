@@ -0,0 +1,264 @@
+'''
+    multiresolution.py
+
+        Multi-resolution solve of the NexTra model. Cold-started, most simplex
+        iterations of an hourly run go into finding a basis near the capacity
+        plan. A coarse model of the run, built over representative periods of
+        its flows (e.g. 12 days weighted by the days they stand for, see
+        aggregation.py), is solved first and its solution warm-starts the hourly
+        model: either the coarse solution, mapped onto every hourly timestep, is
+        passed as a start vector to primal simplex ('start'), or capacities are
+        fixed (from below) at the coarse plan, the model is solved and capacities
+        are then released and solved on from that basis ('fix').
+
+        Over the horizons that could be measured (11 and 15 hourly timesteps, see
+        benchmark_multi_resolution.py), 'start' took fewer simplex iterations than
+        'fix' overall, but neither took fewer than a cold solve unless the coarse
+        model was close to the hourly one. Warm starts are therefore off by default.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import copy
+import time
+
+import pandas as pd
+import gurobipy as gp
+
+# relative imports
+from .utils import *
+from .aggregation import representative_periods
+from .profiling import profiler
+
+MODES = ['fix','start']
+
+
+
+#---
+# Functions
+#---
+
+def make_coarse(model_run,n_periods,period_length=24,method='hierarchical'):
+    '''Return a copy of an hourly model run over representative periods of its flows
+        (not built)
+    '''
+    if model_run.representative_periods is not None:
+        raise ValueError('model run is already built over representative periods')
+    coarse = copy.copy(model_run)
+    # the coarse model is not profiled and is solved cold
+    coarse.profiler   = profiler(enabled=False)
+    coarse.warm_start = False
+    coarse.solution   = None
+    coarse.representative_periods = representative_periods(model_run.flows,n_periods,
+                                                           period_length=period_length,
+                                                           method=method)
+    coarse.flows = coarse.representative_periods.aggregate(model_run.flows)
+    coarse = define_sets(coarse)
+    coarse = add_time_index_to_edges(coarse)
+    coarse.model = gp.Model(model_run.model.ModelName + '_coarse')
+    return coarse
+
+
+def map_coarse_solution(coarse,model_run):
+    '''Return the solution of a coarse model run at every timestep of the hourly model
+        run as (variables, values): capacities, their changes and annual energy as
+        solved, flows of the representative timestep of each timestep and storage
+        volumes as the level at the start of each period plus the volume within its
+        representative period (see link_storage_between_periods)
+    '''
+    ref        = coarse.representative_periods.ref.set_index('timestep')
+    aggregated = ref.aggregated.to_dict()
+    period     = ref.period.to_dict()
+    variables,values = [],[]
+    # capacities, their changes and annual energy
+    for name in ['annual_capacity','capacity_change','annual_energy']:
+        solved = get_variable_values(coarse,getattr(coarse,name))
+        for key,v in getattr(model_run,name).items():
+            if key in solved:
+                variables.append(v)
+                values.append(solved[key])
+    # flows
+    solved = get_variable_values(coarse,coarse.arcFlows)
+    for (i,j,k,t),v in model_run.arcFlows.items():
+        value = solved.get((i,j,k,aggregated[t]))
+        if value is not None:
+            variables.append(v)
+            values.append(value)
+    # storage volumes
+    solved = get_variable_values(coarse,coarse.storage_volume)
+    inter  = get_variable_values(coarse,coarse.storage_inter) if hasattr(coarse,'storage_inter') else {}
+    for (n,k,t),v in model_run.storage_volume.items():
+        value = solved.get((n,k,aggregated[t]))
+        if value is not None:
+            variables.append(v)
+            values.append(value + inter.get((n,k,period[t]),0))
+    return variables,values
+
+
+
+#---
+# Multi-resolution class
+#---
+
+class multi_resolution():
+
+
+    def __init__(self,model_run,**kwargs):
+        '''
+
+        Parameters
+        ----------
+        model_run : nextra
+            Built (hourly) model run.
+        representative_periods : int, optional
+            Number of representative periods of the coarse model (default: 12).
+        period_length : int, optional
+            Number of timesteps in a period (default: 24, i.e. days).
+        clustering : str, optional
+            Clustering method of representative periods (default: 'hierarchical').
+        mode : str, optional
+            'start' (default): pass the coarse solution as a start vector (PStart)
+            and solve by primal simplex;
+            'fix': solve the hourly model with capacities fixed (from below) at the
+            coarse plan, then release capacities and solve on from that basis.
+        engine : str, optional
+            Model builder of the coarse model, 'standard' or 'matrix' (default:
+            the builder of the hourly model run).
+        method : int, optional
+            Gurobi Method of the released solve in 'fix' mode (default: the Method
+            of the model, with which gurobi solves from an advanced basis by simplex).
+            'start' mode always solves by primal simplex (Method=0).
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.model_run      = model_run
+        self.n_periods      = kwargs.get('representative_periods',12)
+        self.period_length  = kwargs.get('period_length',24)
+        self.clustering     = kwargs.get('clustering','hierarchical')
+        self.mode           = kwargs.get('mode','start')
+        self.engine         = kwargs.get('engine',model_run.engine)
+        self.method         = kwargs.get('method',None)
+        if self.mode not in MODES:
+            raise ValueError('mode must be fix or start')
+
+        self.capacities     = {}
+        self.results_passes = pd.DataFrame()
+
+
+    def record(self,name,start_time,model=None):
+        '''Return status, objective, iterations and time of a pass
+        '''
+        model  = self.model_run.model if model is None else model
+        status = model.Status
+        return {'pass'       : name,
+                'status'     : status,
+                'objective'  : model.ObjVal if status == gp.GRB.OPTIMAL else None,
+                'iterations' : model.IterCount,
+                'barrier_its': model.BarIterCount,
+                'solve'      : model.Runtime,
+                'wall'       : time.time() - start_time}
+
+
+    def run(self,pprint=True):
+        '''Solve the coarse model, then the hourly model warm started from its solution
+            (cold, if the coarse model is not solved to optimality)
+        '''
+        model_run = self.model_run
+        summary   = []
+
+        #---
+        # coarse model
+        start_time = time.time()
+        with model_run.profiler.phase('run/coarse'):
+            coarse = make_coarse(model_run,self.n_periods,self.period_length,self.clustering)
+            coarse.build(engine=self.engine)
+            coarse.run(pprint=False,write=False)
+            summary.append(self.record('coarse',start_time,coarse.model))
+            if get_solve_status(coarse) == gp.GRB.OPTIMAL:
+                self.capacities  = dict(get_variable_values(coarse,coarse.annual_capacity))
+                variables,values = map_coarse_solution(coarse,model_run)
+            coarse.model.dispose()
+        if pprint:
+            print('> Coarse model (%d periods of %d timesteps) solved in %.1fs' \
+                    % (self.n_periods,self.period_length,time.time() - start_time))
+
+        #---
+        # hourly model
+        if not self.capacities:
+            start_time = time.time()
+            with model_run.profiler.phase('run/cold'):
+                model_run.model.optimize()
+            summary.append(self.record('cold',start_time))
+        elif self.mode == 'fix':
+            summary += self.solve_fixed_then_released(pprint)
+        else:
+            summary += self.solve_from_start(variables,values)
+        self.results_passes = pd.DataFrame(summary)
+        return self
+
+
+    def solve_fixed_then_released(self,pprint=True):
+        '''Solve the hourly model with capacities fixed from below at the coarse plan,
+            then with capacities released (their bounds restored), from the basis of
+            the fixed solve. Capacities are not fixed from above, since hours outside
+            the representative periods (e.g. peaks) may need more than the coarse plan.
+        '''
+        model_run = self.model_run
+        model     = model_run.model
+        keys      = list(model_run.annual_capacity.keys())
+        variables = [model_run.annual_capacity[key] for key in keys]
+        lb        = model.getAttr('LB',variables)
+        fixed     = [max(self.capacities.get(key,l),l) for key,l in zip(keys,lb)]
+        summary   = []
+
+        start_time = time.time()
+        with model_run.profiler.phase('run/fixed'):
+            model.setAttr('LB',variables,fixed)
+            model.optimize()
+        summary.append(self.record('fixed',start_time))
+        if pprint:
+            print('> Hourly model with fixed capacities: status %d in %.1fs' % (model.Status,time.time() - start_time))
+
+        # bounds are only relaxed, so the basis of the fixed solve stays primal feasible
+        start_time = time.time()
+        method     = model.Params.Method
+        with model_run.profiler.phase('run/released'):
+            model.setAttr('LB',variables,lb)
+            if self.method is not None:
+                model.setParam('Method',self.method)
+            try:
+                model.optimize()
+            finally:
+                model.setParam('Method',method)
+        summary.append(self.record('released',start_time))
+        return summary
+
+
+    def solve_from_start(self,variables,values):
+        '''Solve the hourly model by primal simplex from the coarse solution as a start
+            vector (gurobi only uses PStart with primal simplex, i.e. Method=0)
+        '''
+        model_run = self.model_run
+        model     = model_run.model
+        method,warm_start = model.Params.Method,model.Params.LPWarmStart
+        start_time = time.time()
+        with model_run.profiler.phase('run/start'):
+            model.setAttr('PStart',variables,values)
+            model.setParam('Method',0)
+            # presolve the start vector rather than switching presolve off
+            model.setParam('LPWarmStart',2)
+            try:
+                model.optimize()
+            finally:
+                model.setParam('Method',method)
+                model.setParam('LPWarmStart',warm_start)
+                # later solves start from the basis of this one
+                model.setAttr('PStart',variables,[gp.GRB.UNDEFINED] * len(variables))
+        return [self.record('start',start_time)]
@@ -10,11 +10,24 @@
 # Modules
 #---
 
+import os
+import warnings
 import gurobipy as gp
 
 # relative imports
 from .utils import *
 from .postprocess import nextra_postprocess
+from .matrix import build_matrix_model
+from .parameters import parameters
+from .cache import read_input_data
+from .aggregation import *
+from .components import component_decomposition
+from .benders import benders_decomposition
+from .profiling import *
+from .scaling import *
+from .policy import add_policy_targets, POLICY_TARGETS
+from .energy import add_max_curtailment
+from .multiresolution import multi_resolution
 
 
 #---
@@ -49,35 +62,58 @@ class nextra():
         
         # init vars
         self = init_vars(self,scenario,energy_objective)
-    
-        # read node
-        self.nodes = read_node_data(path_to_nodes)
-        
-        # clean nodal names
-        self.nodes.name = adjust_nodal_names(self.nodes.name)
 
-        # read edge data
-        self.edges = read_edge_data(path_to_edges)
-        
-        # add topology to edges
-        self.edges = add_toplogy(self.nodes,self.edges)
+        # wall time and peak memory of each phase, written to the results directory (if profile)
+        self.profiler = profiler(enabled=kwargs.get('profile',False))
+        self.anatomy  = None
+    
+        # read nodes, edges (with topology) and flows; with cache, unchanged inputs are read
+        #   from the cache directory (see cache.py)
+        self.nodes,self.edges,self.flows = read_input_data(path_to_nodes,
+                                                           path_to_edges,
+                                                           path_to_flows,
+                                                           cache=kwargs.get("cache", False),
+                                                           year=kwargs.get("year", False),
+                                                           timesteps=kwargs.get("timesteps", False),
+                                                           profiler=self.profiler)
 
         # add costs to nodes and edges
-        self = append_cost_to_network_data(self)
+        with self.profiler.phase('init/costs'):
+            self = append_cost_to_network_data(self)
 
-        # read flow data
-        self.flows = read_flow_data(path_to_flows,
-                                    year=kwargs.get("year", False),
-                                    timesteps=kwargs.get("timesteps", False))
-        
-        # clean nodal names in flow file
-        self.flows.node = adjust_nodal_names(self.flows.node)
+        # cluster flows into representative periods (e.g. days or weeks)
+        if not kwargs.get('representative_periods',False):
+            self.representative_periods = None
+        else:
+            with self.profiler.phase('init/aggregate'):
+                self.representative_periods = representative_periods(self.flows,
+                                                                     kwargs.get('representative_periods'),
+                                                                     period_length=kwargs.get('period_length',24),
+                                                                     method=kwargs.get('clustering','hierarchical'))
+                self.flows = self.representative_periods.aggregate(self.flows)
         
         # handle kwargs
         self.res_factor = kwargs.get('res_factor',1)
         self.coo_factor = kwargs.get('coo_res_factor',self.global_variables['coop_res_target_2030'])
         self.ss_factor  = kwargs.get('self_sufficiency_factor',self.global_variables['self_sufficiency_factor'])
+        # 2030 targets and energy goals as a policy table (see policy.py)
+        self.policy_targets = kwargs.get('policy_targets',POLICY_TARGETS)
         self.__name__   = kwargs.get('model_name','nextra')
+        # keep zero capacity arcs in the model (e.g. to raise connectivity in place)
+        self.prune_arcs = kwargs.get('prune_arcs',True)
+        # solve independent networks (e.g. territories under NCO) as separate models:
+        #   True or kwargs of component_decomposition (e.g. {'coupled':'merge','workers':4}),
+        #   or by Benders decomposition into dispatch blocks: 'benders' or kwargs of
+        #   benders_decomposition with method='benders' (e.g. {'method':'benders','blocks':12})
+        self.decompose  = kwargs.get('decompose',False)
+        # map limits that stand for no limit to infinity and scale rows (see scaling.py)
+        self.scaling    = kwargs.get('scaling',False)
+        self.row_scales = {}
+        self.solution   = None
+        # warm start the first solve from a coarse model over representative periods:
+        #   True or kwargs of multi_resolution (e.g. {'representative_periods':12,'mode':'start'})
+        self.warm_start       = kwargs.get('warm_start',False)
+        self.multi_resolution = None
         
         if not kwargs.get('super_source',False):
             self.super_source = False
@@ -165,13 +201,15 @@ class nextra():
             #Egypt ->
             self.connectivity['egypt_to_gaza']          = kwargs.get("egypt_to_gaza", egypt_to_gaza)
 
-        self = update_for_scenario(self,self.connectivity)
+        with self.profiler.phase('init/scenario'):
+            self = update_for_scenario(self,self.connectivity)
 
-        # define sets
-        self = define_sets(self)
-        
-        # add time index to edge data
-        self = add_time_index_to_edges(self)
+        with self.profiler.phase('init/sets'):
+            # define sets
+            self = define_sets(self)
+            
+            # add time index to edge data
+            self = add_time_index_to_edges(self)
 
         # define gurobi model
         self.model = gp.Model( create_model_name( self.__name__ ) )
@@ -185,8 +223,57 @@ class nextra():
         self.wind_price_factor  = kwargs.get('wind_price_factor',1)
 
 
-    def build(self):
+    def build(self,engine='standard'):
         '''Build optimisation model using GurobiPy
+
+        Parameters
+        ----------
+        engine : str, 'standard'/'matrix'
+            Add time-indexed constraints term-by-term through tupledicts ('standard')
+            or as sparse matrices through the gurobi matrix API ('matrix').
+
+        Returns
+        -------
+        None.
+
+        '''
+        if engine not in ['standard','matrix']:
+            raise ValueError('engine must be standard or matrix')
+        self.anatomy = None
+        self.engine  = engine
+        # time each family of variables and constraints (build/<name>)
+        with self.profiler.phase('build'), self.profiler.families(self):
+            # parameters aligned with variable ordering
+            self.params = parameters(self)
+            # constraints with factors that can be updated in place
+            self.factor_constrs = {}
+            # annual energy of arcs in aggregate constraints (added on demand)
+            self.annual_energy  = gp.tupledict()
+            if engine == 'matrix':
+                build_matrix_model(self)
+            else:
+                self.build_network()
+            if self.representative_periods is not None:
+                link_storage_between_periods(self)
+            # rows of 2030 targets (for shadow prices)
+            self.model.update()
+            first = self.model.NumConstrs
+            self.build_targets()
+            self.model.update()
+            # (leaving out links of annual energy added with them)
+            self.target_constrs = [c for c in self.model.getConstrs()[first:] \
+                                        if not c.ConstrName.startswith('annual_energy')]
+            if self.representative_periods is not None:
+                weight_annual_constrs(self)
+        if self.scaling:
+            # scale rows and check ranges before solving
+            with self.profiler.phase('build/scaling'):
+                self.row_scales   = scale_rows(self)
+                self.model_ranges = check_model_ranges(self.model)
+
+
+    def build_network(self):
+        '''Build decision variables, objective and time-indexed network constraints
         '''
         
         #======================================================================
@@ -195,23 +282,33 @@ class nextra():
 
         #---
         # arcflows
+        #   upper/lower bounds are set as variable bounds and zero capacity arcs are left out
         self.arc_indicies = make_edge_indices(self)
-        self.arcFlows     = self.model.addVars(self.arc_indicies,name="arcflow")
+        self.arcFlows     = arcflows(self.model.addVars(self.arc_indicies,
+                                                        lb=self.params.lb.tolist(),
+                                                        ub=self.params.ub.tolist(),
+                                                        name="arcflow"),
+                                     pruned=make_pruned_edge_indices(self))
 
         #---
         # storage volumes
+        #   with representative periods, volumes are relative to the start of each period
         storage_indices     = make_storage_indices(self)
-        self.storage_volume = self.model.addVars(storage_indices,lb=0,name="storage_volume")
+        self.storage_volume = self.model.addVars(storage_indices,lb=get_storage_volume_lb(self),name="storage_volume")
 
         #---
-        # capacity at each node
+        # capacity at each node in each year
         capacity_indices      = make_capacity_indices(self)  
-        self.capacity_indices = self.model.addVars(capacity_indices,lb=0,name="capacity_indices")
+        self.annual_capacity  = self.model.addVars(capacity_indices,lb=0,name="capacity_indices")
 
         #---
-        # capacity variation at each node
+        # capacity variation at each node in each year
             # do we want to exclude gas storages here????
         self.capacity_change = self.model.addVars(capacity_indices,lb=-10000,name="capacity_change")
+
+        #---
+        # capacity at each node and timestep (i.e. capacity in the year of t)
+        self.capacity_indices = map_capacity_to_timesteps(self,self.annual_capacity)
         
         
         
@@ -222,34 +319,17 @@ class nextra():
         #---
         # Minimise cost of flow + capex
 
-        # create cost/capex dict
-        self.cost_dict  = make_cost_dict(self)
-        self.capex_dict = make_capex_dict(self)
-
-        # solar and wind factors
-        if self.solar_price_factor != 1:
-            for k in self.capex_dict.keys():
-                if 'solar' in k[0]:
-                    self.capex_dict[k] = self.capex_dict[k] * self.solar_price_factor
-
-        if self.wind_price_factor != 1:
-            for k in self.capex_dict.keys():
-                if 'wind' in k[0]:
-                    self.capex_dict[k] = self.capex_dict[k] * self.wind_price_factor
-
-
         #---
         # SET OBJECTIVES
 
         # (1) Cost of flow -> min.
-        self.model.setObjectiveN(
-            gp.quicksum(self.arcFlows[i,j,k,t] * self.cost_dict[i,j,k,t]
-                        for i,j,k,t in self.arcFlows),0,weight=1)
+        #   superseded by (2), which was set as the same objective (0)
 
         # (2) Capacity of nodes -> min.
-        self.model.setObjectiveN(
-            gp.quicksum(self.capacity_indices[n,k,t] * self.capex_dict[n,k]
-                        for n,k,t in self.capacity_indices),0,weight=1)
+        #   weighted by the number of timesteps in each year (i.e. capacity at every timestep)
+        #   and by solar and wind price factors. Set as a single objective so that
+        #   re-solves after in-place updates warm start from the previous basis
+        self.model.setObjective(make_capex_objective(self),gp.GRB.MINIMIZE)
 
         # #---
         # # Maximise storage
@@ -267,7 +347,7 @@ class nextra():
         # SUPER NODES
         #------------------
 
-        if not self.super_source:
+        if not self.super_source or (self.scaling and is_unbounded(self.global_variables['super_source_maximum'])):
             pass
         else:
             # constrain
@@ -295,62 +375,31 @@ class nextra():
                          for k in self.commodities),'res_curtailment')
         
         
-        #----------------------------------------------------------------------
-        # ARC FLOW BOUNDS
-        #----------------------------------------------------------------------
-
-        upper_bound = make_edge_bound_dict(self,bound_column='maximum')
-        lower_bound = make_edge_bound_dict(self,bound_column='minimum')
-        
-        # Flows must be below upper bounds
-        self.model.addConstrs(
-            (self.arcFlows[i,j,k,t] <= upper_bound[i,j,k,t]
-                 for i,j,k,t in self.arcFlows),'upper_bound')
-
-        # Flows must be above lower bounds
-        self.model.addConstrs(
-            (lower_bound[i,j,k,t] <= self.arcFlows[i,j,k,t]
-                 for i,j,k,t in self.arcFlows),'lower_bound')
-
-
-
         #----------------------------------------------------------------------
         # CAPACITY CHANGES
         #----------------------------------------------------------------------
         
-        # get initial capacities as dict
-        expandable_nodes = make_nodal_capacity_dict(self)
-        
         # capacity changes
-        for y in self.years:
-            timesteps_by_year = get_timesteps_by_year(self,y)
-            timestep_1 = self.time_ref[self.time_ref.year==y].timestep.min()
-            if y==2019:
-                # capacity at t=1 as defined in nodal file
-                self.model.addConstrs((
-                    self.capacity_indices[n,k,t] \
-                        == expandable_nodes[n,k]
-                            for n,k,t in self.capacity_indices if t==1),'init_cap')
-                # capacity at t>1
-                self.model.addConstrs((
-                    self.capacity_indices[n,k,t] == \
-                        self.capacity_indices[n,k,t-1] + self.capacity_change[n,k,t]
-                            for n,k,t in self.capacity_indices if t>1),'cap_after_init')
-                # no change in capacity in 2019
-                self.model.addConstrs((
-                    self.capacity_change[n,k,t] == 0
-                        for n,k,t in self.capacity_indices
-                            if t in timesteps_by_year),'cap_changes')
-            else:
-                # capacity at t>1
-                self.model.addConstrs((
-                    self.capacity_indices[n,k,t] == \
-                        self.capacity_indices[n,k,t-1] + self.capacity_change[n,k,t]
-                            for n,k,t in self.capacity_indices if t>timestep_1),'cap_after_init')
-                # one change per year
-                self.model.addConstrs((
-                    self.capacity_change[n,k,t] == 0
-                        for n,k,t in self.capacity_indices if t>timestep_1),'cap_changes')
+        #   capacity is held constant within each year and can only change
+        #   in the first modelled year after the 2019 baseline
+        years       = sorted(self.years)
+        change_year = get_capacity_change_year(self)
+        if 2019 in years:
+            # capacity in 2019 as defined in nodal file
+            self.model.addConstrs((
+                self.annual_capacity[n,k,y] \
+                    == self.params.initial_capacity_of(n)
+                        for n,k,y in self.annual_capacity if y==2019),'init_cap')
+        # capacity after the first year
+        self.model.addConstrs((
+            self.annual_capacity[n,k,y] == \
+                self.annual_capacity[n,k,years[years.index(y)-1]] + self.capacity_change[n,k,y]
+                    for n,k,y in self.annual_capacity if y>years[0]),'cap_after_init')
+        # no change in capacity in 2019 or after the first change
+        self.model.addConstrs((
+            self.capacity_change[n,k,y] == 0
+                for n,k,y in self.capacity_change
+                    if y==2019 or y>change_year),'cap_changes')
         
 
         
@@ -360,13 +409,11 @@ class nextra():
         
         # get demand nodes
         sink_nodes = get_sink_nodes(self.nodes).name.to_list()
-        # get demand dict
-        demand_dict = make_demand_dict(self)
 
-        # constrain
-        self.model.addConstrs(
+        # constrain (rows kept as {(t,j) : constr} for marginal prices)
+        self.demand_constrs = self.model.addConstrs(
             (self.arcFlows.sum('*',j,'electricity',t) \
-                 == demand_dict[j,t] * self.global_variables['peak_demand_factor'] \
+                 == self.params.flow_at(j,t) * self.global_variables['peak_demand_factor'] \
                      for t in self.timesteps 
                          for j in sink_nodes),'energy_demand')
         
@@ -384,8 +431,6 @@ class nextra():
         # get rid of solar and wind
         source_nodes = [i for i in source_nodes if 'solar' not in i]
         source_nodes = [i for i in source_nodes if 'wind' not in i]
-        # get supply dict
-        supply_dict  = make_supply_dict(self)
 
         # constrain
         self.model.addConstrs(
@@ -424,16 +469,28 @@ class nextra():
                     self.model.addConstrs(
                         (self.arcFlows.sum(i,'*',k,t) - \
                             self.arcFlows.sum(i,'*',k,t-1) <= ramping_rate \
-                                for t in self.timesteps if t>1 \
+                                for t in self.timesteps if t not in self.time.starts \
                                     for k in ['electricity'] \
                                         for i in idx_nodes),technology+'_supply')
                     # case if negative change
                     self.model.addConstrs(
                         (self.arcFlows.sum(i,'*',k,t) - \
                             self.arcFlows.sum(i,'*',k,t-1) >= -ramping_rate \
-                                for t in self.timesteps if t>1 \
+                                for t in self.timesteps if t not in self.time.starts \
                                     for k in ['electricity'] \
                                         for i in idx_nodes),technology+'_supply')
+                    # ramping from supply preceding the first timestep (e.g. previous window)
+                    initial_dispatch = get_initial_dispatch(self)
+                    self.model.addConstrs(
+                        (self.arcFlows.sum(i,'*',k,t) - initial_dispatch[i,k] <= ramping_rate \
+                            for t in self.timesteps if t in self.time.starts \
+                                for k in ['electricity'] \
+                                    for i in idx_nodes if (i,k) in initial_dispatch),technology+'_supply_init')
+                    self.model.addConstrs(
+                        (self.arcFlows.sum(i,'*',k,t) - initial_dispatch[i,k] >= -ramping_rate \
+                            for t in self.timesteps if t in self.time.starts \
+                                for k in ['electricity'] \
+                                    for i in idx_nodes if (i,k) in initial_dispatch),technology+'_supply_init')
 
         # open-cycle gas turbine (OCGT) generation
         # baseload_supply(technology='ocgt',ramping_rate=self.global_variables['ocgt_ramping_rate'])
@@ -462,39 +519,44 @@ class nextra():
         storage_caps  = storage_nodes.set_index(keys=['name','commodity']).to_dict()['capacity']
         
         # constrain
-        self.model.addConstrs(
-            (self.storage_volume.sum(n,k,t) <= self.capacity_indices.sum(n,k,t) \
-                 for n,k,t in self.storage_volume \
-                     if (n,k) in storage_caps),'stor_cap_max')
+        #   with representative periods, see link_storage_between_periods
+        if self.representative_periods is None:
+            self.model.addConstrs(
+                (self.storage_volume.sum(n,k,t) <= self.capacity_indices.sum(n,k,t) \
+                     for n,k,t in self.storage_volume \
+                         if (n,k) in storage_caps),'stor_cap_max')
     
         #---
         # Storage node balance
         storage_nodes = storage_nodes.name.to_list()
     
         # t=1
+        #   volumes start at 0 unless carried over from a previous window (see rolling.py)
+        initial_storage = get_initial_storage(self)
         self.model.addConstrs(
             (self.storage_volume.sum(j,k,t) == \
-             0 + self.arcFlows.sum('*',j,k,t) - self.arcFlows.sum(j,'*',k,t) \
+             initial_storage.get((j,k),0) + self.arcFlows.sum('*',j,k,t) - self.arcFlows.sum(j,'*',k,t) \
                  for k in self.commodities \
-                     for t in self.timesteps if t==1 \
+                     for t in self.timesteps if t in self.time.starts \
                          for j in storage_nodes if (j,k) in storage_caps),'storage_init')
         # t>1
         self.model.addConstrs(
             (self.storage_volume.sum(j,k,t) == \
                  self.storage_volume.sum(j,k,t-1) + self.arcFlows.sum('*',j,k,t) - self.arcFlows.sum(j,'*',k,t) \
                      for k in self.commodities \
-                         for t in self.timesteps if t>1 \
+                         for t in self.timesteps if t not in self.time.starts \
                              for j in storage_nodes if (j,k) in storage_caps),'storage_balance')
         
         #---
         # Battery minimum capacity level to maintain (helps increase battery life)
         #   ---> start at t=10 to allow time for battery to charge up
-        self.model.addConstrs(
-            (self.storage_volume.sum(i,k,t) >= \
-                 global_variables['battery_minimum_level'] * self.capacity_indices.sum(i,k,t) \
-                     for k in self.commodities \
-                         for t in self.timesteps if t>10 \
-                             for i in storage_nodes if (i,k) in storage_caps),'bat_min_lev')
+        if self.representative_periods is None:
+            self.model.addConstrs(
+                (self.storage_volume.sum(i,k,t) >= \
+                     global_variables['battery_minimum_level'] * self.capacity_indices.sum(i,k,t) \
+                         for k in self.commodities \
+                             for t in self.timesteps if t>10 \
+                                 for i in storage_nodes if (i,k) in storage_caps),'bat_min_lev')
         
             
         #----------------------------------------------------------------------
@@ -533,8 +595,6 @@ class nextra():
         
         # get solar nodes
         solar_nodes = get_nodes_by_technology(self.nodes, technology='solar')
-        # get supply dict
-        supply_dict = make_supply_dict(self)
         
         # loop through each region
         for region in adjust_nodal_names(self.nodes.territory).unique():
@@ -547,7 +607,7 @@ class nextra():
                      == global_variables['loss_factor_transmission'] * \
                             global_variables['reserve_capacity_factor'] * \
                                 global_variables['loss_factor_maintenance_res'] * \
-                                    self.capacity_indices.sum(i,k,t) * supply_dict[region+'_solar',t] \
+                                    self.capacity_indices.sum(i,k,t) * self.params.flow_at(region+'_solar',t) \
                                         for t in self.timesteps \
                                             for k in self.commodities \
                                                 for i in solar_asset),'solar_supply')
@@ -571,7 +631,7 @@ class nextra():
                      == global_variables['loss_factor_transmission'] * \
                             global_variables['reserve_capacity_factor'] * \
                                 global_variables['loss_factor_maintenance_res'] * \
-                                    self.capacity_indices.sum(i,k,t) * supply_dict[region+'_wind',t] \
+                                    self.capacity_indices.sum(i,k,t) * self.params.flow_at(region+'_wind',t) \
                                         for t in self.timesteps \
                                             for k in self.commodities \
                                                 for i in wind_asset),'wind_supply')
@@ -584,38 +644,10 @@ class nextra():
         # Expressed as a function of demand
         #   Constrained as: SUM_CURTAILMENT <= x * SUM_DEMAND
         #       where, x is a fractional quantity defined in global variables
+        #   and sums over the year are annual energy of arcs (see energy.py)
 
-        if not self.curtailment:
-            pass
-        else:
-            self.model.addConstr(
-                gp.quicksum(
-                    # sum of curtailment
-                    (self.arcFlows['gaza_solar','curtailment',k,t] \
-                        + self.arcFlows['israel_solar','curtailment',k,t] \
-                        + self.arcFlows['israel_wind','curtailment',k,t] \
-                        + self.arcFlows['jordan_solar','curtailment',k,t] \
-                        + self.arcFlows['jordan_wind','curtailment',k,t] \
-                        + self.arcFlows['west_bank_solar','curtailment',k,t] \
-                        + self.arcFlows['west_bank_wind','curtailment',k,t] \
-                            for k in self.commodities
-                                    for t in self.timesteps))
-                <= \
-                gp.quicksum(
-                    (global_variables['maximum_curtailment'] * \
-                        (self.arcFlows['gaza_generation','gaza_energy_demand',k,t] \
-                            + self.arcFlows['israel_generation','gaza_energy_demand',k,t]
-                            + self.arcFlows['israel_generation','israel_energy_demand',k,t]
-                            + self.arcFlows['israel_generation','jordan_energy_demand',k,t]
-                            + self.arcFlows['israel_generation','west_bank_energy_demand',k,t]
-                            + self.arcFlows['jordan_generation','israel_energy_demand',k,t]
-                            + self.arcFlows['jordan_generation','jordan_energy_demand',k,t]
-                            + self.arcFlows['jordan_generation','west_bank_energy_demand',k,t]
-                            + self.arcFlows['west_bank_generation','israel_energy_demand',k,t]
-                            + self.arcFlows['west_bank_generation','jordan_energy_demand',k,t]
-                            + self.arcFlows['west_bank_generation','west_bank_energy_demand',k,t]) \
-                            for k in self.commodities
-                                for t in self.timesteps)),'max_curtail')
+        if self.curtailment:
+            add_max_curtailment(self)
 
 
 
@@ -630,32 +662,32 @@ class nextra():
         for i in ['israel','jordan','west_bank','gaza']:
             if i != 'gaza':
                 self.model.addConstrs(
-                    (self.capacity_indices[i + '_battery_storage',k,t] >= \
-                        global_variables['battery_capacity_min_percentage'] * (self.capacity_indices[i + '_solar',k,t] + self.capacity_indices[i + '_wind',k,t]) \
+                    (self.annual_capacity[i + '_battery_storage',k,y] >= \
+                        global_variables['battery_capacity_min_percentage'] * (self.annual_capacity[i + '_solar',k,y] + self.annual_capacity[i + '_wind',k,y]) \
                         for k in self.commodities \
-                            for t in self.timesteps),'bat_min')
+                            for y in self.years),'bat_min')
             else:
                 self.model.addConstrs(
-                    (self.capacity_indices[i + '_battery_storage',k,t] >= \
-                        global_variables['battery_capacity_min_percentage'] * (self.capacity_indices[i + '_solar',k,t]) \
+                    (self.annual_capacity[i + '_battery_storage',k,y] >= \
+                        global_variables['battery_capacity_min_percentage'] * (self.annual_capacity[i + '_solar',k,y]) \
                         for k in self.commodities \
-                            for t in self.timesteps),'bat_min')
+                            for y in self.years),'bat_min')
         
         #---
         # Battery storage maximum capacity
         for i in ['israel','jordan','west_bank','gaza']:
             if i != 'gaza':
                 self.model.addConstrs(
-                    (self.capacity_indices[i + '_battery_storage',k,t] <= \
-                        global_variables['battery_capacity_max_percentage'] * (self.capacity_indices[i + '_solar',k,t] + self.capacity_indices[i + '_wind',k,t]) \
+                    (self.annual_capacity[i + '_battery_storage',k,y] <= \
+                        global_variables['battery_capacity_max_percentage'] * (self.annual_capacity[i + '_solar',k,y] + self.annual_capacity[i + '_wind',k,y]) \
                         for k in self.commodities \
-                            for t in self.timesteps),'bat_min')
+                            for y in self.years),'bat_min')
             else:
                 self.model.addConstrs(
-                    (self.capacity_indices[i + '_battery_storage',k,t] <= \
-                        global_variables['battery_capacity_max_percentage'] * (self.capacity_indices[i + '_solar',k,t]) \
+                    (self.annual_capacity[i + '_battery_storage',k,y] <= \
+                        global_variables['battery_capacity_max_percentage'] * (self.annual_capacity[i + '_solar',k,y]) \
                         for k in self.commodities \
-                            for t in self.timesteps),'bat_min')
+                            for y in self.years),'bat_min')
 
         #---
         # Battery inflow cannot exceed capacity
@@ -677,8 +709,8 @@ class nextra():
         # Battery dynamics
         #---
 
-        charging_timesteps      = self.flows.loc[self.flows.hour.isin(global_variables['battery_charge_hours'])].timestep.to_list()
-        discharging_timesteps   = self.flows.loc[~self.flows.hour.isin(global_variables['battery_charge_hours'])].timestep.to_list()
+        charging_timesteps      = self.time.select(charging=True).tolist()
+        discharging_timesteps   = self.time.select(charging=False).tolist()
 
         # Set maximum charging rate
         self.model.addConstrs(
@@ -704,7 +736,7 @@ class nextra():
             (self.arcFlows.sum('*',j,k,t) == 0 \
                 for j in battery_nodes \
                     for k in ['electricity'] \
-                        for t in self.timesteps if t not in charging_timesteps),'bat_dischg')
+                        for t in discharging_timesteps),'bat_dischg')
 
         
         #---
@@ -792,871 +824,78 @@ class nextra():
                             ]
         # constr
         self.model.addConstrs(
-            (self.capacity_indices[n,k,t] >= self.nodes.loc[self.nodes.name==n,'capacity'].values[0]\
+            (self.annual_capacity[n,k,y] >= self.params.initial_capacity_of(n)\
                  for n in renewable_assets \
                      for k in ['electricity'] \
-                         for t in self.timesteps),'res_decom')
-
-            
-        #----------------------------------------------------------------------
-        # TARGETS FOR 2030
-        #----------------------------------------------------------------------
-        
-        timesteps_2030 = get_timesteps_by_year(self, year=2030)
-        
-        #---
-        # Emissions reductions
-        #---
-
-        # 
-        emission_reduction = \
-                (1-global_variables['emissions_reduction_2030']) * (global_variables['BAS_emissions_in_2030']/(24*365)) * len(self.timesteps) * 10**6
-                #0.7 * 61343/(24*365) * len(self.timesteps) * 10**6 >= \
-
-        if self.scenario != 'BAS':
-            # constr 
-            self.model.addConstr( \
-                emission_reduction >= \
-                    gp.quicksum( \
-                        # diesel
-                        (co2['Diesel'] * \
-                            (self.arcFlows['israel_diesel','israel_generation',k,t] \
-                                + self.arcFlows['jordan_diesel','jordan_generation',k,t] \
-                                + self.arcFlows['west_bank_diesel','west_bank_generation',k,t]
-                                + self.arcFlows['gaza_diesel','gaza_generation',k,t])) \
-                        # gas
-                        + (co2['Gas'] * \
-                            (self.arcFlows['israel_natural_gas','israel_gas_storage',k,t] \
-                                + self.arcFlows['jordan_natural_gas','jordan_generation',k,t] \
-                                + self.arcFlows['gaza_natural_gas','gaza_generation',k,t] \
-                                + self.arcFlows['west_bank_natural_gas','west_bank_generation',k,t]))
-                        # ccgt
-                        + (co2['Gas'] * \
-                            (self.arcFlows['israel_ccgt','israel_generation',k,t] \
-                                + self.arcFlows['jordan_ccgt','jordan_generation',k,t] \
-                                + self.arcFlows['west_bank_ccgt','west_bank_generation',k,t]))
-                        # coal
-                        + (co2['Coal'] * \
-                            (self.arcFlows['israel_coal','israel_generation',k,t] \
-                                + self.arcFlows['jordan_coal','jordan_generation',k,t] \
-                                + self.arcFlows['west_bank_coal','west_bank_generation',k,t]))
-                        # shale
-                        + (co2['Shale'] * \
-                            (self.arcFlows['jordan_shale','jordan_generation',k,t]))
-                        for k in ['electricity']
-                            for t in self.timesteps if t in timesteps_2030),'emission_reduction')
-
-
-        #---
-        # Israel's energy targets
-        #---
-
-        # No high carbon energy technologies in 2030
-        high_carbon_techs   = ['israel_coal', 'israel_diesel']
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] == 0\
-                 for n,k,t in self.capacity_indices \
-                     if t in timesteps_2030 and n in high_carbon_techs),'isr_carb1')
-
-        # There can only be a maximum of 700 MW of wind capacity due to land constraints
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] <= self.global_variables['isr_max_wind_cap']\
-                 for n in ['israel_wind']\
-                     for k in ['electricity']\
-                         for t in self.timesteps),'isr_wind')
-
-        # Additional capacity of carbon-intensive technologies cannot be built
-        high_carbon_techs = ['israel_coal', 'israel_diesel']
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] <= self.capacity_indices[n,k,t-1]\
-                 for n,k,t in self.capacity_indices\
-                     if t>1 and n in high_carbon_techs),'isr_carb2')
-
-        # There must be a minimum amount of natural gas
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] >= self.nodes.loc[self.nodes.name==n,'capacity'].values[0]\
-                 for n in ['israel_natural_gas']\
-                     for k in ['electricity']\
-                         for t in self.timesteps),'isr_ng')
-
-        # There must be 3400 MW of ccgt
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] == self.global_variables['isr_max_ccgt_cap']\
-                 for n in ['israel_ccgt']\
-                     for k in ['electricity']\
-                         for t in self.timesteps\
-                             if t in timesteps_2030),'isr_ccgt')
-        
-        # Israel's storage targets
-        #   >>> zero out gas storages
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] == 0\
-                 for n in ['israel_gas_storage']\
-                     for k in ['electricity']\
-                         for t in self.timesteps\
-                             if t in timesteps_2030),'isr_storage')
-        
-            
-        #---
-        # Jordan's energy targets
-        #---
+                         for y in self.years),'res_decom')
 
-        # No high carbon energy technologies in 2030
-        high_carbon_techs   = ['jordan_coal', 'jordan_diesel', 'jordan_ccgt']
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] == 0\
-                 for n,k,t in self.capacity_indices\
-                     if t in timesteps_2030 and n in high_carbon_techs),'jor_carbon')
 
-        # jordan_solar should be more than baseline
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] >= self.nodes.loc[self.nodes.name==n,'capacity'].values[0]\
-                 for n in ['jordan_solar']\
-                     for k in ['electricity']\
-                         for t in self.timesteps),'jor_sol1')
-
-        # jordan_natural_gas should be more than baseline
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] >= self.nodes.loc[self.nodes.name==n,'capacity'].values[0]\
-                 for n in ['jordan_natural_gas']\
-                     for k in ['electricity']\
-                         for t in self.timesteps),'jor_sol2')
-        
-        
-        #---
-        # West Bank's energy targets
-        #---
-
-        # Wind in West Bank
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] == 50\
-                 for n in ['west_bank_wind']\
-                     for k in ['electricity']\
-                         for t in timesteps_2030),'wb_wind')
-        
-        # Baseload technologies in West Bank (#,'west_bank_natural_gas')
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] == 0\
-                 for n in ['west_bank_coal','west_bank_ccgt','west_bank_diesel']\
-                     for k in ['electricity']\
-                         for t in timesteps_2030),'wb_baseload')
-
-
-        #---
-        # Gaza's energy targets
-        #---
+    def build_targets(self):
+        '''Build 2030 targets and scenario-specific energy goals: rows of the policy
+            table (policy_targets, see policy.py) that apply to the scenario
+        '''
+        add_policy_targets(self)
 
-        # gaza_diesel is 0 MW due to plans to convert existing plant to gas
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] == 0\
-                 for n in ['gaza_diesel']\
-                     for k in ['electricity']\
-                         for t in timesteps_2030),'gaza_diesel')
-        
-        # # Solar in Gaza
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] >= 0\
-                 for n in ['gaza_solar']\
-                     for k in ['electricity']\
-                         for t in timesteps_2030),'gaza_solar')
-        
-        # Natural gas in Gaza at least capacity of diesel today (due to plans to convert existing plant to gas)
-        self.model.addConstrs(
-            (self.capacity_indices[n,k,t] >= self.global_variables['gaz_diesel_cap']\
-                 for n in ['gaza_natural_gas']\
-                     for k in ['electricity']\
-                         for t in timesteps_2030),'gaza_ng')
-        
 
-        #---
-        # CAPACITY RATIOS
-        #---
-        
-        # # Jordan wind ratio
-        # self.model.addConstrs(
-        #     (self.capacity_indices['jordan_solar',k,t] * 0.2 >= self.capacity_indices['jordan_wind',k,t]\
-        #         for k in ['electricity']\
-        #             for t in self.timesteps),'jor_wind')
-        
-        # # Israel wind ratio
-        # self.model.addConstrs(
-        #     (self.capacity_indices['israel_solar',k,t] * 0.05 >= self.capacity_indices['israel_wind',k,t]\
-        #         for k in ['electricity']\
-        #             for t in self.timesteps),'isr_wind_ratio')
-            
+    def set_self_sufficiency_factor(self,ss_factor):
+        '''Update self-sufficiency factor of the built model in place (re-solve with run)
+        '''
+        self.ss_factor = ss_factor
+        update_factor_constrs(self,'ss_factor')
 
-        #----------------------------------------------------------------------
-        # ENERGY GOALS
-        #----------------------------------------------------------------------
-        
-        # The following constraints are only implemented if the
-        #   energy_objectives parameter is True. This is activated by default.
-        
-        if self.energy_objective is True:
-            
-            #========================================
-            # BUSINESS AS USUAL
-            #========================================
-            
-            if self.scenario == 'BAU':
-            
-                #-----
-                # ISRAEL
-                #-----
-        
-                # [1] RES
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['isr_res_target_2030'] * self.res_factor * \
-                            (self.arcFlows['israel_generation','israel_energy_demand',k,t] \
-                                + self.arcFlows['israel_generation','west_bank_energy_demand',k,t] \
-                                + self.arcFlows['israel_generation','gaza_energy_demand',k,t])
-                                    for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['israel_solar','israel_generation',k,t] \
-                            + self.arcFlows['israel_wind','israel_generation',k,t] \
-                                + self.arcFlows['israel_solar','israel_battery_storage',k,t] \
-                                    + self.arcFlows['israel_wind','israel_battery_storage',k,t]) \
-                                        for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030),'isr_res')
-                
-                # # [2] NATURAL GAS
-                # self.model.addConstr( \
-                #     gp.quicksum( \
-                #         self.global_variables['isr_ng_target_2030'] *  \
-                #             (self.arcFlows['israel_generation','israel_energy_demand',k,t] \
-                #             + self.arcFlows['israel_generation','west_bank_energy_demand',k,t] \
-                #             + self.arcFlows['israel_generation','gaza_energy_demand',k,t])
-                #                 for k in ['electricity']
-                #                         for t in self.timesteps if t in timesteps_2030) \
-                #     <= \
-                #     gp.quicksum( \
-                #         (self.arcFlows['israel_natural_gas','israel_gas_storage',k,t] \
-                #             + self.arcFlows['israel_ccgt','israel_generation',k,t])
-                #                 for k in ['electricity']
-                #                     for t in self.timesteps if t in timesteps_2030),'isr_ng')
-            
-                #-----
-                # JORDAN
-                #-----
-        
-                # [1] RES
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['jor_res_target_2030'] * self.res_factor * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t] \
-                                + self.arcFlows['jordan_generation','west_bank_energy_demand',k,t] \
-                                    + self.arcFlows['jordan_generation','israel_energy_demand',k,t])
-                                        for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['jordan_solar','jordan_generation',k,t] \
-                            + self.arcFlows['jordan_wind','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_solar','jordan_battery_storage',k,t] \
-                                    + self.arcFlows['jordan_wind','jordan_battery_storage',k,t]) \
-                                        for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030),'jor_res')
-                
-                # [2] NATURAL GAS
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['jor_ng_target_2030'] * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t] \
-                                + self.arcFlows['jordan_generation','west_bank_energy_demand',k,t] \
-                                + self.arcFlows['jordan_generation','israel_energy_demand',k,t])
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['jordan_natural_gas','jordan_generation',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'jor_ng')
-        
-                # [3] SHALE OIL
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['jor_shale_target_2030'] * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t] \
-                                + self.arcFlows['jordan_generation','west_bank_energy_demand',k,t] \
-                                + self.arcFlows['jordan_generation','israel_energy_demand',k,t])
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['jordan_shale','jordan_generation',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'jor_shale')
-    
-    
-                #-----
-                # WEST BANK
-                #-----
-        
-                # [1] RES
-                # <<<<< Does not apply >>>>>
 
-                # [2] NO CAPACITY ADDITIONS ALLOWED UNDER BAU
-                unexpandable = ['west_bank_natural_gas']
-                self.model.addConstrs(
-                    (self.capacity_indices[n,k,t] == 0\
-                        for n in unexpandable\
-                            for k in ['electricity']\
-                                for t in self.timesteps),'wb_gas_change')
-                
-                # [3] SELF-SUFFICIENCY
-                self.model.addConstr(
-                    gp.quicksum( \
-                        self.ss_factor * \
-                            # sum of total demand
-                            (self.arcFlows['west_bank_generation',j,k,t] \
-                                + self.arcFlows['israel_generation',j,k,t] \
-                                    + self.arcFlows['jordan_generation',j,k,t])
-                                        for j in ['west_bank_energy_demand']
-                                            for k in ['electricity']
-                                                for t in self.timesteps if t in timesteps_2030)
-                    == \
-                    gp.quicksum( \
-                        (self.arcFlows['west_bank_generation','west_bank_energy_demand',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'wb_ss')
-        
-        
-                #-----
-                # GAZA
-                #-----
-        
-                # [1] RES
-                # <<<<< Does not apply >>>>>
-
-                # # [2] NO CAPACITY ADDITIONS ALLOWED UNDER BAU
-                # unexpandable = ['gaza_natural_gas']
-                # self.model.addConstrs(
-                #     (self.capacity_indices[n,k,t] == 0\
-                #         for n in unexpandable\
-                #             for k in ['electricity']\
-                #                 for t in self.timesteps),'gz_gas_change')
-
-                # [3] SELF-SUFFICIENCY
-                self.model.addConstr(
-                    gp.quicksum( \
-                        self.ss_factor * \
-                            # sum of total demand
-                            (self.arcFlows['gaza_generation',j,k,t] \
-                                + self.arcFlows['israel_generation',j,k,t] \
-                                    + self.arcFlows['egypt_generation',j,k,t])
-                                        for j in ['gaza_energy_demand']
-                                            for k in ['electricity']
-                                                for t in self.timesteps if t in timesteps_2030) \
-                    == \
-                    gp.quicksum( \
-                        (self.arcFlows['gaza_generation','gaza_energy_demand',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'gaz_ss')
-            
-            
-            #========================================
-            # NON-COOPERATIVE
-            #========================================
-            
-            if self.scenario == 'NCO':
-                            
-                #-----
-                # ISRAEL
-                #-----
-        
-                # [1] RES
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['isr_res_target_2030'] * self.res_factor * \
-                            (self.arcFlows['israel_generation','israel_energy_demand',k,t])
-                                    for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['israel_solar','israel_generation',k,t] \
-                            + self.arcFlows['israel_wind','israel_generation',k,t] \
-                                + self.arcFlows['israel_solar','israel_battery_storage',k,t] \
-                                    + self.arcFlows['israel_wind','israel_battery_storage',k,t]) \
-                                        for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030),'isr_res')
-                
-                # [2] NATURAL GAS
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['isr_ng_target_2030'] *  \
-                            (self.arcFlows['israel_generation','israel_energy_demand',k,t])
-                                for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['israel_natural_gas','israel_gas_storage',k,t] \
-                            + self.arcFlows['israel_ccgt','israel_generation',k,t])
-                                for k in ['electricity']
-                                    for t in self.timesteps if t in timesteps_2030),'isr_ng')
-                
-                
-                #-----
-                # JORDAN
-                #-----
-        
-                # [1] RES
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['jor_res_target_2030'] * self.res_factor * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t])
-                                for k in ['electricity']
-                                    for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['jordan_solar','jordan_generation',k,t] \
-                            + self.arcFlows['jordan_wind','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_solar','jordan_battery_storage',k,t] \
-                                    + self.arcFlows['jordan_wind','jordan_battery_storage',k,t]) \
-                                        for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030),'jor_res')
-                
-                # [2] NATURAL GAS
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['jor_ng_target_2030'] * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t])
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['jordan_natural_gas','jordan_generation',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'jor_ng')
-        
-                # [3] SHALE OIL
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['jor_shale_target_2030'] * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t] )
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['jordan_shale','jordan_generation',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'jor_shale')
-                
-                
-                #-----
-                # WEST BANK
-                #-----
-        
-                # [1] RES
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['pal_res_target_2030'] * self.res_factor * \
-                            (self.arcFlows['west_bank_generation','west_bank_energy_demand',k,t])
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['west_bank_solar','west_bank_generation',k,t] \
-                            + self.arcFlows['west_bank_wind','west_bank_generation',k,t] \
-                                + self.arcFlows['west_bank_solar','west_bank_battery_storage',k,t] \
-                                    + self.arcFlows['west_bank_wind','west_bank_battery_storage',k,t])
-                                        for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030),'wb_res')
-                
-                # [2] SELF-SUFFICIENCY
-                # <<<<< Does not apply >>>>>
-                
-                
-                #-----
-                # GAZA
-                #-----
-        
-                # [1] RES (no wind in gaza)
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['gaz_res_target_2030'] * self.res_factor * \
-                            (self.arcFlows['gaza_generation','gaza_energy_demand',k,t])
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['gaza_solar','gaza_generation',k,t] \
-                            + self.arcFlows['gaza_solar','gaza_battery_storage',k,t])
-                                for k in ['electricity']
-                                    for t in self.timesteps if t in timesteps_2030),'gaza_res')
-                
-                # [2] SELF-SUFFICIENCY
-                # <<<<< Does not apply >>>>>
-            
-            
-            #========================================
-            # EXTENDED ARAB GRID
-            #========================================
-            
-            if self.scenario == 'EAG':
-            
-                #-----
-                # ISRAEL
-                #-----
-
-                # [1] RES
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['isr_res_target_2030'] * self.res_factor * \
-                            (self.arcFlows['israel_generation','israel_energy_demand',k,t])
-                                    for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['israel_solar','israel_generation',k,t] \
-                            + self.arcFlows['israel_wind','israel_generation',k,t] \
-                                + self.arcFlows['israel_solar','israel_battery_storage',k,t] \
-                                    + self.arcFlows['israel_wind','israel_battery_storage',k,t]) \
-                                        for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030),'isr_res')
-                
-                # [2] NATURAL GAS
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['isr_ng_target_2030'] *  \
-                            (self.arcFlows['israel_generation','israel_energy_demand',k,t])
-                                for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['israel_natural_gas','israel_gas_storage',k,t] \
-                            + self.arcFlows['israel_ccgt','israel_generation',k,t])
-                                for k in ['electricity']
-                                    for t in self.timesteps if t in timesteps_2030),'isr_ng')
-                
-                
-                #-----
-                # JORDAN
-                #-----
-        
-                # [1] RES
-                # <<<<< Does not apply >>>>>
-                
-                # [2] NATURAL GAS
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['jor_ng_target_2030'] * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t])
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['jordan_natural_gas','jordan_generation',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'jor_ng')
-        
-                # [3] SHALE OIL
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['jor_shale_target_2030'] * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t] )
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        (self.arcFlows['jordan_shale','jordan_generation',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'jor_shale')
-                
-                
-                #-----
-                # WEST BANK
-                #-----
-        
-                # [1] RES
-                # <<<<< Does not apply >>>>>
-                
-                # [2] SELF-SUFFICIENCY
-                self.model.addConstr(
-                    gp.quicksum( \
-                        self.ss_factor * \
-                            # sum of total demand
-                            (self.arcFlows['west_bank_generation',j,k,t] \
-                                + self.arcFlows['israel_generation',j,k,t] \
-                                    + self.arcFlows['jordan_generation',j,k,t])
-                                        for j in ['west_bank_energy_demand']
-                                            for k in ['electricity']
-                                                for t in self.timesteps if t in timesteps_2030)
-                    == \
-                    gp.quicksum( \
-                        (self.arcFlows['west_bank_generation','west_bank_energy_demand',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'wb_ss')
-                
-                # [3] CAPACITY ADDITIONS IN WEST BANK UNDER EAG
-                unexpandable = ['west_bank_natural_gas']
-                self.model.addConstrs(
-                    (self.capacity_indices[n,k,t] == 0\
-                        for n in unexpandable\
-                            for k in ['electricity']\
-                                for t in self.timesteps),'wb_gas_change')
+    def set_coo_factor(self,coo_factor):
+        '''Update cooperative RES target of the built model in place (re-solve with run)
+        '''
+        self.coo_factor = coo_factor
+        update_factor_constrs(self,'coo_factor')
 
-                self.model.addConstrs(
-                    (self.capacity_indices['west_bank_solar',k,t] <= 1500 \
-                        for n in unexpandable\
-                            for k in ['electricity']\
-                                for t in self.timesteps),'wb_solar_chg')
-                
-                #-----
-                # GAZA
-                #-----
-    
-                # [1] RES (hard coded as with NCO scenario)
-                self.model.addConstrs(
-                    (self.capacity_indices[n,k,t] == 2535\
-                        for n in ['gaza_solar']\
-                            for k in ['electricity']\
-                                for t in self.timesteps),'gaza_sol_hard')
 
-                self.model.addConstrs(
-                    (self.capacity_indices[n,k,t] == 2028\
-                        for n in ['gaza_battery_storage']\
-                            for k in ['electricity']\
-                                for t in self.timesteps),'gaza_sol_hard')
-
-                # self.model.addConstr( \
-                #     gp.quicksum( \
-                #         self.global_variables['gaz_res_target_2030'] * self.res_factor * \
-                #             (self.arcFlows['gaza_generation','gaza_energy_demand',k,t])
-                #                     for k in ['electricity']
-                #                         for t in self.timesteps if t in timesteps_2030) \
-                #     <= \
-                #     gp.quicksum( \
-                #         (self.arcFlows['gaza_solar','gaza_generation',k,t] \
-                #             + self.arcFlows['gaza_solar','gaza_battery_storage',k,t])
-                #                 for k in ['electricity']
-                #                     for t in self.timesteps if t in timesteps_2030),'gaza_res')
-            
-                # [2] SELF-SUFFICIENCY
-                self.model.addConstr(
-                    gp.quicksum( \
-                        self.ss_factor * \
-                            # sum of total demand
-                            (self.arcFlows['gaza_generation',j,k,t] \
-                                + self.arcFlows['israel_generation',j,k,t] \
-                                    + self.arcFlows['egypt_generation',j,k,t])
-                                        for j in ['gaza_energy_demand']
-                                            for k in ['electricity']
-                                                for t in self.timesteps if t in timesteps_2030) \
-                    == \
-                    gp.quicksum( \
-                        (self.arcFlows['gaza_generation','gaza_energy_demand',k,t])
-                            for k in ['electricity']
-                                for t in self.timesteps if t in timesteps_2030),'gaz_ss')
-
-                #-----
-                # JORDAN AND PALESTINE INTEGRATED RES TARGET
-                #-----
-                
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        self.global_variables['eag_res_target_2030'] * self.res_factor * \
-                            (self.arcFlows['jordan_generation','jordan_energy_demand',k,t] \
-                                + self.arcFlows['jordan_generation','west_bank_energy_demand',k,t] \
-                                    + self.arcFlows['west_bank_generation','west_bank_energy_demand',k,t]\
-                                        + self.arcFlows['gaza_generation','gaza_energy_demand',k,t])
-                                            for k in ['electricity']
-                                                    for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        ( # jordan
-                        self.arcFlows['jordan_solar','jordan_generation',k,t] \
-                            + self.arcFlows['jordan_wind','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_solar','jordan_battery_storage',k,t] \
-                                    + self.arcFlows['jordan_wind','jordan_battery_storage',k,t] \
-                                    # west bank
-                                    + self.arcFlows['west_bank_solar','west_bank_generation',k,t] \
-                                        + self.arcFlows['west_bank_wind','west_bank_generation',k,t] \
-                                            + self.arcFlows['west_bank_solar','west_bank_battery_storage',k,t] \
-                                                + self.arcFlows['west_bank_wind','west_bank_battery_storage',k,t] \
-                                                    # gaza
-                                                    + self.arcFlows['gaza_solar','gaza_generation',k,t]
-                                                        + self.arcFlows['gaza_solar','gaza_battery_storage',k,t])
-                                                            for k in ['electricity']
-                                                                for t in self.timesteps if t in timesteps_2030),'eag_res')
-            
-            
-            #========================================
-            # COOPERATIVE AND UTOPIA
-            #========================================
-            
-            if self.scenario == 'COO' or self.scenario == 'UTO':
-                # [1] COMBINED RES TARGET
-                self.model.addConstr( \
-                    gp.quicksum( \
-                        #variables['coop_res_target_2030'] * self.res_factor * \
-                            self.coo_factor * \
-                            # israel
-                            (self.arcFlows['israel_solar','israel_generation',k,t] \
-                                + self.arcFlows['israel_wind','israel_generation',k,t] \
-                                + self.arcFlows['israel_solar','israel_battery_storage',k,t] \
-                                + self.arcFlows['israel_wind','israel_battery_storage',k,t] \
-                                + self.arcFlows['israel_diesel','israel_generation',k,t] \
-                                + self.arcFlows['israel_coal','israel_generation',k,t] \
-                                + self.arcFlows['israel_ccgt','israel_generation',k,t] \
-                                + self.arcFlows['israel_natural_gas','israel_gas_storage',k,t] \
-                                # jordan
-                                + self.arcFlows['jordan_solar','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_wind','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_solar','jordan_battery_storage',k,t] \
-                                + self.arcFlows['jordan_wind','jordan_battery_storage',k,t] \
-                                + self.arcFlows['jordan_natural_gas','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_diesel','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_coal','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_ccgt','jordan_generation',k,t] \
-                                + self.arcFlows['jordan_shale','jordan_generation',k,t] \
-                                # west bank
-                                + self.arcFlows['west_bank_solar','west_bank_generation',k,t] \
-                                + self.arcFlows['west_bank_wind','west_bank_generation',k,t] \
-                                + self.arcFlows['west_bank_solar','west_bank_battery_storage',k,t] \
-                                + self.arcFlows['west_bank_wind','west_bank_battery_storage',k,t] \
-                                + self.arcFlows['west_bank_coal','west_bank_generation',k,t] \
-                                + self.arcFlows['west_bank_ccgt','west_bank_generation',k,t] \
-                                + self.arcFlows['west_bank_natural_gas','west_bank_generation',k,t] \
-                                + self.arcFlows['west_bank_diesel','west_bank_generation',k,t] \
-                                # gaza
-                                + self.arcFlows['gaza_diesel','gaza_generation',k,t] \
-                                + self.arcFlows['gaza_solar','gaza_generation',k,t] \
-                                + self.arcFlows['gaza_solar','gaza_battery_storage',k,t] \
-                                + self.arcFlows['gaza_natural_gas','gaza_generation',k,t] \
-                                + self.arcFlows['egypt_generation','gaza_energy_demand',k,t])
-                                    for k in ['electricity']
-                                            for t in self.timesteps if t in timesteps_2030) \
-                    <= \
-                    gp.quicksum( \
-                        # israel
-                        (self.arcFlows['israel_solar','israel_generation',k,t] \
-                            + self.arcFlows['israel_wind','israel_generation',k,t] \
-                            + self.arcFlows['israel_solar','israel_battery_storage',k,t] \
-                            + self.arcFlows['israel_wind','israel_battery_storage',k,t] \
-                            # jordan
-                            + self.arcFlows['jordan_solar','jordan_generation',k,t] \
-                            + self.arcFlows['jordan_wind','jordan_generation',k,t] \
-                            + self.arcFlows['jordan_solar','jordan_battery_storage',k,t] \
-                            + self.arcFlows['jordan_wind','jordan_battery_storage',k,t] \
-                            # west bank
-                            + self.arcFlows['west_bank_solar','west_bank_generation',k,t] \
-                            + self.arcFlows['west_bank_wind','west_bank_generation',k,t] \
-                            + self.arcFlows['west_bank_solar','west_bank_battery_storage',k,t] \
-                            + self.arcFlows['west_bank_wind','west_bank_battery_storage',k,t] \
-                            # gaza
-                            + self.arcFlows['gaza_solar','gaza_generation',k,t] \
-                            + self.arcFlows['gaza_solar','gaza_battery_storage',k,t])
-                                for k in ['electricity']
-                                    for t in self.timesteps if t in timesteps_2030),'coo_res')
-            
-            
-                #-----
-                # ISRAEL
-                #-----
-        
-                # [1] RES
-                # <<<<< Does not apply >>>>>
-                
-                # # [2] NATURAL GAS
-                # self.model.addConstr( \
-                #     gp.quicksum( \
-                #         self.global_variables['isr_ng_target_2030'] *  \
-                #             (self.arcFlows['israel_solar','israel_generation',k,t] \
-                #                 + self.arcFlows['israel_wind','israel_generation',k,t] \
-                #                 + self.arcFlows['israel_battery_storage','israel_generation',k,t] \
-                #                 + self.arcFlows['israel_diesel','israel_generation',k,t] \
-                #                 + self.arcFlows['israel_coal','israel_generation',k,t] \
-                #                 + self.arcFlows['israel_ccgt','israel_generation',k,t] \
-                #                 + self.arcFlows['israel_natural_gas','israel_gas_storage',k,t])
-                #                     for k in ['electricity']
-                #                             for t in self.timesteps if t in timesteps_2030) \
-                #     <= \
-                #     gp.quicksum( \
-                #         (self.arcFlows['israel_natural_gas','israel_gas_storage',k,t] \
-                #             + self.arcFlows['israel_ccgt','israel_generation',k,t])
-                #                 for k in ['electricity']
-                #                     for t in self.timesteps if t in timesteps_2030),'isr_ng')
-                
+    def set_price_factors(self,solar_price_factor=None,wind_price_factor=None):
+        '''Update solar and wind price factors of the built model in place (re-solve with run)
+        '''
+        if solar_price_factor is not None:
+            self.solar_price_factor = solar_price_factor
+        if wind_price_factor is not None:
+            self.wind_price_factor  = wind_price_factor
+        self.model.setObjective(make_capex_objective(self),gp.GRB.MINIMIZE)
 
-                #-----
-                # JORDAN
-                #-----
 
-                # ZERO SHALE IN JORDAN UNDER COO/UTO
-                self.model.addConstrs(
-                    (self.capacity_indices[n,k,t] == 0\
-                        for n in ['jordan_shale']\
-                            for k in ['electricity']\
-                                for t in self.timesteps\
-                                    if t in timesteps_2030),'jor_shale')
-                
+    def set_connectivity(self,**kwargs):
+        '''Update interconnector capacities (e.g. jordan_to_israel=100) of the built model
+            in place (re-solve with run)
+        '''
+        for c,value in kwargs.items():
+            if c not in connectivity_arcs:
+                raise ValueError('unknown connectivity: ' + c)
+            i,j = connectivity_arcs[c]
+            if value != 0 and any(a[0] == i and a[1] == j for a in self.arcFlows.pruned):
+                raise ValueError(c + ' has no arcs in the model (zero capacity at build); '
+                                 'build with prune_arcs=False to update it in place')
+            # variable bounds
+            arcs  = self.arcFlows.select(i,j,'*','*')
+            bound = float(map_unbounded(value)) if self.scaling else value
+            self.model.setAttr('UB',arcs,[bound]*len(arcs))
+            # network data
+            self.connectivity[c] = value
+            mask = ((self.edge_indices.from_id == i) & (self.edge_indices.to_id == j)).to_numpy()
+            self.edge_indices.loc[mask,'maximum'] = value
+            self.params.ub[mask[self.params.arc_mask]] = bound
+        self = update_for_scenario(self,self.connectivity)
 
-                #-----
-                # WEST BANK
-                #-----
-        
-                # [1] RES
-                # <<<<< Does not apply >>>>>
-                
-                # [2] SELF-SUFFICIENCY
-                if self.scenario == 'COO': #and self.scenario != 'UTO':
-                    self.model.addConstr(
-                        gp.quicksum( \
-                            self.ss_factor * \
-                                # sum of total demand
-                                (self.arcFlows['west_bank_generation',j,k,t] \
-                                    + self.arcFlows['israel_generation',j,k,t] \
-                                        + self.arcFlows['jordan_generation',j,k,t])
-                                            for j in ['west_bank_energy_demand']
-                                                for k in ['electricity']
-                                                    for t in self.timesteps if t in timesteps_2030)
-                        == \
-                          gp.quicksum( \
-                              (self.arcFlows['west_bank_generation','west_bank_energy_demand',k,t])
-                                    for k in ['electricity']
-                                        for t in self.timesteps if t in timesteps_2030),'wb_ss')
-
-                # [3] NO GAS CAPACITY ALLOWED UNDER COO 
-                unexpandable = ['west_bank_natural_gas']
-                self.model.addConstrs(
-                    (self.capacity_indices[n,k,t] == 0\
-                        for n in unexpandable\
-                            for k in ['electricity']\
-                                for t in self.timesteps),'wb_gas_change')
-                
-                #-----
-                # GAZA
-                #-----
-        
-                # [1] RES
-                # <<<<< Does not apply >>>>>
-                
-                # [2] SELF-SUFFICIENCY
-                if self.scenario == 'COO': #and self.scenario != 'UTO':
-                    self.model.addConstr(
-                        gp.quicksum( \
-                            self.ss_factor * \
-                                # sum of total demand
-                                (self.arcFlows['gaza_generation',j,k,t] \
-                                    + self.arcFlows['israel_generation',j,k,t] \
-                                        + self.arcFlows['egypt_generation',j,k,t])
-                                            for j in ['gaza_energy_demand']
-                                                for k in ['electricity']
-                                                    for t in self.timesteps if t in timesteps_2030) \
-                        == \
-                        gp.quicksum( \
-                            (self.arcFlows['gaza_generation','gaza_energy_demand',k,t])
-                                for k in ['electricity']
-                                    for t in self.timesteps if t in timesteps_2030),'gaz_ss')
 
-        
-        
     def run(self,pprint=True,write=True):
         '''Function to solve GurobiPy model
         '''
+        with self.profiler.phase('run'):
+            self.solve(pprint,write)
+        self.write_profile()
+
+
+    def solve(self,pprint=True,write=True):
+        '''Solve the model as one, by connected components or by Benders decomposition
+            (if decompose)
+        '''
         if write==True:
             print('')
         # set output flag
@@ -1664,17 +903,73 @@ class nextra():
             self.model.setParam('OutputFlag', 0)
         else:
             self.model.setParam('OutputFlag', 1)
-        # optimise
-        self.model.optimize()
+        self.solution = None
+        decompose = self.decompose if isinstance(self.decompose,dict) else \
+                        {'method' : self.decompose} if isinstance(self.decompose,str) else {}
+        options   = {k : v for k,v in decompose.items() if k != 'method'}
+        if decompose.get('method','components') not in ['components','benders']:
+            raise ValueError('decompose method must be components or benders')
+        if decompose.get('method') == 'benders':
+            # capacity master and dispatch subproblems (objective only if converged)
+            benders = benders_decomposition(self,**options)
+            benders.run(pprint=pprint)
+            self.benders            = benders
+            self.solution           = benders.solution
+            self.solution_status    = benders.status
+            self.solution_objective = benders.objective + self.model.ObjCon if benders.converged else None
+            return
+        if self.decompose:
+            # by connected components, if the network falls apart
+            components = component_decomposition(self,**options)
+            if components.is_decomposable():
+                components.run(pprint=pprint)
+                self.components         = components
+                self.solution           = components.solution
+                self.solution_status    = components.status
+                self.solution_objective = components.objective
+                return
+            coupling = len(components.coupling_constrs)
+            warnings.warn('decompose: the model does not split into components%s, solved as one model' \
+                              % (' (merged by %d coupling rows)' % coupling if coupling else ''))
+        # optimise, warm started from a coarse solution on the first solve (if warm_start);
+        #   later solves (e.g. of a sweep) start from the basis of the previous one
+        if self.warm_start and self.multi_resolution is None and self.model.NumScenarios == 0:
+            self.multi_resolution = multi_resolution(self,**(self.warm_start if isinstance(self.warm_start,dict) else {}))
+            self.multi_resolution.run(pprint=pprint)
+        else:
+            self.model.optimize()
 
 
     def get_results(self):
         '''Fetch results from model
         '''
-        if self.model.Status != 2:
+        if get_solve_status(self) != 2:
             raise ValueError('Could not get results! Model may be infeasible')
         else:
-            return nextra_postprocess(self)
+            with self.profiler.phase('get_results'):
+                results = nextra_postprocess(self)
+            self.write_profile()
+            return results
+
+
+    def write_profile(self):
+        '''Write profile of the run (profile.json) and anatomy of the model with solve
+            statistics (anatomy.json) to the results directory
+        '''
+        if not self.profiler.enabled:
+            return
+        if self.anatomy is None:
+            with self.profiler.phase('profile/anatomy'):
+                self.anatomy = get_model_anatomy(self.model)
+        statistics = get_solve_statistics(self.model)
+        if getattr(self,'solution',None) is not None:
+            # solved by parts
+            statistics.update(Status=self.solution_status,ObjVal=self.solution_objective)
+        write_json(os.path.join(self.results_dir,'anatomy.json'),dict(self.anatomy,solve=statistics))
+        self.profiler.write(os.path.join(self.results_dir,'profile.json'),
+                            model=self.model.ModelName,
+                            scenario=self.scenario,
+                            timesteps=len(self.timesteps))
 
 
     def debug(self,output_path='../outputs/__cache__/'):
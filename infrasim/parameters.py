@@ -0,0 +1,96 @@
+'''
+    parameters.py
+
+        Parameter store of the NexTra model. Arc costs and bounds, nodal flows
+        (demand and capacity factors) and initial capacities are held as numpy
+        arrays aligned with the variable ordering, so that model builders index
+        into arrays rather than dicts keyed by (i,j,k,t) tuples.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import numpy as np
+import pandas as pd
+
+# relative imports
+from .utils import *
+from .global_variables import *
+
+
+
+#---
+# Parameter store
+#---
+
+class parameters():
+
+
+    def __init__(self,model_run):
+        '''
+
+        Parameters
+        ----------
+        model_run : nextra
+            Model with network, flow data and time index defined.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.time = model_run.time
+
+        #---
+        # arcs (aligned with make_edge_indices)
+        self.arc_mask = ~get_zero_capacity_edges(model_run).to_numpy()
+        arcs          = model_run.edge_indices[self.arc_mask]
+        self.cost     = arcs.cost.to_numpy(dtype=float)
+        self.lb       = make_edge_variable_bounds(model_run,'minimum')
+        self.ub       = make_edge_variable_bounds(model_run,'maximum')
+
+        #---
+        # nodal flows (node x timestep, aligned with the time index)
+        pivot = model_run.flows.pivot_table(index='node',columns='timestep',values='value',aggfunc='first')
+        pivot = pivot.reindex(columns=self.time.timesteps)
+        self.flow_nodes  = pivot.index.to_list()
+        self.flow_row    = {n:i for i,n in enumerate(self.flow_nodes)}
+        self.flow_values = pivot.to_numpy(dtype=float)
+
+        #---
+        # initial capacities (first entry of each node, as in the nodal file)
+        nodes = model_run.nodes.drop_duplicates(subset='name')
+        self.capacity_nodes = nodes.name.to_list()
+        self.capacity_pos   = {n:i for i,n in enumerate(self.capacity_nodes)}
+        self.capacity       = nodes.capacity.to_numpy(dtype=float)
+
+
+    def flow(self,nodes,timesteps=None):
+        '''Return nodal flows (e.g. demand, capacity factors) as a node-major array
+        '''
+        rows   = [self.flow_row[n] for n in nodes]
+        values = self.flow_values[rows]
+        if timesteps is not None:
+            values = values[:,self.time.position[np.asarray(timesteps,dtype=np.int64)]]
+        return values.ravel()
+
+
+    def flow_at(self,node,t):
+        '''Return nodal flow at a given node and timestep
+        '''
+        return float(self.flow_values[self.flow_row[node],self.time.position[t]])
+
+
+    def initial_capacity(self,nodes):
+        '''Return initial capacities of nodes as an array
+        '''
+        return self.capacity[[self.capacity_pos[n] for n in nodes]]
+
+
+    def initial_capacity_of(self,node):
+        '''Return initial capacity of a node
+        '''
+        return float(self.capacity[self.capacity_pos[node]])
@@ -0,0 +1,391 @@
+'''
+    policy.py
+
+        Declarative policy targets of the NexTra model: the 2030 targets (emissions
+        and capacities of each territory) and the energy goals of each scenario
+        (RES, natural gas and shale shares and self-sufficiency). Each target is a
+        row of a policy table; the rows that apply to a scenario are compiled into
+        sparse rows over the annual energy of arcs (in the years of the target, see
+        energy.py) and annual capacities, and added with a single call to the
+        gurobi matrix API.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import gurobipy as gp
+
+# relative imports
+from .utils import *
+from .global_variables import *
+from .energy import EMISSION_INTENSITY, add_annual_energy, get_energy_terms
+
+SCENARIOS  = ['BAS','BAU','NCO','EAG','COO','UTO']
+RES        = ['solar','wind']
+
+# factors of targets that can be updated in place (see add_factor_constr)
+UPDATABLE_FACTORS = ['ss_factor','coo_factor']
+
+# columns of the policy table and their defaults
+POLICY_COLUMNS = {'name'         : None,        # name of the constraint (capacity targets are indexed [n,k,y])
+                  'type'         : None,        # emission, share, self_sufficiency or capacity (see compile_flow_target)
+                  'scenarios'    : SCENARIOS,   # scenarios in which the target applies
+                  'goal'         : False,       # energy goal (applies only if energy_objective is True)
+                  'territories'  : [],          # territories of the technologies (e.g. ['israel'])
+                  'technologies' : [],          # technologies (node subtypes) whose output counts, or None for all
+                  'supply'       : None,        # arcs from generation to demand as [(territory,territory)]
+                  'nodes'        : [],          # nodes of capacity targets
+                  'share'        : None,        # share (key of global_variables or number)
+                  'factor'       : None,        # factor of the share (attribute of the model run, e.g. res_factor)
+                  'sense'        : '<',         # sense of the target: <, > or =
+                  'value'        : None,        # capacity (number, key of global_variables, 'initial' or 'previous')
+                  'years'        : [2030],      # years of the target, 'all' or 'after_first'
+                  }
+
+ISRAEL_SUPPLY_BAU = [('israel','israel'),('israel','west_bank'),('israel','gaza')]
+JORDAN_SUPPLY_BAU = [('jordan','jordan'),('jordan','west_bank'),('jordan','israel')]
+WEST_BANK_SUPPLY  = [('west_bank','west_bank'),('israel','west_bank'),('jordan','west_bank')]
+GAZA_SUPPLY       = [('gaza','gaza'),('israel','gaza'),('egypt','gaza')]
+
+POLICY_TARGETS = [
+
+    #---
+    # Emissions reductions
+    #---
+
+    {'name' : 'emission_reduction', 'type' : 'emission', 'scenarios' : ['BAU','NCO','EAG','COO','UTO'],
+     'territories' : ['israel','jordan','west_bank','gaza'], 'technologies' : list(EMISSION_INTENSITY),
+     'share' : 'emissions_reduction_2030'},
+
+    #---
+    # Israel's energy targets
+    #---
+
+    # No high carbon energy technologies in 2030
+    {'name' : 'isr_carb1', 'type' : 'capacity', 'nodes' : ['israel_coal','israel_diesel'], 'sense' : '=', 'value' : 0},
+    # There can only be a maximum of 700 MW of wind capacity due to land constraints
+    {'name' : 'isr_wind', 'type' : 'capacity', 'nodes' : ['israel_wind'], 'value' : 'isr_max_wind_cap', 'years' : 'all'},
+    # Additional capacity of carbon-intensive technologies cannot be built
+    {'name' : 'isr_carb2', 'type' : 'capacity', 'nodes' : ['israel_coal','israel_diesel'], 'value' : 'previous',
+     'years' : 'after_first'},
+    # There must be a minimum amount of natural gas
+    {'name' : 'isr_ng', 'type' : 'capacity', 'nodes' : ['israel_natural_gas'], 'sense' : '>', 'value' : 'initial',
+     'years' : 'all'},
+    # There must be 3400 MW of ccgt
+    {'name' : 'isr_ccgt', 'type' : 'capacity', 'nodes' : ['israel_ccgt'], 'sense' : '=', 'value' : 'isr_max_ccgt_cap'},
+    # Israel's storage targets: zero out gas storages
+    {'name' : 'isr_storage', 'type' : 'capacity', 'nodes' : ['israel_gas_storage'], 'sense' : '=', 'value' : 0},
+
+    #---
+    # Jordan's energy targets
+    #---
+
+    # No high carbon energy technologies in 2030
+    {'name' : 'jor_carbon', 'type' : 'capacity', 'nodes' : ['jordan_coal','jordan_diesel','jordan_ccgt'],
+     'sense' : '=', 'value' : 0},
+    # jordan_solar and jordan_natural_gas should be more than baseline
+    {'name' : 'jor_sol1', 'type' : 'capacity', 'nodes' : ['jordan_solar'], 'sense' : '>', 'value' : 'initial',
+     'years' : 'all'},
+    {'name' : 'jor_sol2', 'type' : 'capacity', 'nodes' : ['jordan_natural_gas'], 'sense' : '>', 'value' : 'initial',
+     'years' : 'all'},
+
+    #---
+    # West Bank's energy targets
+    #---
+
+    # Wind in West Bank
+    {'name' : 'wb_wind', 'type' : 'capacity', 'nodes' : ['west_bank_wind'], 'sense' : '=', 'value' : 50},
+    # Baseload technologies in West Bank
+    {'name' : 'wb_baseload', 'type' : 'capacity', 'nodes' : ['west_bank_coal','west_bank_ccgt','west_bank_diesel'],
+     'sense' : '=', 'value' : 0},
+
+    #---
+    # Gaza's energy targets
+    #---
+
+    # gaza_diesel is 0 MW due to plans to convert existing plant to gas
+    {'name' : 'gaza_diesel', 'type' : 'capacity', 'nodes' : ['gaza_diesel'], 'sense' : '=', 'value' : 0},
+    # Solar in Gaza
+    {'name' : 'gaza_solar', 'type' : 'capacity', 'nodes' : ['gaza_solar'], 'sense' : '>', 'value' : 0},
+    # Natural gas in Gaza at least capacity of diesel today (due to plans to convert existing plant to gas)
+    {'name' : 'gaza_ng', 'type' : 'capacity', 'nodes' : ['gaza_natural_gas'], 'sense' : '>', 'value' : 'gaz_diesel_cap'},
+
+    #---
+    # ENERGY GOALS (only if energy_objective is True)
+    #---
+
+    #-----
+    # ISRAEL
+    #-----
+
+    # [1] RES
+    {'name' : 'isr_res', 'type' : 'share', 'scenarios' : ['BAU'], 'goal' : True, 'supply' : ISRAEL_SUPPLY_BAU,
+     'territories' : ['israel'], 'technologies' : RES, 'share' : 'isr_res_target_2030', 'factor' : 'res_factor'},
+    {'name' : 'isr_res', 'type' : 'share', 'scenarios' : ['NCO','EAG'], 'goal' : True, 'supply' : [('israel','israel')],
+     'territories' : ['israel'], 'technologies' : RES, 'share' : 'isr_res_target_2030', 'factor' : 'res_factor'},
+    # [2] NATURAL GAS
+    {'name' : 'isr_ng', 'type' : 'share', 'scenarios' : ['NCO','EAG'], 'goal' : True, 'supply' : [('israel','israel')],
+     'territories' : ['israel'], 'technologies' : ['natural gas','ccgt'], 'share' : 'isr_ng_target_2030'},
+
+    #-----
+    # JORDAN
+    #-----
+
+    # [1] RES
+    {'name' : 'jor_res', 'type' : 'share', 'scenarios' : ['BAU'], 'goal' : True, 'supply' : JORDAN_SUPPLY_BAU,
+     'territories' : ['jordan'], 'technologies' : RES, 'share' : 'jor_res_target_2030', 'factor' : 'res_factor'},
+    {'name' : 'jor_res', 'type' : 'share', 'scenarios' : ['NCO'], 'goal' : True, 'supply' : [('jordan','jordan')],
+     'territories' : ['jordan'], 'technologies' : RES, 'share' : 'jor_res_target_2030', 'factor' : 'res_factor'},
+    # [2] NATURAL GAS
+    {'name' : 'jor_ng', 'type' : 'share', 'scenarios' : ['BAU'], 'goal' : True, 'supply' : JORDAN_SUPPLY_BAU,
+     'territories' : ['jordan'], 'technologies' : ['natural gas'], 'share' : 'jor_ng_target_2030'},
+    {'name' : 'jor_ng', 'type' : 'share', 'scenarios' : ['NCO','EAG'], 'goal' : True, 'supply' : [('jordan','jordan')],
+     'territories' : ['jordan'], 'technologies' : ['natural gas'], 'share' : 'jor_ng_target_2030'},
+    # [3] SHALE OIL
+    {'name' : 'jor_shale', 'type' : 'share', 'scenarios' : ['BAU'], 'goal' : True, 'supply' : JORDAN_SUPPLY_BAU,
+     'territories' : ['jordan'], 'technologies' : ['shale'], 'share' : 'jor_shale_target_2030'},
+    {'name' : 'jor_shale', 'type' : 'share', 'scenarios' : ['NCO','EAG'], 'goal' : True, 'supply' : [('jordan','jordan')],
+     'territories' : ['jordan'], 'technologies' : ['shale'], 'share' : 'jor_shale_target_2030'},
+    # ZERO SHALE IN JORDAN UNDER COO/UTO
+    {'name' : 'jor_shale', 'type' : 'capacity', 'scenarios' : ['COO','UTO'], 'goal' : True, 'nodes' : ['jordan_shale'],
+     'sense' : '=', 'value' : 0},
+
+    #-----
+    # WEST BANK
+    #-----
+
+    # [1] RES
+    {'name' : 'wb_res', 'type' : 'share', 'scenarios' : ['NCO'], 'goal' : True, 'supply' : [('west_bank','west_bank')],
+     'territories' : ['west_bank'], 'technologies' : RES, 'share' : 'pal_res_target_2030', 'factor' : 'res_factor'},
+    # [2] NO GAS CAPACITY ALLOWED
+    {'name' : 'wb_gas_change', 'type' : 'capacity', 'scenarios' : ['BAU','EAG','COO','UTO'], 'goal' : True,
+     'nodes' : ['west_bank_natural_gas'], 'sense' : '=', 'value' : 0, 'years' : 'all'},
+    # [3] CAPACITY ADDITIONS IN WEST BANK UNDER EAG
+    {'name' : 'wb_solar_chg', 'type' : 'capacity', 'scenarios' : ['EAG'], 'goal' : True, 'nodes' : ['west_bank_solar'],
+     'value' : 1500, 'years' : 'all'},
+    # [4] SELF-SUFFICIENCY
+    {'name' : 'wb_ss', 'type' : 'self_sufficiency', 'scenarios' : ['BAU','EAG','COO'], 'goal' : True,
+     'supply' : WEST_BANK_SUPPLY, 'territories' : ['west_bank'], 'factor' : 'ss_factor', 'sense' : '='},
+
+    #-----
+    # GAZA
+    #-----
+
+    # [1] RES (no wind in gaza)
+    {'name' : 'gaza_res', 'type' : 'share', 'scenarios' : ['NCO'], 'goal' : True, 'supply' : [('gaza','gaza')],
+     'territories' : ['gaza'], 'technologies' : RES, 'share' : 'gaz_res_target_2030', 'factor' : 'res_factor'},
+    # [2] RES (hard coded as with NCO scenario)
+    {'name' : 'gaza_sol_hard', 'type' : 'capacity', 'scenarios' : ['EAG'], 'goal' : True, 'nodes' : ['gaza_solar'],
+     'sense' : '=', 'value' : 2535, 'years' : 'all'},
+    {'name' : 'gaza_sol_hard', 'type' : 'capacity', 'scenarios' : ['EAG'], 'goal' : True, 'nodes' : ['gaza_battery_storage'],
+     'sense' : '=', 'value' : 2028, 'years' : 'all'},
+    # [3] SELF-SUFFICIENCY
+    {'name' : 'gaz_ss', 'type' : 'self_sufficiency', 'scenarios' : ['BAU','EAG','COO'], 'goal' : True,
+     'supply' : GAZA_SUPPLY, 'territories' : ['gaza'], 'factor' : 'ss_factor', 'sense' : '='},
+
+    #-----
+    # INTEGRATED RES TARGETS
+    #-----
+
+    # Jordan and Palestine (EAG)
+    {'name' : 'eag_res', 'type' : 'share', 'scenarios' : ['EAG'], 'goal' : True,
+     'supply' : [('jordan','jordan'),('jordan','west_bank'),('west_bank','west_bank'),('gaza','gaza')],
+     'territories' : ['jordan','west_bank','gaza'], 'technologies' : RES, 'share' : 'eag_res_target_2030',
+     'factor' : 'res_factor'},
+    # Combined RES target (COO and UTO): share of RES in all generation (incl. imports from egypt)
+    {'name' : 'coo_res', 'type' : 'share', 'scenarios' : ['COO','UTO'], 'goal' : True,
+     'territories' : ['israel','jordan','west_bank','gaza','egypt'], 'technologies' : RES, 'factor' : 'coo_factor'},
+    ]
+
+
+
+#---
+# Functions
+#---
+
+def make_policy_table(targets):
+    '''Return policy targets (list of dicts or dataframe) as a dataframe with every
+        column of POLICY_COLUMNS (missing entries are set to their defaults)
+    '''
+    rows = targets.to_dict('records') if isinstance(targets,pd.DataFrame) else list(targets)
+    rows = [{c : row.get(c,default) for c,default in POLICY_COLUMNS.items()} for row in rows]
+    for row in rows:
+        if row['name'] is None or row['type'] not in ['emission','share','self_sufficiency','capacity']:
+            raise ValueError('Policy targets need a name and a type (emission, share, self_sufficiency '
+                             'or capacity): ' + str(row))
+    return pd.DataFrame(rows,columns=list(POLICY_COLUMNS),dtype=object)
+
+
+def get_policy_targets(self):
+    '''Return rows of the policy table of the model run that apply to its scenario
+    '''
+    table   = make_policy_table(getattr(self,'policy_targets',POLICY_TARGETS))
+    applies = table.scenarios.apply(lambda scenarios : self.scenario in scenarios)
+    if self.energy_objective is not True:
+        applies = applies & ~table.goal.astype(bool)
+    return table[applies.to_numpy()].reset_index(drop=True)
+
+
+def get_value(self,value):
+    '''Return a share or capacity of the policy table (number or key of global_variables)
+    '''
+    if value is None:
+        return 1.0
+    return float(self.global_variables[value] if isinstance(value,str) else value)
+
+
+def get_target_years(self,years):
+    '''Return years of a target (list, 'all' or 'after_first') among the years of the model
+    '''
+    model_years = sorted(self.years)
+    if years == 'all':
+        return model_years
+    if years == 'after_first':
+        return model_years[1:]
+    return [y for y in model_years if y in list(years)]
+
+
+def get_technology_arcs(self,territories,technologies):
+    '''Return arcs carrying the output of technologies (node subtypes; all if None) of
+        source nodes in territories as a dataframe (from_id, to_id, subtype). Arcs to
+        nodes outside the network (e.g. curtailment, super_sink) are left out.
+    '''
+    nodes   = self.nodes.drop_duplicates(subset='name')
+    sources = nodes[(nodes['type'] == 'source') & adjust_nodal_names(nodes.territory).isin(territories)]
+    if technologies is not None:
+        sources = sources[sources.subtype.isin(technologies)]
+    arcs = self.edges[['from_id','to_id']].drop_duplicates()
+    arcs = arcs[arcs.to_id.isin(nodes.name)]
+    return arcs.merge(sources[['name','subtype']],left_on='from_id',right_on='name')[['from_id','to_id','subtype']]
+
+
+def get_supply_arcs(supply):
+    '''Return arcs from generation to demand of territories [(territory,territory)] as a dataframe
+    '''
+    return pd.DataFrame({'from_id' : [i + '_generation' for i,j in supply],
+                         'to_id'   : [j + '_energy_demand' for i,j in supply]},columns=['from_id','to_id'])
+
+
+def compile_flow_target(self,target):
+    '''Return terms (from_id, to_id, coef) and rhs of a target on arc flows, as the row
+        terms (sense) rhs:
+            emission         : output of technologies weighted by their emission intensity
+                               <= (1 - share) of BAS emissions in the timesteps represented
+            share            : share * factor * supply (or output of all technologies of
+                               the territories if there is no supply) - output of technologies
+            self_sufficiency : factor * supply - supply from the (first) territory to itself
+        and, for factors that can be updated in place, the base and target terms
+    '''
+    if target.type == 'emission':
+        terms = get_technology_arcs(self,target.territories,target.technologies)
+        terms['coef'] = terms.subtype.map(EMISSION_INTENSITY)
+        rhs = (1-get_value(self,target.share)) * (global_variables['BAS_emissions_in_2030']/(24*365)) \
+                * self.time.represented_timesteps() * 10**6
+        return terms[['from_id','to_id','coef']],rhs,None
+    # base
+    if target.supply is not None:
+        base = get_supply_arcs(target.supply)
+    else:
+        base = get_technology_arcs(self,target.territories,None)[['from_id','to_id']]
+    base = base.assign(coef=get_value(self,target.share))
+    # target
+    if target.type == 'self_sufficiency':
+        territory = target.territories[0]
+        goal = get_supply_arcs([(territory,territory)])
+    else:
+        goal = get_technology_arcs(self,target.territories,target.technologies)[['from_id','to_id']]
+    goal = goal.assign(coef=-1.0)
+    factor = 1.0 if target.factor is None else getattr(self,target.factor)
+    terms  = pd.concat([base.assign(coef=base.coef * factor),goal],ignore_index=True)
+    if target.factor in UPDATABLE_FACTORS:
+        return terms,0.0,(base,goal)
+    return terms,0.0,None
+
+
+def compile_capacity_target(self,target):
+    '''Return rows [(name, [(variable,coef)], rhs)] of a target on annual capacities,
+        compiled over nodes and years of the target as dataframe columns (nodes
+        outside the network are left out)
+    '''
+    capacity = pd.DataFrame(list(self.annual_capacity.keys()),columns=['node','commodity','year'])
+    capacity['variable'] = list(self.annual_capacity.values())
+    rows = pd.MultiIndex.from_product([list(target.nodes),['electricity'],get_target_years(self,target.years)],
+                                      names=['node','commodity','year']).to_frame(index=False)
+    rows = rows.merge(capacity,on=['node','commodity','year'])
+    if target.value == 'previous':
+        # no more than capacity of the previous year
+        years = np.array(sorted(self.years))
+        rows['previous'] = years[np.searchsorted(years,rows.year.to_numpy())-1]
+        rows = rows.merge(capacity.rename(columns={'year' : 'previous','variable' : 'previous_variable'}),
+                          on=['node','commodity','previous'])
+        terms = [[(v,1.0),(p,-1.0)] for v,p in zip(rows.variable,rows.previous_variable)]
+        rhs   = np.zeros(len(rows))
+    else:
+        terms = [[(v,1.0)] for v in rows.variable]
+        if target.value == 'initial':
+            rhs = self.params.initial_capacity(rows.node)
+        else:
+            rhs = np.full(len(rows),get_value(self,target.value))
+    names = target.name + '[' + rows.node + ',electricity,' + rows.year.astype(str) + ']'
+    return list(zip(names,terms,rhs.astype(float).tolist()))
+
+
+def add_policy_targets(self):
+    '''Compile rows of the policy table that apply to the scenario (see
+        get_policy_targets) into a sparse matrix and add them as one block of
+        constraints, named as the targets. Targets whose factor can be updated in
+        place (e.g. ss_factor) are registered with their base and target expressions.
+    '''
+    targets = get_policy_targets(self)
+    if targets.empty:
+        return []
+    # columns: annual energy of arcs and annual capacities, in order of first use
+    variables,column = [],{}
+    names,senses,rhs = [],[],[]
+    rows,columns,coefs = [],[],[]
+    updatable = []
+    def add_row(name,terms,sense,b):
+        for v,c in terms:
+            if v.index not in column:
+                column[v.index] = len(variables)
+                variables.append(v)
+            rows.append(len(names))
+            columns.append(column[v.index])
+            coefs.append(c)
+        names.append(name)
+        senses.append(sense)
+        rhs.append(b)
+    compiled = [(target,compile_flow_target(self,target) if target.type != 'capacity' else None) \
+                    for target in targets.itertuples(index=False)]
+    # annual energy of arcs of all targets on flows, added in one block
+    arcs = [flow_target[0].merge(pd.DataFrame({'year' : get_target_years(self,target.years)}),how='cross') \
+                for target,flow_target in compiled if flow_target is not None]
+    if arcs:
+        add_annual_energy(self,pd.concat(arcs,ignore_index=True))
+    for target,flow_target in compiled:
+        if flow_target is None:
+            for name,terms,b in compile_capacity_target(self,target):
+                add_row(name,terms,target.sense,b)
+            continue
+        terms,b,parts = flow_target
+        years = get_target_years(self,target.years)
+        if parts is not None:
+            updatable.append((len(names),target.factor,parts,years))
+        add_row(target.name,get_energy_terms(self,terms,years),target.sense,b)
+    A = sp.csr_matrix((np.array(coefs,dtype=float),(np.array(rows,dtype=np.int64),np.array(columns,dtype=np.int64))),
+                      shape=(len(names),len(variables)))
+    constrs = self.model.addMConstr(A,gp.MVar.fromlist(variables),np.array(senses),np.array(rhs,dtype=float)).tolist()
+    self.model.update()
+    self.model.setAttr('ConstrName',constrs,names)
+    # targets with factors that can be updated in place: factor * base - target (sense) 0
+    for row,factor,(base,goal),years in updatable:
+        expressions = [get_energy_terms(self,terms,years) for terms in [base,goal.assign(coef=-goal.coef)]]
+        expressions = [gp.LinExpr([c for v,c in terms],[v for v,c in terms]) for terms in expressions]
+        self.factor_constrs.setdefault(factor,[]).append((constrs[row],expressions[0],expressions[1]))
+    return constrs
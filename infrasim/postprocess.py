@@ -11,15 +11,17 @@
 #---
 
 import random
-import seaborn as sns
-import matplotlib.pyplot as plt
+from functools import cached_property
 import pandas as pd
 import numpy as np
 import warnings
+# plotting libraries (matplotlib, seaborn, plotly) are imported by plotting methods
+# only, so that runs that do not plot do not load them
 
 # relative imports
 from .utils import *
 from .global_variables import *
+from .energy import fetch_annual_energy_results
 
 
 
@@ -38,16 +40,59 @@ class nextra_postprocess():
         self.nodes = model_run.nodes
         self.edges = model_run.edges
         self.flows = model_run.flows
+        self.time  = model_run.time
+        self.objective = get_objective_value(model_run)
 
         # init results
-        self.results_edge_flows             = fetch_edge_flow_results(model_run)
+        #   edge flows are kept as arrays of arcs and (arc,timestep,value); tables
+        #   derived from them are built on first access (see properties below)
+        self.arcs,self.edge_flows           = fetch_edge_flow_arrays(model_run)
         self.results_storages               = fetch_storage_results(model_run)
         self.results_capacities             = fetch_capacity_results(model_run)
-        self.results_capacity_change        = self.get_capacity_change()
-        self.results_costs                  = self.compute_costs()
+        self.results_annual_energy          = fetch_annual_energy_results(model_run)
+
+        # sensitivity from duals and ranges of the solved LP (empty if solved by parts)
+        self.results_marginal_prices        = fetch_marginal_prices(model_run)
+        self.results_shadow_prices          = fetch_shadow_prices(model_run)
+        self.results_factor_sensitivity     = fetch_factor_sensitivity(model_run)
+        self.results_connectivity           = fetch_connectivity_sensitivity(model_run)
+        self.results_capex_ranging          = fetch_capex_ranging(model_run)
 
         # remove gas storage from results
-        self.results_edge_flows             = self.drop_node_from_edge_flows(node_to_remove='israel_gas_storage')
+        self.arcs,self.edge_flows           = merge_arcs_at_node(self.arcs,self.edge_flows,'israel_gas_storage')
+
+
+    @classmethod
+    def from_tables(cls,nodes,**tables):
+        '''Return results from tables (e.g. read from a results archive) without a model run
+        '''
+        self = cls.__new__(cls)
+        self.nodes = nodes
+        for name,df in tables.items():
+            # set in place of cached properties
+            self.__dict__[name] = df
+        return self
+
+
+    @cached_property
+    def results_edge_flows(self):
+        '''Edge flow results as (from_id,to_id,commodity,hour,day,month,year,timestep,value)
+        '''
+        return expand_edge_flows(self,self.arcs,self.edge_flows)
+
+
+    @cached_property
+    def results_capacity_change(self):
+        '''Change in capacity between first and final timestep
+        '''
+        return self.get_capacity_change()
+
+
+    @cached_property
+    def results_costs(self):
+        '''Costs (opex,capex,totex) of plans
+        '''
+        return self.compute_costs()
 
 
     def get_regional_capacity(self,territory):
@@ -66,6 +111,16 @@ class nextra_postprocess():
         return caps.groupby(by=['node','technology']).max().reset_index()
 
 
+    def get_marginal_prices(self,territory=None,freq='month'):
+        '''Get mean marginal price of electricity at demand nodes by hour/day/month/year
+        '''
+        prices = self.results_marginal_prices
+        if territory is not None:
+            nodes  = self.nodes.loc[self.nodes.territory==territory,'name']
+            prices = prices[prices.node.isin(nodes)]
+        return prices.groupby(by=['node',freq]).value.mean().reset_index()
+
+
     def generate_random_colour():
         '''Return random hex colour
         '''
@@ -103,19 +158,9 @@ class nextra_postprocess():
     def get_battery_charging_timesteps(self):
         '''Return timesteps in which battery is charged as a dataframe
         '''
-        r = self.results_edge_flows.copy()
-        r = r.loc[ (r.from_id.str.contains('jordan_battery')) & (r.hour.isin(global_variables['battery_charge_hours'])) ]
-        r = r.sort_values(by=['day','month'])
-
-        hour_mins = r.groupby(by=['day','month']).min().reset_index()
-        hour_maxs = r.groupby(by=['day','month']).max().reset_index()
-
-        hour_mins['vtype'] = 't1'
-        hour_maxs['vtype'] = 't2'
-
-        r = pd.concat([hour_mins,hour_maxs],ignore_index=True).sort_values(by=['month','day']).reset_index(drop=True)
-        r = r[['day','month','timestep','vtype']]
-        return r.pivot_table('timestep',['day','month'],'vtype').reset_index()[['day','month','t1','t2']]
+        r = self.time.ref.loc[self.time.charging]
+        r = r.groupby(by=['day','month']).timestep.agg(t1='min',t2='max').reset_index()
+        return r[['day','month','t1','t2']]
 
 
     def get_self_sufficiency(self,region='west_bank'):
@@ -182,6 +227,7 @@ class nextra_postprocess():
     def plot_self_sufficiency(self,region='west_bank'):
         '''Plot percentage self-sufficiency for a given region
         '''
+        import matplotlib.pyplot as plt
         df = self.get_self_sufficiency(region)
         df.set_index('from_id').plot.bar(rot=0)
         plt.xlabel('')
@@ -190,6 +236,7 @@ class nextra_postprocess():
     def plot_flows_heatmap(self,var,**kwargs):
         '''Plot a heatmap from flows data (x: month, y: hour, z: var)
         '''
+        import seaborn as sns
         # get flows
         idx = self.flows.copy()
         # index var
@@ -301,21 +348,10 @@ class nextra_postprocess():
     def drop_node_from_edge_flows(self,node_to_remove):
         '''Function to drop junction from edge flow results
         '''
-        df = self.results_edge_flows.copy()
-        # get new i,j
-        new_i = df[df.to_id == node_to_remove].from_id.unique()[0]
-        new_j = df[df.from_id == node_to_remove].to_id.unique()[0]
-        # change i
-        df.loc[df.from_id == node_to_remove,'from_id'] = new_i
-        # change j
-        df.loc[df.to_id == node_to_remove,'to_id'] = new_j
-        # drop
-        size_before = df.shape[0]
-        df = df.groupby(by=['from_id','to_id','commodity','hour','day','month','year']).mean().reset_index()
-        size_after = df.shape[0]
-        # print size difference
-        # print('Removed ' + str(size_before - size_after) + ' rows')
-        return df
+        self.arcs,self.edge_flows = merge_arcs_at_node(self.arcs,self.edge_flows,node_to_remove)
+        # rebuilt from arrays on next access
+        self.__dict__.pop('results_edge_flows',None)
+        return self.results_edge_flows
 
     
     def plot_battery_charge(self,node,days=10,month=6,year=2030):
@@ -326,6 +362,8 @@ class nextra_postprocess():
     def plot_solar_capacity_factor(self,node='all',ax=None,color='teal'):
         '''Plot daily average capacity factors
         '''
+        import matplotlib.pyplot as plt
+        import seaborn as sns
         s = self.results_edge_flows.copy()
         c = self.get_capacities().copy()
 
@@ -360,6 +398,8 @@ class nextra_postprocess():
     def plot_wind_capacity_factor(self,node='all',ax=None,color='teal'):
         '''Plot daily average capacity factors
         '''
+        import matplotlib.pyplot as plt
+        import seaborn as sns
         s = self.results_edge_flows.copy()
         c = self.get_capacities().copy()
 
@@ -394,6 +434,8 @@ class nextra_postprocess():
     def plot_battery_storage_volume(self,node='all',days=1,month=6,year=2030,ax=None,color='teal'):
         '''Plot battery storage volumes as a time series
         '''
+        import matplotlib.pyplot as plt
+        import seaborn as sns
         t = self.results_storages.copy()
         c = self.results_capacities.copy()
 
@@ -441,6 +483,7 @@ class nextra_postprocess():
     def plot_supply_curve(self,region='israel',days=1,month=6,year=2030,ax=None,blend_curtailment=True,shade_battery_charge=True):
         '''Plot supply and demand curves for a given region
         '''
+        import matplotlib.pyplot as plt
         flows = self.results_edge_flows.copy()
         # tag curtailed
         flows.loc[flows.to_id.str.contains('curtail'),'from_id'] = \
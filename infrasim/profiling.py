@@ -0,0 +1,285 @@
+'''
+    profiling.py
+
+        Instrumentation of NexTra runs: wall time and peak resident memory (RSS) of
+        each phase of a run (reading inputs, building each constraint family,
+        solving and postprocessing), and an anatomy of the model (rows, columns
+        and nonzeros of each constraint family, ranges of coefficients, rhs,
+        bounds and objective, and solve statistics). Both are written as JSON to
+        the results directory of runs with profile=True (profile.json and
+        anatomy.json).
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import re
+import sys
+import json
+import time
+import resource
+import contextlib
+
+import numpy as np
+import pandas as pd
+import gurobipy as gp
+
+# methods of a gurobi model timed by family when building
+TIMED_METHODS = ['addVar','addVars','addMVar','addConstr','addConstrs','addLConstr','addMConstr','setObjective','update']
+
+# solve statistics in the anatomy (if available in the gurobi version)
+SOLVE_ATTRIBUTES = ['Status','Runtime','Work','IterCount','BarIterCount','NodeCount','ObjVal','ObjBound']
+
+# default names of unnamed rows and columns (R0, R1, ... and C0, C1, ...)
+UNNAMED = re.compile(r'^[RC]\d+$')
+
+
+
+#---
+# Functions
+#---
+
+def get_peak_rss():
+    '''Return peak resident set size of the process (MB)
+    '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on linux
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def get_family(name):
+    '''Return family of a variable or constraint from its name (e.g. arcFlows[a,b,k,t])
+    '''
+    family = name.split('[',1)[0]
+    return 'unnamed' if UNNAMED.match(family) else family
+
+
+def get_call_name(method,args,kwargs):
+    '''Return name passed to a method adding variables or constraints
+    '''
+    if method == 'setObjective':
+        return 'objective'
+    name = kwargs.get('name',args[-1] if args else None)
+    return name if isinstance(name,str) and name else method
+
+
+def get_ranges(values):
+    '''Return [min, max] of absolute nonzero finite values (None if there are none)
+    '''
+    values = np.abs(np.asarray(values,dtype=float))
+    values = values[np.isfinite(values) & (values > 0)]
+    if not len(values):
+        return None
+    return [float(values.min()),float(values.max())]
+
+
+def get_family_anatomy(names,nonzeros,coefficients,values,value_name):
+    '''Return size, nonzeros and ranges of coefficients and values (rhs or bounds) of
+        rows or columns grouped by family
+    '''
+    df = pd.DataFrame({'family'   : [get_family(n) for n in names],
+                       'nonzeros' : nonzeros,
+                       'coef_min' : coefficients[0],
+                       'coef_max' : coefficients[1],
+                       'value'    : np.abs(values)})
+    df['value'] = df.value.where(np.isfinite(df.value) & (df.value > 0))
+    df = df.groupby(by='family',sort=False).agg(count=('nonzeros','size'),
+                                                nonzeros=('nonzeros','sum'),
+                                                coef_min=('coef_min','min'),
+                                                coef_max=('coef_max','max'),
+                                                value_min=('value','min'),
+                                                value_max=('value','max'))
+    df = df.rename(columns={'value_min' : value_name + '_min','value_max' : value_name + '_max'})
+    df = df.astype(object).where(df.notna(),None)
+    return {family : {k : (int(v) if k in ['count','nonzeros'] else v) for k,v in row.items()} \
+                for family,row in df.iterrows()}
+
+
+def get_line_ranges(matrix,n):
+    '''Return nonzeros and smallest and largest absolute coefficient of each row of a
+        csr matrix (of each column of a csc matrix)
+    '''
+    nonzeros = np.diff(matrix.indptr)
+    coef_min = np.full(n,np.nan)
+    coef_max = np.full(n,np.nan)
+    data     = np.abs(matrix.data)
+    filled   = nonzeros > 0
+    if filled.any():
+        starts = matrix.indptr[:-1][filled]
+        coef_min[filled] = np.minimum.reduceat(data,starts)
+        coef_max[filled] = np.maximum.reduceat(data,starts)
+    return nonzeros,(coef_min,coef_max)
+
+
+def get_model_anatomy(model):
+    '''Return anatomy of a gurobi model: sizes and ranges of the model and of each
+        family of constraints (rows) and variables (columns)
+    '''
+    model.update()
+    constrs,variables = model.getConstrs(),model.getVars()
+    A   = model.getA().tocsr()
+    rhs = np.asarray(model.getAttr('RHS',constrs),dtype=float)
+    lb  = np.asarray(model.getAttr('LB',variables),dtype=float)
+    ub  = np.asarray(model.getAttr('UB',variables),dtype=float)
+    obj = np.asarray(model.getAttr('Obj',variables),dtype=float)
+    # rows and columns by family
+    row_nonzeros,row_coefs = get_line_ranges(A,len(constrs))
+    col_nonzeros,col_coefs = get_line_ranges(A.tocsc(),len(variables))
+    bounds = np.where(np.isfinite(ub) & (np.abs(ub) > 0),np.abs(ub),np.abs(lb))
+    return {'model'       : model.ModelName,
+            'rows'        : len(constrs),
+            'columns'     : len(variables),
+            'nonzeros'    : int(A.nnz),
+            'ranges'      : {'matrix'    : get_ranges(A.data),
+                             'rhs'       : get_ranges(rhs),
+                             'bounds'    : get_ranges(np.concatenate([lb,ub])),
+                             'objective' : get_ranges(obj)},
+            'constraints' : get_family_anatomy(model.getAttr('ConstrName',constrs),
+                                               row_nonzeros,row_coefs,rhs,'rhs'),
+            'variables'   : get_family_anatomy(model.getAttr('VarName',variables),
+                                               col_nonzeros,col_coefs,bounds,'bound')}
+
+
+def get_solve_statistics(model):
+    '''Return solve statistics of a gurobi model (attributes that are not available
+        are skipped)
+    '''
+    statistics = {}
+    for attribute in SOLVE_ATTRIBUTES:
+        try:
+            statistics[attribute] = model.getAttr(attribute)
+        except (gp.GurobiError,AttributeError):
+            continue
+    return statistics
+
+
+def write_json(path,data):
+    '''Write data as json (numpy values as python values)
+    '''
+    with open(path,'w') as f:
+        json.dump(data,f,indent=4,default=lambda v : v.item() if isinstance(v,np.generic) else str(v))
+
+
+
+#---
+# Profiler class
+#---
+
+class profiler():
+
+
+    def __init__(self,enabled=True):
+        '''
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            Record phases (True) or do nothing (False).
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.enabled = enabled
+        self.phases  = []
+        self.last    = None
+
+
+    @contextlib.contextmanager
+    def phase(self,name):
+        '''Context recording wall time and peak RSS of a phase (e.g. init/read)
+        '''
+        if not self.enabled:
+            yield
+            return
+        start_time,start_rss = time.time(),get_peak_rss()
+        try:
+            yield
+        finally:
+            self.add(name,time.time()-start_time,start_rss)
+
+
+    def add(self,name,wall,start_rss):
+        '''Add a phase, or add to a phase of the same name (e.g. a family of
+            constraints added in several calls)
+        '''
+        peak = get_peak_rss()
+        for record in self.phases:
+            if record['phase'] == name:
+                record['wall']        += wall
+                record['calls']       += 1
+                record['peak_rss_mb']  = peak
+                record['rss_growth_mb'] += peak - start_rss
+                return
+        self.phases.append({'phase'         : name,
+                            'wall'          : wall,
+                            'calls'         : 1,
+                            'peak_rss_mb'   : peak,
+                            'rss_growth_mb' : peak - start_rss})
+
+
+    @contextlib.contextmanager
+    def families(self,model_run,prefix='build/'):
+        '''Context timing the gurobi model of a run by family: calls adding variables,
+            constraints or the objective are timed from the previous call (so that
+            building their expressions is included) and recorded as prefix + name
+        '''
+        if not self.enabled:
+            yield
+            return
+        model = model_run.model
+        self.last = (time.time(),get_peak_rss())
+        model_run.model = timed_model(model,self,prefix)
+        try:
+            yield
+        finally:
+            model_run.model = model
+
+
+    def to_frame(self):
+        '''Return phases as a dataframe
+        '''
+        return pd.DataFrame(self.phases,columns=['phase','wall','calls','peak_rss_mb','rss_growth_mb'])
+
+
+    def write(self,path,**info):
+        '''Write phases (and info on the run, e.g. scenario) as json
+        '''
+        write_json(path,dict(info,peak_rss_mb=get_peak_rss(),phases=self.phases))
+
+
+
+#---
+# Timed model class
+#---
+
+class timed_model():
+    '''Gurobi model whose calls adding variables, constraints or the objective are
+        recorded by a profiler (all other attributes are those of the model)
+    '''
+
+    def __init__(self,model,profiler,prefix):
+        object.__setattr__(self,'_model',model)
+        object.__setattr__(self,'_profiler',profiler)
+        object.__setattr__(self,'_prefix',prefix)
+
+
+    def __getattr__(self,attribute):
+        value = getattr(self._model,attribute)
+        if attribute not in TIMED_METHODS:
+            return value
+        def timed(*args,**kwargs):
+            result = value(*args,**kwargs)
+            start_time,start_rss = self._profiler.last
+            self._profiler.add(self._prefix + get_call_name(attribute,args,kwargs),time.time()-start_time,start_rss)
+            self._profiler.last = (time.time(),get_peak_rss())
+            return result
+        return timed
+
+
+    def __setattr__(self,attribute,value):
+        setattr(self._model,attribute,value)
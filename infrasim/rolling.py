@@ -0,0 +1,344 @@
+'''
+    rolling.py
+
+        Rolling-horizon dispatch of the NexTra model. With capacities fixed (from
+        a given plan or from an investment run over representative periods), the
+        hourly dispatch is solved over overlapping windows in sequence, e.g. one
+        week plus a day of lookahead. Only the first part of each window is kept,
+        and storage volumes and supply in the last kept timestep are carried into
+        the next window, so that the size of each model is bounded by the window
+        rather than the horizon.
+
+        With capacities fixed, the capex objective of the full model is a constant,
+        so windows minimise the cost of flow instead: objectives of windows and of
+        the full model are not comparable. Capacity targets hold with capacities
+        fixed at the plan. Annual targets on flows (emission_reduction, the RES,
+        natural gas and shale shares, self-sufficiency and max_curtail) are left to
+        the capacity plan by default, which meets them over the year rather than in
+        every window. With targets=True they are carried into each window pro rata,
+        i.e. over the timesteps of the window (shares as shares of its flows,
+        emissions within the share of the year it covers): exact for a window over
+        the whole horizon, but windows of a few hours may not be able to meet them
+        (e.g. self-sufficiency of a territory at night). Either way, annual targets
+        are evaluated on the stitched dispatch (see get_target_violations) and
+        violations are reported in results_windows.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+import gurobipy as gp
+
+# relative imports
+from .utils import *
+from .global_variables import *
+from .optimise import nextra
+from .parameters import parameters
+from .matrix import build_matrix_model
+from .profiling import profiler
+from .policy import get_policy_targets, get_target_years, compile_flow_target, make_policy_table, POLICY_TARGETS
+from .energy import CURTAILED_ARCS, SUPPLIED_ARCS
+
+# kwargs of rolling_dispatch that are not passed on to nextra
+ROLLING_KWARGS = ['window_length','lookahead','engine','solver_params','targets']
+
+
+
+#---
+# Functions
+#---
+
+def get_capacity_plan(model_run):
+    '''Return capacities of a solved model run as {(n,k,y) : capacity}
+    '''
+    return dict(get_variable_values(model_run,model_run.annual_capacity))
+
+
+def make_windows(timesteps,window_length=168,lookahead=24):
+    '''Return windows as [(timesteps in window, timesteps kept)]
+    '''
+    timesteps = np.sort(np.asarray(timesteps,dtype=np.int64))
+    return [(timesteps[s:s+window_length+lookahead],timesteps[s:s+window_length])
+                for s in range(0,len(timesteps),window_length)]
+
+
+def make_window(model_run,timesteps,initial_storage=None,initial_dispatch=None):
+    '''Return a copy of an (unbuilt) model run restricted to the given timesteps
+    '''
+    window = copy.copy(model_run)
+    # windows are not profiled (their results directory is that of the run) and are
+    #   solved as one model, cold
+    window.profiler         = profiler(enabled=False)
+    window.decompose        = False
+    window.warm_start       = False
+    window.multi_resolution = None
+    window.solution         = None
+    window.flows = model_run.flows.loc[model_run.flows.timestep.isin(timesteps)].reset_index(drop=True)
+    window = define_sets(window)
+    window = add_time_index_to_edges(window)
+    window.model = gp.Model(model_run.model.ModelName + '_%d' % timesteps[0])
+    # state carried over from the previous window
+    window.initial_storage  = initial_storage
+    window.initial_dispatch = initial_dispatch
+    return window
+
+
+def build_dispatch(window,capacities,engine='standard',targets=False):
+    '''Build dispatch of a window: network constraints with capacities fixed and
+        cost of flow as the objective. Annual targets on flows (of the policy table
+        and max_curtail) hold over the timesteps of the window, or are left out
+        (targets=False, the default; see get_target_violations).
+    '''
+    window.params = parameters(window)
+    window.factor_constrs = {}
+    window.annual_energy  = gp.tupledict()
+    if engine == 'matrix':
+        build_matrix_model(window)
+    elif engine == 'standard':
+        window.build_network()
+    else:
+        raise ValueError('engine must be standard or matrix')
+    # fix capacities
+    keys = list(window.annual_capacity.keys())
+    missing = [key for key in keys if key not in capacities]
+    if missing:
+        raise ValueError('No capacity in plan for: ' + str(missing[:5]))
+    values = [capacities[key] for key in keys]
+    window.model.setAttr('LB',[window.annual_capacity[key] for key in keys],values)
+    window.model.setAttr('UB',[window.annual_capacity[key] for key in keys],values)
+    if targets:
+        # targets on flows over the timesteps of the window (capacity targets hold at the plan)
+        table = make_policy_table(getattr(window,'policy_targets',POLICY_TARGETS))
+        window.policy_targets = table[table['type'] != 'capacity']
+        window.build_targets()
+    else:
+        # annual curtailment is left to the plan, as are the policy targets (not built),
+        #   with the annual energy of arcs
+        window.model.update()
+        window.model.remove([c for c in window.model.getConstrs() if c.ConstrName.startswith(('max_curtail','annual_energy'))])
+        window.model.remove(list(window.annual_energy.values()))
+        window.annual_energy = gp.tupledict()
+    window.model.setObjective(make_flow_cost_objective(window),gp.GRB.MINIMIZE)
+    return window
+
+
+def get_flow_targets(model_run):
+    '''Return annual targets on flows of a model run as [(name, terms, sense, rhs, years)],
+        terms being a dataframe of from_id, to_id and coef: targets of the policy table
+        that apply to the scenario (see compile_flow_target) and max_curtail
+    '''
+    targets = []
+    for target in get_policy_targets(model_run).itertuples(index=False):
+        if target.type == 'capacity':
+            continue
+        terms,rhs,parts = compile_flow_target(model_run,target)
+        targets.append((target.name,terms,target.sense,rhs,get_target_years(model_run,target.years)))
+    curtailment = pd.concat([pd.DataFrame(CURTAILED_ARCS,columns=['from_id','to_id']).assign(coef=1.0),
+                             pd.DataFrame(SUPPLIED_ARCS,columns=['from_id','to_id']) \
+                                .assign(coef=-global_variables['maximum_curtailment'])],ignore_index=True)
+    targets.append(('max_curtail',curtailment,'<',0.0,sorted(model_run.years)))
+    return targets
+
+
+def get_target_violations(targets,arc_energy,fraction=1.0):
+    '''Return annual targets on flows (see get_flow_targets) evaluated on energy of arcs
+        (dataframe of from_id, to_id, year and value), e.g. of a stitched dispatch, as a
+        dataframe of name, sense, lhs, rhs and violation. Right-hand sides are prorated
+        by the fraction of the horizon the energy is over; violations are relative to
+        the largest term (or rhs) of each target.
+    '''
+    energy  = arc_energy.groupby(['from_id','to_id','year'],as_index=False).value.sum()
+    results = []
+    for name,terms,sense,rhs,years in targets:
+        values = terms.merge(energy[energy.year.isin(years)],on=['from_id','to_id'])
+        values = values.coef.to_numpy() * values.value.to_numpy()
+        lhs,rhs = values.sum(),rhs * fraction
+        if sense == '<':
+            violation = max(lhs - rhs,0)
+        elif sense == '>':
+            violation = max(rhs - lhs,0)
+        else:
+            violation = abs(lhs - rhs)
+        scale = max(np.abs(values).max() if len(values) else 0,abs(rhs),1.0)
+        results.append({'name' : name, 'sense' : sense, 'lhs' : lhs, 'rhs' : rhs, 'violation' : violation / scale})
+    return pd.DataFrame(results,columns=['name','sense','lhs','rhs','violation'])
+
+
+def get_window_state(window,t):
+    '''Return storage volumes and supply from nodes at timestep t as
+        ({(n,k) : volume}, {(n,k) : supply})
+    '''
+    storage = pd.DataFrame(list(window.storage_volume.keys()),columns=['node','commodity','timestep'])
+    storage['value'] = get_variable_array(window,window.storage_volume)
+    storage = storage[storage.timestep.to_numpy() == t]
+    supply  = pd.DataFrame(list(window.arcFlows.keys()),columns=['from_id','to_id','commodity','timestep'])
+    supply['value'] = get_variable_array(window,window.arcFlows)
+    supply  = supply[supply.timestep.to_numpy() == t].groupby(['from_id','commodity']).value.sum()
+    return dict(zip(zip(storage.node,storage.commodity),storage.value)),supply.to_dict()
+
+
+
+#---
+# Rolling dispatch class
+#---
+
+class rolling_dispatch():
+
+
+    def __init__(self,path_to_nodes,path_to_edges,path_to_flows,scenario,energy_objective,capacities=None,**kwargs):
+        '''
+
+        Parameters
+        ----------
+        path_to_nodes : str
+            Path to nodal data.
+        path_to_edges : str
+            Path to edge data.
+        path_to_flows : str
+            Path to flow data.
+        scenario : str
+            Define scenario to run.
+        energy_objective : bool, True/False
+            Parameter to observe or ignore renewable energy targets.
+        capacities : dict or nextra, optional
+            Capacity plan as {(n,k,y) : capacity} or a solved nextra model run. If
+            None, capacities are planned by a run over representative periods
+            (representative_periods, default: 12, and period_length kwargs).
+        window_length : int, optional
+            Number of timesteps kept from each window (default: 168).
+        lookahead : int, optional
+            Number of timesteps solved beyond the kept part of each window (default: 24).
+        engine : str, optional
+            Model builder of each window, 'standard' or 'matrix' (default: 'standard').
+        solver_params : dict, optional
+            Gurobi parameters set on every window before solving.
+        targets : bool, optional
+            Carry annual targets on flows into each window pro rata (True) or leave
+            them to the capacity plan (default: False).
+        kwargs :
+            Passed to nextra (e.g. year, timesteps, super_source).
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.window_length  = kwargs.get('window_length',168)
+        self.lookahead      = kwargs.get('lookahead',24)
+        self.engine         = kwargs.get('engine','standard')
+        self.solver_params  = kwargs.get('solver_params',{})
+        self.targets        = kwargs.get('targets',False)
+        nextra_kwargs       = {k : v for k,v in kwargs.items() if k not in ROLLING_KWARGS}
+
+        #---
+        # capacities
+        if capacities is None:
+            investment_kwargs = dict(nextra_kwargs)
+            investment_kwargs.setdefault('representative_periods',12)
+            investment = nextra(path_to_nodes,path_to_edges,path_to_flows,scenario,energy_objective,**investment_kwargs)
+            investment.build(engine=self.engine)
+            investment.run(pprint=False,write=False)
+            if get_solve_status(investment) != 2:
+                raise ValueError('Investment run not solved to optimality (status %d)' % get_solve_status(investment))
+            capacities = get_capacity_plan(investment)
+            investment.model.dispose()
+        elif isinstance(capacities,nextra):
+            capacities = get_capacity_plan(capacities)
+        self.capacities = capacities
+
+        #---
+        # hourly model run (not built; each window is built from a copy)
+        nextra_kwargs.pop('representative_periods',None)
+        self.model_run = nextra(path_to_nodes,path_to_edges,path_to_flows,scenario,energy_objective,**nextra_kwargs)
+        self.windows   = make_windows(self.model_run.timesteps,self.window_length,self.lookahead)
+
+        self.results_edge_flows = pd.DataFrame()
+        self.results_storages   = pd.DataFrame()
+        self.results_windows    = pd.DataFrame()
+        self.results_targets    = pd.DataFrame()
+
+
+    def run(self,pprint=True):
+        '''Solve windows in sequence, carrying storage volumes and supply between windows.
+            After each window, annual targets are evaluated on the dispatch stitched so
+            far (rhs prorated to the timesteps kept): the largest violation and the
+            number of targets violated are reported in results_windows, and targets
+            over the horizon in results_targets.
+        '''
+        edge_flows,storages,summary = [],[],[]
+        initial_storage,initial_dispatch = None,None
+        targets    = get_flow_targets(self.model_run)
+        arc_energy = pd.DataFrame(columns=['from_id','to_id','year','value'])
+        n_kept     = 0
+        for w,(timesteps,kept) in enumerate(self.windows):
+            start_time = time.time()
+            window = make_window(self.model_run,timesteps,initial_storage,initial_dispatch)
+            window = build_dispatch(window,self.capacities,engine=self.engine,targets=self.targets)
+            build_time = time.time() - start_time
+
+            start_time = time.time()
+            for param,value in self.solver_params.items():
+                window.model.setParam(param,value)
+            window.run(pprint=False,write=False)
+            solve_time = time.time() - start_time
+            if window.model.Status != 2:
+                raise ValueError('Window %d (timesteps %d-%d) not solved to optimality (status %d)%s' \
+                                    % (w,timesteps[0],timesteps[-1],window.model.Status,
+                                       ': annual targets may not hold in the window (targets=False)' if self.targets else ''))
+
+            # keep results of the first window_length timesteps
+            flows   = fetch_edge_flow_results(window)
+            storage = fetch_storage_results(window)
+            edge_flows.append(flows.loc[flows.timestep.isin(kept)])
+            storages.append(storage.loc[storage.timestep.isin(kept)])
+            initial_storage,initial_dispatch = get_window_state(window,kept[-1])
+
+            # annual targets on the stitched dispatch
+            kept_flows = flows.loc[flows.timestep.isin(kept) & (flows.commodity == 'electricity')]
+            arc_energy = pd.concat([arc_energy,kept_flows.groupby(['from_id','to_id','year'],as_index=False).value.sum()],
+                                   ignore_index=True).groupby(['from_id','to_id','year'],as_index=False).value.sum()
+            n_kept    += len(kept)
+            violations = get_target_violations(targets,arc_energy,n_kept / len(self.model_run.timesteps))
+
+            kept_mask = np.isin(window.edge_indices.timestep.to_numpy()[window.params.arc_mask],kept)
+            x = np.array(window.model.getAttr('X',[window.arcFlows[a] for a in window.arc_indicies]))
+            summary.append({'window'      : w,
+                            'start'       : int(timesteps[0]),
+                            'end'         : int(timesteps[-1]),
+                            'kept_end'    : int(kept[-1]),
+                            'variables'   : window.model.NumVars,
+                            'constraints' : window.model.NumConstrs,
+                            'objective'   : window.model.ObjVal,
+                            'cost'        : float(window.params.cost[kept_mask] @ x[kept_mask]),
+                            'target_violation' : violations.violation.max(),
+                            'targets_violated' : int((violations.violation > global_variables['target_tolerance']).sum()),
+                            'build'       : build_time,
+                            'solve'       : solve_time,
+                            'status'      : window.model.Status})
+            window.model.dispose()
+            if pprint:
+                print('> Window %d/%d (timesteps %d-%d) solved in %.1fs' \
+                        % (w+1,len(self.windows),timesteps[0],timesteps[-1],build_time+solve_time))
+
+        self.results_edge_flows = pd.concat(edge_flows,ignore_index=True)
+        self.results_storages   = pd.concat(storages,ignore_index=True)
+        self.results_windows    = pd.DataFrame(summary)
+        self.results_targets    = violations
+        if pprint and self.results_windows.targets_violated.iloc[-1]:
+            print('> Annual targets violated by the stitched dispatch: ' \
+                    + ', '.join(violations.name[violations.violation > global_variables['target_tolerance']]))
+        return self
+
+
+    def get_total_cost(self):
+        '''Return cost of flow over the horizon (kept timesteps of all windows)
+        '''
+        return self.results_windows.cost.sum()
@@ -0,0 +1,152 @@
+'''
+    scaling.py
+
+        Numerical scaling of the NexTra model before solving. Limits that stand for
+        "unbounded" (edges at 99999999 MW, interconnectors at 10**9 MW, super source
+        and curtailment arcs at 10**12) are mapped to infinity, rows whose
+        coefficients are all far from one (e.g. emissions, in g/kWh) are scaled by
+        a power of ten, and ranges of coefficients, rhs, bounds and objective are
+        checked against the limits in global_variables. Primal values and the
+        objective are not scaled; duals, slacks and rhs (with ranges) of scaled
+        rows are un-scaled to the original units when results are fetched.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import warnings
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gp
+
+# relative imports
+from .global_variables import *
+from .profiling import get_family, get_line_ranges
+
+# constraint attributes divided (or multiplied, Pi) by the scale of their row
+ROW_ATTRIBUTES = ['Slack','RHS','SARHSLow','SARHSUp']
+
+
+
+#---
+# Functions
+#---
+
+def is_unbounded(value):
+    '''Return True if a limit (e.g. capacity of an edge) stands for no limit
+    '''
+    return abs(value) >= global_variables['unbounded_limit']
+
+
+def map_unbounded(values):
+    '''Return limits with those that stand for no limit (see is_unbounded) as +/- infinity
+    '''
+    values = np.asarray(values,dtype=float)
+    return np.where(np.abs(values) >= global_variables['unbounded_limit'],np.sign(values) * np.inf,values)
+
+
+def scale_rows(self):
+    '''Scale rows whose coefficients are all above 1 or all below 0.1 (e.g. emissions in
+        g/kWh) by a power of ten, so that their largest coefficient is in (0.1,1]. Rows
+        of factor constraints (updated in place) are left as built. Scaled rows are
+        rebuilt in one pass (added at the end of the model under their names, in place
+        of the rows as built, also in target_constrs and demand_constrs). Returns scales
+        of rows as {row index : scale}.
+    '''
+    model = self.model
+    model.update()
+    constrs = model.getConstrs()
+    if not constrs:
+        return {}
+    A = model.getA().tocsr()
+    nonzeros,(coef_min,coef_max) = get_line_ranges(A,len(constrs))
+    factor_rows = {constr.index for constrs_of in getattr(self,'factor_constrs',{}).values() \
+                        for constr,lhs,rhs in constrs_of}
+    with np.errstate(invalid='ignore'):
+        scaled = (nonzeros > 0) & ((coef_min > 1) | (coef_max <= 0.1))
+    rows = np.array([r for r in np.flatnonzero(scaled) if r not in factor_rows],dtype=np.int64)
+    if not len(rows):
+        return {}
+    scales  = 10.0**-np.ceil(np.log10(coef_max[rows]))
+    old     = [constrs[r] for r in rows]
+    names   = model.getAttr('ConstrName',old)
+    sense   = np.array(model.getAttr('Sense',old))
+    rhs     = np.array(model.getAttr('RHS',old))
+    new     = model.addMConstr(sp.diags(scales) @ A[rows],None,sense,rhs * scales).tolist()
+    model.update()
+    model.setAttr('ConstrName',new,names)
+    # rows held by the model run refer to the rebuilt rows
+    rebuilt = dict(zip(rows.tolist(),new))
+    if hasattr(self,'target_constrs'):
+        self.target_constrs = [rebuilt.get(c.index,c) for c in self.target_constrs]
+    if hasattr(self,'demand_constrs'):
+        self.demand_constrs = gp.tupledict({k : rebuilt.get(c.index,c) for k,c in self.demand_constrs.items()})
+    model.remove(old)
+    model.update()
+    return {int(c.index) : float(s) for c,s in zip(new,scales)}
+
+
+def unscale_constr_attributes(self,attributes,constrs):
+    '''Return attributes of constraints (from get_attributes) in the units of the rows
+        as built: Pi is multiplied and Slack, RHS and its ranges divided by the scale
+        of each row (see scale_rows)
+    '''
+    row_scales = getattr(self,'row_scales',{})
+    if not row_scales:
+        return attributes
+    scales = np.array([row_scales.get(c.index,1.0) for c in constrs])
+    for attribute,values in attributes.items():
+        if attribute == 'Pi':
+            attributes[attribute] = values * scales
+        elif attribute in ROW_ATTRIBUTES:
+            attributes[attribute] = values / scales
+    return attributes
+
+
+def get_model_ranges(model):
+    '''Return [min, max] of absolute nonzero (finite) coefficients, rhs, bounds and
+        objective coefficients of a gurobi model (from its model attributes)
+    '''
+    model.update()
+    ranges = {}
+    for key,attribute in [('matrix','Coeff'),('rhs','RHS'),('bounds','Bound'),('objective','ObjCoeff')]:
+        low,high = model.getAttr('Min' + attribute),model.getAttr('Max' + attribute)
+        ranges[key] = [low,high] if high > 0 else None
+    return ranges
+
+
+def get_row_families(model,rows):
+    '''Return constraint families of rows (by index)
+    '''
+    constrs = model.getConstrs()
+    return [get_family(constrs[r].ConstrName) for r in rows]
+
+
+def check_model_ranges(model,pprint=True):
+    '''Check ranges of a gurobi model against max_matrix_range and max_rhs_bound (in
+        global_variables), warning of each range out of limits; returns ranges
+    '''
+    ranges   = get_model_ranges(model)
+    problems = []
+    if ranges['matrix'] and ranges['matrix'][1] / ranges['matrix'][0] > global_variables['max_matrix_range']:
+        # rows holding the smallest and largest coefficient
+        nonzeros,(coef_min,coef_max) = get_line_ranges(model.getA().tocsr(),model.NumConstrs)
+        with np.errstate(invalid='ignore'):
+            families = get_row_families(model,[np.nanargmin(coef_min),np.nanargmax(coef_max)])
+        problems.append('matrix range [%.1e, %.1e] (smallest in %s, largest in %s)' \
+                            % tuple(ranges['matrix'] + families))
+    if ranges['rhs'] and ranges['rhs'][1] > global_variables['max_rhs_bound']:
+        rhs = np.abs(np.array(model.getAttr('RHS',model.getConstrs()),dtype=float))
+        problems.append('rhs up to %.1e (in %s)' \
+                            % (ranges['rhs'][1],get_row_families(model,[np.argmax(np.where(np.isfinite(rhs),rhs,0))])[0]))
+    if ranges['bounds'] and ranges['bounds'][1] > global_variables['max_rhs_bound']:
+        problems.append('bounds up to %.1e' % ranges['bounds'][1])
+    if ranges['objective'] and ranges['objective'][1] / ranges['objective'][0] > global_variables['max_matrix_range']:
+        problems.append('objective range [%.1e, %.1e]' % tuple(ranges['objective']))
+    ranges['problems'] = problems
+    if pprint and problems:
+        warnings.warn('Model may be numerically difficult: ' + '; '.join(problems))
+    return ranges
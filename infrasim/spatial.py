@@ -0,0 +1,85 @@
+'''
+    spatial.py
+
+        Spatial layer of infrasim: reading shapefiles and adding topology to edges
+        from their geometry (geopandas, shapely). Imported only when spatial data
+        is read, so that models from csv files (or read from the cache without
+        geometry) do not load geopandas.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import warnings
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+# relative imports
+from .global_variables import *
+
+
+
+#---
+# Reading
+#---
+
+def read_spatial_data(path):
+    '''Read a shapefile (or any file read by geopandas) as a geodataframe
+    '''
+    return gpd.read_file(path)
+
+
+def to_geodataframe(df,crs=None):
+    '''Return a dataframe with geometry as well-known binary as a geodataframe
+    '''
+    return gpd.GeoDataFrame(df,geometry=gpd.GeoSeries.from_wkb(df.geometry),crs=crs if crs else None)
+
+
+
+#---
+# Topology
+#---
+
+def snap_edges_to_nodes(nodes,edges,field_to_read='name',tolerance=None):
+    '''Return nearest node and snapping distance of the start and end of each edge
+
+    Endpoints of all edges are queried at once against the spatial index of the
+    nodes. Distances are in units of the coordinate reference system; endpoints
+    further than the tolerance from the nearest node are flagged.
+    '''
+    if tolerance is None:
+        tolerance = global_variables['topology_snap_tolerance']
+    lines  = np.asarray(edges.geometry.values)
+    report = []
+    for end,position in [('from',0),('to',-1)]:
+        points = shapely.get_point(lines,position)
+        idx,distance = nodes.sindex.nearest(points,return_all=False,return_distance=True)
+        order  = np.argsort(idx[0],kind='stable')
+        report.append(pd.DataFrame({'edge'      : edges.index.to_numpy(),
+                                    'end'       : end,
+                                    'node'      : nodes[field_to_read].to_numpy()[idx[1][order]],
+                                    'distance'  : distance[order]}))
+    report = pd.concat(report,ignore_index=True)
+    report['within_tolerance'] = report.distance <= tolerance
+    return report
+
+
+def add_toplogy(nodes,edges,i='from_id',j='to_id',field_to_read='name',tolerance=None):
+    '''Add i,j,k notation to edges
+    '''
+    report = snap_edges_to_nodes(nodes,edges,field_to_read=field_to_read,tolerance=tolerance)
+    #nearest node to the START coordinates of the line
+    edges[i] = report.loc[report.end=='from','node'].to_numpy()
+    #nearest node to the END coordinates of the line
+    edges[j] = report.loc[report.end=='to','node'].to_numpy()
+    # flag edges that do not end at a node
+    if not report.within_tolerance.all():
+        far = report[~report.within_tolerance]
+        warnings.warn('%d edge ends are further than the snapping tolerance from the nearest node '
+                      '(max. distance %g)' % (len(far),far.distance.max()))
+    return edges
@@ -0,0 +1,322 @@
+'''
+    sweep.py
+
+        Sweeps of a parameter of a built NexTra model (e.g. ss_factor or solar and
+        wind price factors) solved as scenarios of one gurobi multi-scenario model.
+        Variants that differ in objective coefficients (price factors), variable
+        bounds (connectivity) or right-hand sides are set as ScenNObj, ScenNUB and
+        ScenNRHS and solved in one call. A factor constraint (factor * lhs = rhs)
+        is a right-hand side when lhs is fixed by equality rows, e.g. total demand
+        in wb_ss and gaz_ss. Variants that change other coefficients (e.g.
+        coo_factor) are solved in sequence, warm-started from the previous basis.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import time
+
+import numpy as np
+import pandas as pd
+import gurobipy as gp
+
+# relative imports
+from .utils import *
+from .energy import expand_annual_energy
+
+# factors of factor constraints and their setters in nextra
+FACTOR_SETTERS = {'ss_factor'   : 'set_self_sufficiency_factor',
+                  'coo_factor'  : 'set_coo_factor'}
+PRICE_FACTORS  = ['solar_price_factor','wind_price_factor']
+
+
+
+#---
+# Functions
+#---
+
+def get_expression_coeffs(expr,scale=1):
+    '''Return coefficients of a LinExpr as {variable index : (variable, coefficient)}
+    '''
+    coeffs = {}
+    for i in range(expr.size()):
+        v = expr.getVar(i)
+        c = coeffs.get(v.index,(v,0))[1]
+        coeffs[v.index] = (v,c + scale * expr.getCoeff(i))
+    return coeffs
+
+
+def get_fixed_expression_value(model_run,expr):
+    '''Return value of a linear expression fixed by equality rows of the model (e.g.
+        flows into demand nodes, summed over time, by energy_demand rows), or None
+        if it is not a weighted sum of equality rows
+    '''
+    model = model_run.model
+    model.update()
+    # annual energy of arcs as the flows it is linked to
+    coeffs = get_expression_coeffs(expand_annual_energy(model_run,expr))
+    if not coeffs:
+        return expr.getConstant()
+    cols = np.array(sorted(coeffs))
+    l    = np.zeros(model.NumVars)
+    l[cols] = [coeffs[j][1] for j in cols]
+    A = model.getA().tocsr()
+    constrs = model.getConstrs()
+    sense   = np.array(model.getAttr('Sense',constrs))
+    rhs     = np.array(model.getAttr('RHS',constrs))
+    # equality rows over variables of the expression only (other than factor constraints)
+    factor_rows = [c.index for constrs in getattr(model_run,'factor_constrs',{}).values() for c,lhs,rhs in constrs]
+    rows = np.unique(A[:,cols].tocoo().row)
+    rows = rows[(sense[rows] == '=') & ~np.isin(rows,factor_rows)]
+    inside = np.isin(A.indices,cols)
+    rows = [r for r in rows if inside[A.indptr[r]:A.indptr[r+1]].all()]
+    if not rows:
+        return None
+    # weight of each row from its first variable
+    weights = np.array([l[A.indices[A.indptr[r]]] / A.data[A.indptr[r]] for r in rows])
+    combined = A[rows].T @ weights
+    if not np.allclose(combined,l,rtol=1e-9,atol=1e-12):
+        return None
+    return float(weights @ rhs[rows]) + expr.getConstant()
+
+
+def get_connectivity_arcs(model_run,name):
+    '''Return arc flow variables of an interconnector (e.g. jordan_to_israel)
+    '''
+    i,j = connectivity_arcs[name]
+    if any(a[0] == i and a[1] == j for a in model_run.arcFlows.pruned):
+        return None
+    return model_run.arcFlows.select(i,j,'*','*')
+
+
+
+#---
+# Sweep class
+#---
+
+class parameter_sweep():
+
+
+    def __init__(self,model_run,parameter,values,**kwargs):
+        '''
+
+        Parameters
+        ----------
+        model_run : nextra
+            Built model run.
+        parameter : str
+            ss_factor, coo_factor, solar_price_factor, wind_price_factor or an
+            interconnector (e.g. jordan_to_israel).
+        values : list
+            Values of the parameter.
+        mode : str, optional
+            'auto' (default): one multi-scenario model if all variants can be set as
+            scenario attributes, sequential solves otherwise; 'multi' or 'sequential'.
+        method : int, optional
+            Gurobi Method of sequential solves (default: simplex, which is warm
+            started from the basis of the previous solve).
+
+        Returns
+        -------
+        None.
+
+        '''
+        self.model_run = model_run
+        self.parameter = parameter
+        self.values    = list(values)
+        self.mode      = kwargs.get('mode','auto')
+        self.method    = kwargs.get('method',None)
+        if parameter not in list(FACTOR_SETTERS) + PRICE_FACTORS + list(connectivity_arcs):
+            raise ValueError('cannot sweep ' + parameter)
+        if self.mode not in ['auto','multi','sequential']:
+            raise ValueError('mode must be auto, multi or sequential')
+
+        # attributes of each scenario, or the reason why there are none
+        self.reason = None
+        if self.mode != 'sequential':
+            self.scenarios = self.get_scenario_attributes()
+            if self.scenarios is None and self.mode == 'multi':
+                raise ValueError('cannot sweep ' + parameter + ' as a multi-scenario model: ' + self.reason)
+        else:
+            self.scenarios = None
+
+        self.results       = {}
+        self.results_sweep = pd.DataFrame()
+
+
+    def get_scenario_attributes(self):
+        '''Return {attribute : (items, [values of each scenario])} of the sweep as
+            scenario attributes (ScenNObj, ScenNUB, ScenNRHS), or None
+        '''
+        model_run = self.model_run
+        parameter = self.parameter
+        if parameter in PRICE_FACTORS:
+            current = getattr(model_run,parameter)
+            keys = list(model_run.annual_capacity.keys())
+            objs = []
+            for value in self.values:
+                setattr(model_run,parameter,value)
+                objective = make_capex_objective(model_run)
+                objs.append([objective.getCoeff(i) for i in range(objective.size())])
+            setattr(model_run,parameter,current)
+            model_run.capex_dict = make_capex_dict(model_run)
+            return {'ScenNObj' : ([model_run.annual_capacity[k] for k in keys],objs)}
+
+        if parameter in connectivity_arcs:
+            arcs = get_connectivity_arcs(model_run,parameter)
+            if arcs is None:
+                self.reason = parameter + ' has no arcs in the model (build with prune_arcs=False)'
+                return None
+            bounds = map_unbounded(self.values) if model_run.scaling else self.values
+            return {'ScenNUB' : (arcs,[[float(bound)]*len(arcs) for bound in bounds])}
+
+        # factor constraints: factor * lhs - rhs (sense) 0 is -rhs (sense) -factor * D
+        #   if lhs is fixed to D by equality rows
+        constrs = []
+        for constr,lhs,rhs in model_run.factor_constrs.get(parameter,[]):
+            fixed = get_fixed_expression_value(model_run,lhs)
+            if fixed is None:
+                self.reason = parameter + ' is a coefficient of ' + constr.ConstrName \
+                                + ' (its lhs is not fixed by equality rows)'
+                return None
+            constrs.append((constr,lhs,rhs,fixed))
+        if not constrs:
+            self.reason = 'no constraints with ' + parameter + ' in the model'
+            return None
+        self.factor_rows = constrs
+        return {'ScenNRHS' : ([c[0] for c in constrs],
+                              [[rhs.getConstant() - value * fixed for constr,lhs,rhs,fixed in constrs] \
+                                    for value in self.values])}
+
+
+    def set_factor_rows(self):
+        '''Drop the (fixed) lhs from factor constraints, leaving -rhs (sense) -factor * D
+        '''
+        model = self.model_run.model
+        value = getattr(self.model_run,self.parameter)
+        for constr,lhs,rhs,fixed in self.factor_rows:
+            coeffs = get_expression_coeffs(lhs,0)
+            coeffs.update(get_expression_coeffs(rhs,-1))
+            for v,c in coeffs.values():
+                model.chgCoeff(constr,v,c)
+            constr.RHS = rhs.getConstant() - value * fixed
+
+
+    def reset_factor_rows(self):
+        '''Restore factor constraints to factor * lhs - rhs (sense) 0
+        '''
+        update_factor_constrs(self.model_run,self.parameter)
+        value = getattr(self.model_run,self.parameter)
+        for constr,lhs,rhs,fixed in self.factor_rows:
+            constr.RHS = rhs.getConstant() - value * lhs.getConstant()
+
+
+    def set_parameter(self,value):
+        '''Update the parameter of the built model in place
+        '''
+        model_run = self.model_run
+        if self.parameter in FACTOR_SETTERS:
+            getattr(model_run,FACTOR_SETTERS[self.parameter])(value)
+        elif self.parameter in PRICE_FACTORS:
+            model_run.set_price_factors(**{self.parameter : value})
+        else:
+            model_run.set_connectivity(**{self.parameter : value})
+
+
+    def run(self,pprint=True):
+        '''Solve all values of the parameter, collecting results of each
+        '''
+        if self.scenarios is not None:
+            self.run_multi_scenario(pprint)
+        else:
+            if pprint and self.reason is not None:
+                print('> Sequential sweep: ' + self.reason)
+            self.run_sequential(pprint)
+        return self
+
+
+    def run_multi_scenario(self,pprint=True):
+        '''Solve all values as scenarios of one multi-scenario model
+        '''
+        model_run = self.model_run
+        model     = model_run.model
+        if 'ScenNRHS' in self.scenarios:
+            self.set_factor_rows()
+        summary = []
+        try:
+            model.NumScenarios = len(self.values)
+            for s in range(len(self.values)):
+                model.Params.ScenarioNumber = s
+                for attr,(items,values) in self.scenarios.items():
+                    model.setAttr(attr,items,values[s])
+
+            start_time = time.time()
+            model_run.run(pprint=False,write=False)
+            solve_time = time.time() - start_time
+
+            variables = model.getVars()
+            for s,value in enumerate(self.values):
+                model.Params.ScenarioNumber = s
+                objective = model.ScenNObjVal
+                status    = gp.GRB.OPTIMAL if model.Status == gp.GRB.OPTIMAL and abs(objective) < gp.GRB.INFINITY \
+                                else gp.GRB.INFEASIBLE
+                if status == gp.GRB.OPTIMAL:
+                    # results of the scenario from its solution vector
+                    model_run.solution           = np.array(model.getAttr('ScenNX',variables))
+                    model_run.solution_status    = status
+                    model_run.solution_objective = objective
+                    self.results[value]       = model_run.get_results()
+                summary.append({self.parameter : value,
+                                'status'       : status,
+                                'objective'    : objective if status == gp.GRB.OPTIMAL else None,
+                                'mode'         : 'multi',
+                                'solve'        : solve_time / len(self.values)})
+                if pprint:
+                    print('> %s = %s: status %d' % (self.parameter,value,status))
+        finally:
+            # leave the model as it was before the sweep
+            model_run.solution = None
+            model.NumScenarios = 0
+            if 'ScenNRHS' in self.scenarios:
+                self.reset_factor_rows()
+        self.results_sweep = pd.DataFrame(summary)
+
+
+    def run_sequential(self,pprint=True):
+        '''Update the parameter in place and solve each value in turn, warm started from
+            the basis of the previous solve
+        '''
+        model_run = self.model_run
+        model     = model_run.model
+        method    = model.Params.Method
+        current   = model_run.connectivity[self.parameter] if self.parameter in connectivity_arcs \
+                        else getattr(model_run,self.parameter)
+        if self.method is not None:
+            model.setParam('Method',self.method)
+        else:
+            # primal simplex keeps a feasible basis when the objective changes, dual otherwise
+            model.setParam('Method',0 if self.parameter in PRICE_FACTORS else 1)
+        summary = []
+        for value in self.values:
+            self.set_parameter(value)
+            start_time = time.time()
+            model_run.run(pprint=False,write=False)
+            solve_time = time.time() - start_time
+            status = get_solve_status(model_run)
+            if status == gp.GRB.OPTIMAL:
+                self.results[value] = model_run.get_results()
+            summary.append({self.parameter : value,
+                            'status'       : status,
+                            'objective'    : model.ObjVal if status == gp.GRB.OPTIMAL else None,
+                            'mode'         : 'sequential',
+                            'solve'        : solve_time,
+                            'iterations'   : model.IterCount})
+            if pprint:
+                print('> %s = %s: status %d in %.1fs' % (self.parameter,value,status,solve_time))
+        # leave the model as it was before the sweep
+        self.set_parameter(current)
+        model.setParam('Method',method)
+        self.results_sweep = pd.DataFrame(summary)
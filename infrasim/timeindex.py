@@ -0,0 +1,133 @@
+'''
+    timeindex.py
+
+        Time dimension of the NexTra model. The (timestep, hour, day, month, year)
+        reference is built once from the flow data and provides arrays, sets and
+        boolean masks of timesteps by year, month, hour and battery charging window,
+        so that model builders and postprocessing do not rescan the flow table.
+
+    @amanmajid
+'''
+
+#---
+# Modules
+#---
+
+import numpy as np
+import pandas as pd
+
+# relative imports
+from .global_variables import *
+
+
+
+#---
+# Time index
+#---
+
+class time_index():
+
+
+    def __init__(self,flows,charge_hours=global_variables['battery_charge_hours']):
+        '''
+
+        Parameters
+        ----------
+        flows : DataFrame
+            Flow data in long format with timestep, day, month and year columns
+            (and hour, if sub-daily).
+        charge_hours : list
+            Hours of the day in which batteries charge.
+
+        Returns
+        -------
+        None.
+
+        '''
+        columns  = [c for c in ['timestep','date','hour','day','month','year'] if c in flows.columns]
+        self.ref = flows[columns].drop_duplicates(subset='timestep').reset_index(drop=True)
+
+        # arrays aligned with timesteps
+        self.timestep = self.ref.timestep.to_numpy(dtype=np.int64)
+        self.day      = self.ref.day.to_numpy(dtype=np.int64)
+        self.month    = self.ref.month.to_numpy(dtype=np.int64)
+        self.year     = self.ref.year.to_numpy(dtype=np.int64)
+        self.hour     = self.ref.hour.to_numpy(dtype=np.int64) if 'hour' in self.ref.columns else None
+
+        # sets (in order of appearance, as in the flow data)
+        self.timesteps = self.timestep.tolist()
+        self.days      = self.ref.day.unique().tolist()
+        self.months    = self.ref.month.unique().tolist()
+        self.years     = self.ref.year.unique().tolist()
+        self.hours     = self.ref.hour.unique().tolist() if self.hour is not None else []
+
+        # weight of each timestep (number of timesteps it represents, see aggregation.py)
+        if 'weight' in flows.columns:
+            self.weight = flows.drop_duplicates(subset='timestep').weight.to_numpy(dtype=float)
+        else:
+            self.weight = np.ones(len(self.timestep))
+
+        # position of each timestep value (-1 if not modelled)
+        self.position = np.full(self.timestep.max()+1 if len(self.timestep) else 1,-1,dtype=np.int64)
+        self.position[self.timestep] = np.arange(len(self.timestep))
+
+        # timesteps without a preceding timestep (i.e. start of the horizon or of a
+        # representative period), at which storage starts and ramping is not constrained
+        if 'period' in flows.columns:
+            period = flows.drop_duplicates(subset='timestep').period.to_numpy()
+            starts = np.r_[True,period[1:] != period[:-1]] if len(period) else np.zeros(0,dtype=bool)
+        else:
+            starts = ~np.isin(self.timestep-1,self.timestep)
+        self.starts = set(self.timestep[starts].tolist())
+
+        # battery charging window
+        if self.hour is not None:
+            self.charging = np.isin(self.hour,charge_hours)
+        else:
+            self.charging = np.zeros(len(self.timestep),dtype=bool)
+
+        # look-ups
+        self.year_of     = dict(zip(self.timesteps,self.year.tolist()))
+        self.by_year     = {y : set(self.timestep[self.year==y].tolist()) for y in self.years}
+        self.by_month    = {m : set(self.timestep[self.month==m].tolist()) for m in self.months}
+        self.by_hour     = {h : set(self.timestep[self.hour==h].tolist()) for h in self.hours}
+        self.charging_timesteps    = set(self.timestep[self.charging].tolist())
+        self.discharging_timesteps = set(self.timestep[~self.charging].tolist())
+
+
+    def mask(self,year=None,month=None,hour=None,charging=None):
+        '''Return boolean mask over timesteps for the given year/month/hour/charging window
+        '''
+        mask = np.ones(len(self.timestep),dtype=bool)
+        if year is not None:
+            mask &= np.isin(self.year,year)
+        if month is not None:
+            mask &= np.isin(self.month,month)
+        if hour is not None:
+            mask &= np.isin(self.hour,hour)
+        if charging is not None:
+            mask &= self.charging if charging else ~self.charging
+        return mask
+
+
+    def select(self,**kwargs):
+        '''Return array of timesteps matching the given year/month/hour/charging window
+        '''
+        return self.timestep[self.mask(**kwargs)]
+
+
+    def timesteps_per_year(self):
+        '''Return number of (represented) timesteps in each year as {y : count}
+        '''
+        years,inverse = np.unique(self.year,return_inverse=True)
+        counts = np.bincount(inverse,weights=self.weight,minlength=len(years))
+        if (self.weight == 1).all():
+            counts = counts.astype(np.int64)
+        return dict(zip(years.tolist(),counts.tolist()))
+
+
+    def represented_timesteps(self):
+        '''Return number of timesteps represented by the time index (i.e. sum of weights)
+        '''
+        total = self.weight.sum()
+        return int(total) if (self.weight == 1).all() else float(total)
@@ -16,17 +16,17 @@
 import os
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 import warnings
 import datetime
 import os
 import shutil
-import snkit
 import time
-from shapely.geometry import Point
+import gurobipy as gp
 
 # relative imports
 from .global_variables import *
+from .timeindex import time_index
+from .scaling import map_unbounded, unscale_constr_attributes
 
 
 #---
@@ -189,13 +189,26 @@ def get_nodes_by_technology(nodes,technology):
 def get_timesteps_by_year(self,year):
     '''Return all timesteps (t) associated with a given year
     '''
-    return self.time_ref[self.time_ref.year==year].timestep.to_list()
+    return self.time.select(year=year).tolist()
+
+
+def get_timesteps_per_year(self):
+    '''Return number of timesteps (t) in each year as {y : count}
+    '''
+    return self.time.timesteps_per_year()
+
+
+def get_capacity_change_year(self):
+    '''Return the year in which capacities can change (first year after the 2019 baseline)
+    '''
+    years = [y for y in sorted(self.years) if y != 2019]
+    return years[0] if years else None
 
 
 def get_timesteps_battery_charging(self,year):
     '''Return all timesteps (t) for battery charging times
     '''
-    return self.time_ref[self.time_ref.year==year].timestep.to_list()
+    return self.time.select(year=year,charging=True).tolist()
 
 
 def get_flow_at_nodes(flows,list_of_nodes):
@@ -252,15 +265,111 @@ def make_cost_dict(self,cost_column='cost'):
 
 
 def make_capex_dict(self,capex_column='capex'):
-    '''Make dictionary of capex (c) as {(n,k,t) : c}
+    '''Make dictionary of capex (c) as {(n,k,t) : c}, incl. solar and wind price factors
     '''
-    return self.nodes[['name','commodity','capex']].set_index(['name','commodity'])['capex'].to_dict()
+    capex_dict = self.nodes[['name','commodity','capex']].set_index(['name','commodity'])['capex'].to_dict()
+    for k in capex_dict.keys():
+        if 'solar' in k[0]:
+            capex_dict[k] = capex_dict[k] * self.solar_price_factor
+        if 'wind' in k[0]:
+            capex_dict[k] = capex_dict[k] * self.wind_price_factor
+    return capex_dict
+
+
+def make_capex_objective(self):
+    '''Make capex objective as a LinExpr of annual capacities, weighted by the number
+        of timesteps in each year (i.e. capacity at every timestep)
+    '''
+    self.capex_dict    = make_capex_dict(self)
+    timesteps_per_year = get_timesteps_per_year(self)
+    keys = list(self.annual_capacity.keys())
+    return gp.LinExpr([self.capex_dict[n,k] * timesteps_per_year[y] for n,k,y in keys],
+                      [self.annual_capacity[key] for key in keys])
+
+
+def make_flow_cost_objective(self):
+    '''Make cost of flow objective as a LinExpr of arc flows (e.g. for dispatch with
+        fixed capacities)
+    '''
+    return gp.LinExpr(self.params.cost.tolist(),
+                      [self.arcFlows[a] for a in self.arc_indicies])
+
+
+def add_factor_constr(self,factor,lhs,sense,rhs,name):
+    '''Add constraint (factor * lhs) (sense) rhs, where factor is an attribute of the model
+        run (e.g. ss_factor), and register it so that the factor can be updated in place
+    '''
+    constr = self.model.addLConstr(getattr(self,factor) * lhs - rhs,sense,0,name)
+    if not hasattr(self,'factor_constrs'):
+        self.factor_constrs = {}
+    self.factor_constrs.setdefault(factor,[]).append((constr,lhs,rhs))
+    return constr
+
+
+def update_factor_constrs(self,factor):
+    '''Update coefficients of constraints registered with add_factor_constr to the
+        current value of factor
+    '''
+    value = getattr(self,factor)
+    for constr,lhs,rhs in getattr(self,'factor_constrs',{}).get(factor,[]):
+        # sum coefficients of variables appearing in both lhs and rhs
+        coeffs = {}
+        for expr,scale in [(lhs,value),(rhs,-1)]:
+            for i in range(expr.size()):
+                v = expr.getVar(i)
+                c = coeffs.get(v.index,(v,0))[1]
+                coeffs[v.index] = (v,c + scale * expr.getCoeff(i))
+        for v,c in coeffs.values():
+            self.model.chgCoeff(constr,v,c)
+
+
+def get_zero_capacity_edges(self):
+    '''Return boolean mask of edge indices that cannot carry flow (i.e. upper bound of 0)
+        and are left out of the model (unless prune_arcs is False)
+    '''
+    if not getattr(self,'prune_arcs',True):
+        return pd.Series(False,index=self.edge_indices.index)
+    return (self.edge_indices.maximum == 0) & (self.edge_indices.minimum <= 0)
 
 
 def make_edge_indices(self):
-    '''Make edge indices as [(i,j,k,t)] for algebraic modelling
+    '''Make edge indices as [(i,j,k,t)] for algebraic modelling (excl. zero capacity edges)
+    '''
+    edges = self.edge_indices[~get_zero_capacity_edges(self)]
+    return edges[self.indices].set_index(keys=self.indices).index.to_list()
+
+
+def make_pruned_edge_indices(self):
+    '''Make indices of zero capacity edges as [(i,j,k,t)], which are left out of the model
+    '''
+    edges = self.edge_indices[get_zero_capacity_edges(self)]
+    return edges[self.indices].set_index(keys=self.indices).index.to_list()
+
+
+def make_edge_variable_bounds(self,bound_column='maximum'):
+    '''Make array of arc flow variable bounds aligned with make_edge_indices
+        (lower bounds are no less than 0, as arc flows are non-negative; with scaling,
+        upper bounds that stand for no limit are infinite)
     '''
-    return self.edge_indices[self.indices].set_index(keys=self.indices).index.to_list()
+    bound = self.edge_indices.loc[~get_zero_capacity_edges(self),bound_column].to_numpy(dtype=float)
+    if bound_column == 'minimum':
+        bound = np.maximum(bound,0)
+    elif getattr(self,'scaling',False):
+        bound = map_unbounded(bound)
+    return bound
+
+
+class arcflows(gp.tupledict):
+    '''tupledict of arc flow variables in which pruned (zero capacity) arcs read as zero
+    '''
+    def __init__(self,variables,pruned=()):
+        super().__init__(variables)
+        self.pruned = set(pruned)
+
+    def __missing__(self,key):
+        if key in self.pruned:
+            return gp.LinExpr()
+        raise KeyError(key)
 
 
 def make_storage_indices(self):
@@ -273,15 +382,54 @@ def make_storage_indices(self):
                 for t in self.timesteps]
 
 
+def get_storage_volume_lb(self):
+    '''Return lower bound of storage volumes (volumes relative to the start of a
+        representative period can be negative)
+    '''
+    if getattr(self,'representative_periods',None) is None:
+        return 0
+    return -gp.GRB.INFINITY
+
+
+def get_initial_storage(self):
+    '''Return storage volumes preceding the first timestep as {(n,k) : volume}
+        (empty unless carried over from a previous horizon, see rolling.py)
+    '''
+    return getattr(self,'initial_storage',None) or {}
+
+
+def get_initial_dispatch(self):
+    '''Return supply from nodes in the timestep preceding the first timestep as
+        {(n,k) : supply}, from which ramping is constrained (see rolling.py)
+    '''
+    return getattr(self,'initial_dispatch',None) or {}
+
+
 def make_capacity_indices(self):
-    '''Make capacity indices as [(n,k,t)] for algebraic modelling
+    '''Make capacity indices as [(n,k,y)] for algebraic modelling
     '''
     source_nodes = get_source_nodes(self.nodes)
     node_list    = source_nodes.name.to_list() + ['israel_gas_storage','israel_battery_storage','jordan_battery_storage','west_bank_battery_storage','gaza_battery_storage']
-    return [(n,k,t) \
+    return [(n,k,y) \
         for n in node_list \
             for k in ['electricity'] \
-                for t in self.timesteps]
+                for y in self.years]
+
+
+def get_year_of_timesteps(self):
+    '''Return dictionary of the year of each timestep as {t : y}
+    '''
+    return self.time.year_of
+
+
+def map_capacity_to_timesteps(self,annual_capacity):
+    '''Return a view of annual capacities (n,k,y) at each timestep as {(n,k,t) : var}
+    '''
+    year_of = get_year_of_timesteps(self)
+    nodes   = dict.fromkeys((n,k) for n,k,y in annual_capacity.keys())
+    return gp.tupledict(((n,k,t),annual_capacity[n,k,year_of[t]]) \
+                            for n,k in nodes \
+                                for t in self.timesteps)
         
 
 def edge_indices_to_dict(self,varname):
@@ -323,16 +471,6 @@ def tidy_flow_data(flows):
     return flows.melt(id_vars=['timestep','date','hour','day','month','year'],
                       var_name='node',
                       value_name='value')
-    
-
-def add_toplogy(nodes,edges,i='from_id',j='to_id',field_to_read='name'):
-    '''Add i,j,k notation to edges
-    '''
-    #find nearest node to the START coordinates of the line -- and return the 'ID' attribute
-    edges[i] = edges.geometry.apply(lambda geom: snkit.network.nearest(Point(geom.coords[0]), nodes)[field_to_read])
-    #find nearest node to the END coordinates of the line -- and return the 'ID' attribute
-    edges[j] = edges.geometry.apply(lambda geom: snkit.network.nearest(Point(geom.coords[-1]), nodes)[field_to_read])
-    return edges
 
 
 
@@ -343,7 +481,7 @@ def add_toplogy(nodes,edges,i='from_id',j='to_id',field_to_read='name'):
 def init_vars(self,scenario,energy_objective):
     '''Initialise input variables
     '''
-    self.connectivity       = connectivity
+    self.connectivity       = connectivity.copy()
     self.global_variables   = global_variables
     self.scenario           = scenario
     self.energy_objective   = energy_objective
@@ -403,7 +541,8 @@ def read_node_data(path_to_nodes):
     '''Read nodal data
     '''
     if '.shp' in path_to_nodes:
-        nodes = gpd.read_file(path_to_nodes)
+        from .spatial import read_spatial_data
+        nodes = read_spatial_data(path_to_nodes)
     elif '.csv' in path_to_nodes:
         nodes = pd.read_csv(path_to_nodes)
     else:
@@ -419,7 +558,8 @@ def read_edge_data(path_to_edges):
     '''Read edge data
     '''
     if '.shp' in path_to_edges:
-        edges = gpd.read_file(path_to_edges)
+        from .spatial import read_spatial_data
+        edges = read_spatial_data(path_to_edges)
     elif '.csv' in path_to_edges:
         edges = pd.read_csv(path_to_edges)
     else:
@@ -483,46 +623,282 @@ def read_flow_data(path_to_flows,**kwargs):
         raise ValueError('flow file must be in csv format')
 
 
+def get_variable_values(model_run,variables):
+    '''Return values of a tupledict of variables as {key : value}, from the solution
+        vector of a model run solved by parts (see components.py) or from the model
+    '''
+    solution = getattr(model_run,'solution',None)
+    if solution is None:
+        return model_run.model.getAttr('x',variables)
+    return {key : solution[v.index] for key,v in variables.items()}
+
+
+def get_objective_value(model_run):
+    '''Return objective value of the last solve of a model run (solved as one model or by parts)
+    '''
+    if getattr(model_run,'solution',None) is not None:
+        return model_run.solution_objective
+    return model_run.model.ObjVal
+
+
+def get_solve_status(model_run):
+    '''Return gurobi status of the last solve of a model run (solved as one model or by parts)
+    '''
+    if getattr(model_run,'solution',None) is not None:
+        return model_run.solution_status
+    return model_run.model.Status
+
+
+def get_variable_array(model_run,variables):
+    '''Return values of a tupledict of variables as an array (in the order of its keys),
+        in one bulk call to the model or from the solution vector of a model run
+    '''
+    solution = getattr(model_run,'solution',None)
+    if solution is None:
+        return np.array(model_run.model.getAttr('x',list(variables.values())),dtype=float)
+    return solution[np.fromiter((v.index for v in variables.values()),dtype=np.int64,count=len(variables))]
+
+
+def get_time_columns(self,timesteps):
+    '''Return hour, day, month and year of timesteps as {column : array} from the time index
+    '''
+    position = self.time.position[np.asarray(timesteps,dtype=np.int64)]
+    return {c : self.time.ref[c].to_numpy()[position] for c in ['hour','day','month','year']}
+
+
+def fetch_edge_flow_arrays(model_run):
+    '''Get edge flow results as a table of arcs (arc,from_id,to_id,commodity) and a
+        compact table of flows (arc,timestep,value), ordered by timestep
+    '''
+    keys   = list(model_run.arcFlows.keys())
+    values = get_variable_array(model_run,model_run.arcFlows)
+    # pruned (zero capacity) arcs carry no flow
+    pruned = sorted(getattr(model_run.arcFlows,'pruned',[]))
+    if pruned:
+        keys   = keys + pruned
+        values = np.concatenate([values,np.zeros(len(pruned))])
+    i,j,k,t = [np.array(c,dtype=object) for c in zip(*keys)] if keys else [np.array([],dtype=object)]*4
+    # integer id of each (from_id,to_id,commodity), in sorted order
+    codes,labels = zip(*[pd.factorize(c,sort=True) for c in [i,j,k]])
+    code = (codes[0] * len(labels[1]) + codes[1]) * len(labels[2]) + codes[2]
+    unique,arc = np.unique(code,return_inverse=True)
+    arcs = pd.DataFrame({'arc'       : np.arange(len(unique)),
+                         'from_id'   : labels[0][unique // (len(labels[1]) * len(labels[2]))],
+                         'to_id'     : labels[1][unique // len(labels[2]) % len(labels[1])],
+                         'commodity' : labels[2][unique % len(labels[2])]})
+    timestep = t.astype(np.int64)
+    order    = np.argsort(model_run.time.position[timestep],kind='stable')
+    edge_flows = pd.DataFrame({'arc'      : arc[order].astype(np.int32),
+                               'timestep' : timestep[order],
+                               'value'    : values[order]})
+    return arcs,edge_flows
+
+
+def merge_arcs_at_node(arcs,edge_flows,node):
+    '''Remove a node (e.g. israel_gas_storage) from edge flow arrays, joining its inflow
+        and outflow arcs into one arc (flows of arcs joined are averaged)
+    '''
+    into = (arcs.to_id == node).to_numpy()
+    out  = (arcs.from_id == node).to_numpy()
+    if not into.any() or not out.any():
+        return arcs,edge_flows
+    merged = arcs.copy()
+    merged.loc[out,'from_id'] = arcs.from_id[into].iloc[0]
+    merged.loc[into,'to_id']  = arcs.to_id[out].iloc[0]
+    # new ids of arcs (in sorted order)
+    merged = merged.sort_values(by=['from_id','to_id','commodity'],kind='stable')
+    first  = ~merged.duplicated(subset=['from_id','to_id','commodity']).to_numpy()
+    new_id = np.empty(len(arcs),dtype=np.int32)
+    new_id[merged.arc.to_numpy()] = np.cumsum(first) - 1
+    merged = merged[first].reset_index(drop=True)
+    merged['arc'] = np.arange(len(merged))
+    edge_flows = pd.DataFrame({'arc'      : new_id[edge_flows.arc.to_numpy()],
+                               'timestep' : edge_flows.timestep.to_numpy(),
+                               'value'    : edge_flows.value.to_numpy()})
+    edge_flows = edge_flows.groupby(by=['arc','timestep']).value.mean().reset_index()
+    return merged,edge_flows
+
+
+def expand_edge_flows(self,arcs,edge_flows):
+    '''Return edge flow arrays as a table of (from_id,to_id,commodity,hour,day,month,
+        year,timestep,value), joining arcs and time columns by position
+    '''
+    arc = edge_flows.arc.to_numpy()
+    results_arcflows = pd.DataFrame({c : arcs[c].to_numpy()[arc] for c in ['from_id','to_id','commodity']})
+    for c,v in get_time_columns(self,edge_flows.timestep).items():
+        results_arcflows[c] = v
+    results_arcflows['timestep'] = edge_flows.timestep.to_numpy()
+    results_arcflows['value']    = edge_flows.value.to_numpy()
+    return results_arcflows
+
+
 def fetch_edge_flow_results(model_run):
     '''Get edge flow results from model run
     '''
-    arcFlows                = model_run.model.getAttr('x', model_run.arcFlows)
-    keys                    = pd.DataFrame(arcFlows.keys(),columns=['from_id','to_id','commodity','timestep'])
-    vals                    = pd.DataFrame(arcFlows.items(),columns=['key','value'])
-    results_arcflows        = pd.concat([keys,vals],axis=1)
-    results_arcflows        = model_run.flows[['hour','day','month','year','timestep']].merge(results_arcflows, on='timestep')
-    results_arcflows        = results_arcflows[['from_id','to_id','commodity',
-                                                'hour','day','month','year','timestep','value']]
-    results_arcflows        = results_arcflows.drop_duplicates()
-    return results_arcflows
+    arcs,edge_flows = fetch_edge_flow_arrays(model_run)
+    return expand_edge_flows(model_run,arcs,edge_flows)
 
 
 def fetch_storage_results(model_run):
     '''Get storages results from model run
     '''
-    storage_volumes              = model_run.model.getAttr('x', model_run.storage_volume)
-    keys                         = pd.DataFrame(storage_volumes.keys(),columns=['node','commodity','timestep'])
-    vals                         = pd.DataFrame(storage_volumes.items(),columns=['key','value'])
-    results_storage_volumes      = pd.concat([keys,vals],axis=1)
-    results_storage_volumes      = model_run.flows[['hour','day','month','year','timestep']].merge(results_storage_volumes, on='timestep')
+    keys                         = pd.DataFrame(list(model_run.storage_volume.keys()),columns=['node','commodity','timestep'])
+    values                       = get_variable_array(model_run,model_run.storage_volume)
+    order                        = np.argsort(model_run.time.position[keys.timestep.to_numpy()],kind='stable')
+    results_storage_volumes      = keys.iloc[order].reset_index(drop=True)
+    for c,v in get_time_columns(model_run,results_storage_volumes.timestep).items():
+        results_storage_volumes[c] = v
+    results_storage_volumes['value'] = values[order]
     results_storage_volumes      = results_storage_volumes[['node','commodity','hour','day','month','year','timestep','value']]
-    results_storage_volumes      = results_storage_volumes.drop_duplicates()
     return results_storage_volumes
 
 
 def fetch_capacity_results(model_run):
     '''Get capacity indices results from model run
     '''
-    capacity_indices                = model_run.model.getAttr('x', model_run.capacity_indices)
-    keys                            = pd.DataFrame(capacity_indices.keys(),columns=['node','commodity','timestep'])
-    vals                            = pd.DataFrame(capacity_indices.items(),columns=['key','value'])
-    results_capacity_indices        = pd.concat([keys,vals],axis=1)
-    results_capacity_indices        = results_capacity_indices[['node','commodity','timestep','value']]
+    results_capacity_indices        = pd.DataFrame(list(model_run.capacity_indices.keys()),columns=['node','commodity','timestep'])
+    results_capacity_indices['value'] = get_variable_array(model_run,model_run.capacity_indices)
     # map attributes
     results_capacity_indices        = map_attributes(model_run,results_capacity_indices,on='node')
     return results_capacity_indices
 
 
+def has_duals(model_run):
+    '''Return True if the last solve of a model run gave duals and sensitivity ranges,
+        i.e. one LP solved to optimality (not a model solved by parts or scenarios)
+    '''
+    model = model_run.model
+    if getattr(model_run,'solution',None) is not None:
+        return False
+    return model.Status == gp.GRB.OPTIMAL and model.IsMIP == 0 and model.NumScenarios == 0
+
+
+def get_attributes(model,attributes,items):
+    '''Return {attribute : array} of variables or constraints in bulk, with nan for
+        attributes that are not available (e.g. ranges without a basis after barrier)
+    '''
+    values = {}
+    for attribute in attributes:
+        try:
+            values[attribute] = np.array(model.getAttr(attribute,items),dtype=float)
+        except gp.GurobiError:
+            values[attribute] = np.full(len(items),np.nan)
+    return values
+
+
+def fetch_marginal_prices(model_run):
+    '''Get marginal price of electricity at demand nodes in each timestep from duals
+        of energy_demand rows (per unit of demand in the hours a timestep represents)
+    '''
+    constrs = getattr(model_run,'demand_constrs',{})
+    if not constrs or not has_duals(model_run):
+        return pd.DataFrame(columns=['node','hour','day','month','year','timestep','value'])
+    results_prices          = pd.DataFrame(list(constrs.keys()),columns=['timestep','node'])
+    duals                   = unscale_constr_attributes(model_run,
+                                                        get_attributes(model_run.model,['Pi'],list(constrs.values())),
+                                                        list(constrs.values()))['Pi']
+    results_prices['value'] = duals / model_run.time.weight[model_run.time.position[results_prices.timestep]]
+    for c,v in get_time_columns(model_run,results_prices.timestep).items():
+        results_prices[c] = v
+    return results_prices[['node','hour','day','month','year','timestep','value']]
+
+
+def fetch_shadow_prices(model_run,families=None):
+    '''Get shadow prices, slacks and rhs ranges of constraints: rows of the 2030
+        targets or of constraint families named in families (e.g. ['wb_ss','max_curtail'])
+    '''
+    columns = ['constraint','family','value','slack','rhs','rhs_low','rhs_up']
+    if not has_duals(model_run):
+        return pd.DataFrame(columns=columns)
+    model = model_run.model
+    if families is None:
+        constrs = getattr(model_run,'target_constrs',[])
+    else:
+        constrs = model.getConstrs()
+        names   = pd.Series(model.getAttr('ConstrName',constrs)).str.split('[',n=1).str[0]
+        constrs = [constrs[r] for r in np.flatnonzero(names.isin(families).to_numpy())]
+    if not constrs:
+        return pd.DataFrame(columns=columns)
+    attributes = unscale_constr_attributes(model_run,
+                                           get_attributes(model,['Pi','Slack','RHS','SARHSLow','SARHSUp'],constrs),
+                                           constrs)
+    results_shadow_prices = pd.DataFrame({'constraint' : model.getAttr('ConstrName',constrs),
+                                          'value'      : attributes['Pi'],
+                                          'slack'      : attributes['Slack'],
+                                          'rhs'        : attributes['RHS'],
+                                          'rhs_low'    : attributes['SARHSLow'],
+                                          'rhs_up'     : attributes['SARHSUp']})
+    results_shadow_prices['family'] = results_shadow_prices.constraint.str.split('[',n=1).str[0]
+    return results_shadow_prices[columns]
+
+
+def fetch_factor_sensitivity(model_run):
+    '''Get change in objective per unit change of factors of factor constraints (e.g.
+        ss_factor) and the range of each factor over which it holds, from duals and rhs
+        ranges: a row factor * lhs - rhs (sense) b moves with the factor as its rhs
+        moves by -lhs (exact if lhs is fixed, e.g. by demand)
+    '''
+    columns = ['factor','constraint','value','lhs','gradient','value_low','value_up']
+    rows = [(factor,constr,lhs) for factor,constrs in getattr(model_run,'factor_constrs',{}).items() \
+                for constr,lhs,rhs in constrs]
+    if not rows or not has_duals(model_run):
+        return pd.DataFrame(columns=columns)
+    constrs    = [constr for factor,constr,lhs in rows]
+    attributes = unscale_constr_attributes(model_run,
+                                           get_attributes(model_run.model,['Pi','RHS','SARHSLow','SARHSUp'],constrs),
+                                           constrs)
+    lhs        = np.array([expr.getValue() for factor,constr,expr in rows])
+    value      = np.array([getattr(model_run,factor) for factor,constr,expr in rows],dtype=float)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        low = value + (attributes['RHS'] - attributes['SARHSUp']) / lhs
+        up  = value + (attributes['RHS'] - attributes['SARHSLow']) / lhs
+    return pd.DataFrame({'factor'     : [factor for factor,constr,expr in rows],
+                         'constraint' : model_run.model.getAttr('ConstrName',constrs),
+                         'value'      : value,
+                         'lhs'        : lhs,
+                         'gradient'   : -attributes['Pi'] * lhs,
+                         'value_low'  : np.where(lhs > 0,low,up),
+                         'value_up'   : np.where(lhs > 0,up,low)})[columns]
+
+
+def fetch_connectivity_sensitivity(model_run):
+    '''Get change in objective per unit increase of the limit of each interconnector
+        (e.g. jordan_to_israel) in every timestep, from reduced costs of its arcs at the limit
+    '''
+    columns = ['connectivity','value','arcs_at_limit','gradient']
+    if not has_duals(model_run):
+        return pd.DataFrame(columns=columns)
+    results = []
+    for c,(i,j) in connectivity_arcs.items():
+        arcs = model_run.arcFlows.select(i,j,'*','*')
+        if c not in model_run.connectivity or not arcs:
+            continue
+        attributes = get_attributes(model_run.model,['X','UB','RC'],arcs)
+        at_limit   = attributes['X'] >= attributes['UB'] - 1e-6
+        results.append({'connectivity'  : c,
+                        'value'         : model_run.connectivity[c],
+                        'arcs_at_limit' : int(at_limit.sum()),
+                        'gradient'      : np.minimum(attributes['RC'][at_limit],0).sum()})
+    return pd.DataFrame(results,columns=columns)
+
+
+def fetch_capex_ranging(model_run):
+    '''Get range of objective coefficients (capex) of annual capacities over which the
+        optimal capacities do not change
+    '''
+    columns = ['node','commodity','year','value','cost','cost_low','cost_up','reduced_cost']
+    if not has_duals(model_run):
+        return pd.DataFrame(columns=columns)
+    keys       = list(model_run.annual_capacity.keys())
+    attributes = get_attributes(model_run.model,['X','Obj','SAObjLow','SAObjUp','RC'],
+                                [model_run.annual_capacity[key] for key in keys])
+    results_ranging = pd.DataFrame(keys,columns=['node','commodity','year'])
+    for column,attribute in [('value','X'),('cost','Obj'),('cost_low','SAObjLow'),
+                             ('cost_up','SAObjUp'),('reduced_cost','RC')]:
+        results_ranging[column] = attributes[attribute]
+    return results_ranging
+
+
 def append_cost_to_network_data(self):
     '''Append costs from global variables into network datasets
     '''
@@ -562,6 +938,22 @@ def map_attributes(model_run,results_dataframe,on='from_id'):
 
 
 
+#---
+# Parallel execution
+#---
+
+def get_thread_budget(n_tasks,workers=None,threads=None):
+    '''Return (workers,threads) such that workers x threads does not exceed the number of cores
+    '''
+    cores = os.cpu_count() or 1
+    if workers is None:
+        workers = max(1,min(n_tasks,cores))
+    if threads is None:
+        threads = max(1,cores//workers)
+    return workers,threads
+
+
+
 #---
 # Paths, directories, names etc.
 #---
@@ -583,6 +975,7 @@ def infrasim_init_directories():
     '''
     paths = [
             global_variables['results_directory'],
+            global_variables['cache_directory'],
             ]
 
     # loop and create
@@ -595,6 +988,8 @@ def infrasim_clean():
     '''
     for p in os.listdir(global_variables['results_directory']):
         shutil.rmtree( global_variables['results_directory'] + p)
+    if os.path.exists(global_variables['cache_directory']):
+        shutil.rmtree(global_variables['cache_directory'])
 
 
 def lowercase_columns(dataframe):
@@ -625,16 +1020,17 @@ def time_elapsed(start_time):
 def define_sets(self):
     '''Define critical sets
     '''
-    self.time_ref       = self.flows[['timestep','year']]
+    self.time           = time_index(self.flows)
+    self.time_ref       = self.time.ref[['timestep','year']]
     self.indices        = self.global_variables['edge_index_variables']
     self.commodities    = self.edges.commodity.unique().tolist()
     self.node_types     = self.nodes.type.unique().tolist()
     self.technologies   = self.nodes.subtype.unique().tolist()
     self.functions      = self.nodes.function.unique().tolist()
-    self.timesteps      = self.flows.timestep.unique().tolist()
-    self.days           = self.flows.day.unique().tolist()
-    self.months         = self.flows.month.unique().tolist()
-    self.years          = self.flows.year.unique().tolist()
+    self.timesteps      = self.time.timesteps
+    self.days           = self.time.days
+    self.months         = self.time.months
+    self.years          = self.time.years
     return self
 
 
@@ -700,31 +1096,27 @@ def map_timesteps_to_date(flows,mappable):
         
 
 def add_time_index_to_edges(self):
-    '''Add time index to edges (i.e., i,j,k,t)
-    '''
-    # Number of timesteps
-    timesteps = self.flows.timestep.max()
-    # add time
-    self.edges['timestep'] = 1
-    #repeat for each timestep
-    new_edges = self.edges.append( [self.edges]*(timesteps-1) )
-    #create time indices in loop
-    tt = []
-    for i in range(0,timesteps):
-        t = self.edges.timestep.to_numpy() + i
-        tt.append(t)
-    tt = np.concatenate(tt,axis=0)
-    #add time to pandas datafram
-    new_edges['timestep'] = tt
-    # reset index
-    new_edges = new_edges.reset_index(drop=True)
-    # add dates
-    new_edges = map_timesteps_to_date(self.flows,new_edges)
+    '''Add time index to edges (i.e., i,j,k,t) as the cross product of edges and timesteps
+    '''
+    edges = self.edges[['from_id','to_id','commodity','cost','minimum','maximum','capex']].copy()
+    # categorical node and commodity columns
+    for c in ['from_id','to_id','commodity']:
+        edges[c] = edges[c].astype('category')
+    # repeat edges for each timestep (time-major)
+    num_edges = len(edges)
+    num_times = len(self.time.timestep)
+    new_edges = edges.iloc[np.tile(np.arange(num_edges),num_times)].reset_index(drop=True)
+    # add dates from the time dimension
+    times = self.time.ref.copy()
+    if 'date' in times.columns:
+        times['date'] = times['date'].astype('category')
+    times     = times.iloc[np.repeat(np.arange(num_times),num_edges)].reset_index(drop=True)
+    new_edges = pd.concat([new_edges,times],axis=1)
     # reorder
     col_order = ['from_id','to_id','commodity','timestep',
                  'date','hour','day','month','year',
                  'cost','minimum','maximum','capex']
-    self.edge_indices = new_edges[col_order]
+    self.edge_indices = new_edges[[c for c in col_order if c in new_edges.columns]]
     return self
 
 
@@ -733,6 +1125,22 @@ def add_time_index_to_edges(self):
 # Scenarios
 #---
 
+# interconnectors as {connectivity : (i,j)}
+connectivity_arcs = {# Jordan --> Israel, West Bank
+                     'jordan_to_westbank'   : ('jordan_generation','west_bank_energy_demand'),
+                     'jordan_to_israel'     : ('jordan_generation','israel_energy_demand'),
+                     # Israel --> West Bank, Gaza, Jordan
+                     'israel_to_westbank'   : ('israel_generation','west_bank_energy_demand'),
+                     'israel_to_gaza'       : ('israel_generation','gaza_energy_demand'),
+                     'israel_to_jordan'     : ('israel_generation','jordan_energy_demand'),
+                     # Egypt --> Gaza
+                     'egypt_to_gaza'        : ('egypt_generation','gaza_energy_demand'),
+                     # West Bank --> Israel, Jordan
+                     'westbank_to_israel'   : ('west_bank_generation','israel_energy_demand'),
+                     'westbank_to_jordan'   : ('west_bank_generation','jordan_energy_demand'),
+                    }
+
+
 def update_connectivity(self,scenario,**kwargs):
     ''' Update connectivity based on scenario
     '''
@@ -818,28 +1226,8 @@ def update_connectivity(self,scenario,**kwargs):
 def update_for_scenario(self,connectivity_dict):
     '''Update edges dataframe to match scenario
     '''
-    # Jordan --> Israel, West Bank
-    self.edges.loc[(self.edges.from_id.isin(['jordan_generation'])) \
-              & (self.edges.to_id.isin(['west_bank_energy_demand'])),'maximum']     = connectivity_dict['jordan_to_westbank']
-    self.edges.loc[(self.edges.from_id.isin(['jordan_generation'])) \
-              & (self.edges.to_id.isin(['israel_energy_demand'])),'maximum']        = connectivity_dict['jordan_to_israel']
-
-    # Israel --> West Bank, Gaza, Jordan
-    self.edges.loc[(self.edges.from_id.isin(['israel_generation'])) \
-              & (self.edges.to_id.isin(['west_bank_energy_demand'])),'maximum']     = connectivity_dict['israel_to_westbank']
-    self.edges.loc[(self.edges.from_id.isin(['israel_generation'])) \
-              & (self.edges.to_id.isin(['gaza_energy_demand'])),'maximum']          = connectivity_dict['israel_to_gaza']
-    self.edges.loc[(self.edges.from_id.isin(['israel_generation'])) \
-              & (self.edges.to_id.isin(['jordan_energy_demand'])),'maximum']        = connectivity_dict['israel_to_jordan']
-
-    # Egypt --> Gaza
-    self.edges.loc[(self.edges.from_id.isin(['egypt_generation'])) \
-              & (self.edges.to_id.isin(['gaza_energy_demand'])),'maximum']          = connectivity_dict['egypt_to_gaza']
-
-    # West Bank --> Israel, Jordan
-    self.edges.loc[(self.edges.from_id.isin(['west_bank_generation'])) \
-              & (self.edges.to_id.isin(['israel_energy_demand'])),'maximum']        = connectivity_dict['westbank_to_israel']
-    self.edges.loc[(self.edges.from_id.isin(['west_bank_generation'])) \
-              & (self.edges.to_id.isin(['jordan_energy_demand'])),'maximum']        = connectivity_dict['westbank_to_jordan']
+    for c,(i,j) in connectivity_arcs.items():
+        if c in connectivity_dict:
+            self.edges.loc[(self.edges.from_id == i) & (self.edges.to_id == j),'maximum'] = connectivity_dict[c]
     
     return self
\ No newline at end of file
@@ -0,0 +1,121 @@
+'''
+    benchmark_benders.py
+
+        Compare a monolithic solve of the NexTra model against Benders
+        decomposition (capacity master, dispatch subproblems per block of
+        timesteps) with an increasing number of worker processes, and as a solve
+        option of nextra (decompose='benders') with postprocessed results: time to
+        solve, iterations and error in objective. Fails if a decomposition is not
+        solved to optimality or its objective is off the monolithic one by more than
+        the tolerance of the decomposition.
+
+        usage: python benchmark_benders.py [scenario] [timesteps] [blocks] [workers ...]
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import pandas as pd
+
+from infrasim.optimise import *
+from infrasim.benders import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030_low.csv'
+
+# Params
+scenario  = sys.argv[1] if len(sys.argv) > 1 else 'BAS'
+timesteps = int(sys.argv[2]) if len(sys.argv) > 2 else 8760
+blocks    = sys.argv[3] if len(sys.argv) > 3 else 'month'
+blocks    = int(blocks) if blocks.isdigit() else blocks
+workers   = [int(w) for w in sys.argv[4:]] if len(sys.argv) > 4 else [1,2,4]
+tolerance = 1e-4
+
+
+def build(**kwargs):
+    '''Build a model run over the horizon
+    '''
+    model_run = nextra(nodes,edges,flows,
+                       scenario=scenario,
+                       energy_objective=scenario!='BAS',
+                       timesteps=timesteps,
+                       **kwargs)
+    model_run.build()
+    model_run.model.update()
+    return model_run
+
+
+# worker processes are spawned: this script is re-imported by each of them
+if __name__ == '__main__':
+
+    infrasim_init_directories()
+
+    #---
+    # Monolithic
+    model_run  = build()
+    start_time = time.time()
+    model_run.run(pprint=False,write=False)
+    if model_run.model.Status != 2:
+        raise ValueError('Monolithic model could not be solved (status %d)' % model_run.model.Status)
+    summary = [{'solve'       : 'monolithic',
+                'status'      : model_run.model.Status,
+                'workers'     : 1,
+                'iterations'  : 1,
+                'master'      : 0,
+                'subproblems' : 0,
+                'total'       : time.time()-start_time,
+                'objective'   : model_run.model.ObjVal}]
+
+    #---
+    # Benders decomposition
+    for n in workers:
+        model_run  = build()
+        start_time = time.time()
+        # error in objective is at most the gap (relative to the upper bound) at convergence
+        benders    = benders_decomposition(model_run,blocks=blocks,workers=n,tolerance=tolerance/10)
+        benders.run(pprint=False)
+        iterations = benders.results_iterations
+        summary.append({'solve'       : 'benders',
+                        'status'      : benders.status,
+                        'workers'     : benders.workers,
+                        'iterations'  : len(iterations),
+                        'master'      : iterations.master.sum(),
+                        'subproblems' : iterations.subproblems.sum(),
+                        'total'       : time.time()-start_time,
+                        'objective'   : benders.objective})
+
+    #---
+    # Benders decomposition as a solve option, with postprocessed results
+    model_run  = build(decompose={'method':'benders','blocks':blocks,'tolerance':tolerance/10})
+    start_time = time.time()
+    model_run.run(pprint=False,write=False)
+    iterations = model_run.benders.results_iterations
+    solved     = get_solve_status(model_run) == 2
+    summary.append({'solve'       : 'nextra',
+                    'status'      : get_solve_status(model_run),
+                    'workers'     : model_run.benders.workers,
+                    'iterations'  : len(iterations),
+                    'master'      : iterations.master.sum(),
+                    'subproblems' : iterations.subproblems.sum(),
+                    'total'       : time.time()-start_time,
+                    'objective'   : model_run.get_results().objective if solved else None})
+
+    summary = pd.DataFrame(summary)
+    summary['objective_error'] = summary.objective / summary.objective.iloc[0] - 1
+    summary['speedup'] = summary.total.iloc[1] / summary.total
+    summary.loc[0,'speedup'] = None
+    print(summary.to_string(index=False))
+
+    # regression check: decompositions solved to optimality, within tolerance of the monolithic solve
+    failed = summary[(summary.status != 2) | ~(summary.objective_error.abs() <= tolerance)]
+    if not failed.empty:
+        raise ValueError('Benders decomposition off the monolithic solve (objective_error > %.0e or not optimal) '
+                         'in: %s' % (tolerance,failed[['solve','workers']].values.tolist()))
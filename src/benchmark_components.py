@@ -0,0 +1,85 @@
+'''
+    benchmark_components.py
+
+        Compare a monolithic solve of the NexTra model against a solve by connected
+        components of the network (e.g. one per territory under NCO): components
+        found, time to solve, largest model and error in objective. Rows coupling
+        components (e.g. emission_reduction) are solved by Benders decomposition
+        over the components (benders, default) or merged (merge)
+
+        usage: python benchmark_components.py [scenario] [timesteps] [benders/merge] [workers]
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import pandas as pd
+
+from infrasim.optimise import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030_low.csv'
+
+# Params
+scenario  = sys.argv[1] if len(sys.argv) > 1 else 'NCO'
+timesteps = int(sys.argv[2]) if len(sys.argv) > 2 else 8760
+coupled   = sys.argv[3] if len(sys.argv) > 3 else 'benders'
+workers   = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+
+def run(**kwargs):
+    '''Build and solve a model run, returning it with its solve time
+    '''
+    model_run = nextra(nodes,edges,flows,
+                       scenario=scenario,
+                       energy_objective=scenario!='BAS',
+                       timesteps=timesteps,
+                       **kwargs)
+    model_run.build()
+    model_run.model.update()
+    start_time = time.time()
+    model_run.run(pprint=False,write=False)
+    return model_run,time.time()-start_time
+
+
+# worker processes are spawned: this script is re-imported by each of them
+if __name__ == '__main__':
+
+    infrasim_init_directories()
+
+    monolithic,solve_time = run()
+    if monolithic.model.Status != 2:
+        raise ValueError('Monolithic model could not be solved (status %d)' % monolithic.model.Status)
+    summary = [{'solve'           : 'monolithic',
+                'components'      : 1,
+                'max_variables'   : monolithic.model.NumVars,
+                'max_constraints' : monolithic.model.NumConstrs,
+                'time'            : solve_time,
+                'objective'       : monolithic.model.ObjVal}]
+
+    model_run,solve_time = run(decompose={'coupled':coupled,'workers':workers})
+    if model_run.solution is None:
+        print('> Model does not split into components; solved as one model')
+    else:
+        components = model_run.components
+        print(components.results_components.to_string(index=False))
+        if components.coupling_constrs:
+            print('> Components coupled by: ' + ', '.join(components.coupling_constrs))
+        summary.append({'solve'           : 'components (%s)' % coupled,
+                        'components'      : components.n_components,
+                        'max_variables'   : components.results_components.variables.max(),
+                        'max_constraints' : components.results_components.constraints.max(),
+                        'time'            : solve_time,
+                        'objective'       : model_run.solution_objective})
+
+    summary = pd.DataFrame(summary)
+    summary['objective_error'] = summary.objective / summary.objective.iloc[0] - 1
+    print(summary.to_string(index=False))
@@ -0,0 +1,86 @@
+'''
+    benchmark_duals.py
+
+        Compare sensitivity of the objective to factors of the NexTra model (e.g.
+        ss_factor, coo_factor) read from duals and rhs ranges of one solve against
+        re-solving at a perturbed value of each factor: time and change in
+        objective predicted by duals and found by the re-solve. A scenario that
+        is not solved to optimality (e.g. infeasible over a short horizon) has no
+        duals and is reported as such, as are re-solves that are not optimal
+
+        usage: python benchmark_duals.py [scenario] [timesteps] [step]
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import pandas as pd
+
+from infrasim.optimise import *
+from infrasim.sweep import FACTOR_SETTERS
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+
+# Params
+scenario  = sys.argv[1] if len(sys.argv) > 1 else 'COO'
+timesteps = int(sys.argv[2]) if len(sys.argv) > 2 else None
+step      = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+statuses  = {2 : 'optimal', 3 : 'infeasible', 4 : 'infeasible or unbounded', 5 : 'unbounded'}
+
+
+def describe(status):
+    '''Return name of a gurobi status
+    '''
+    return statuses.get(status,'status %d' % status)
+
+
+infrasim_init_directories()
+
+model_run = nextra(nodes,edges,flows,
+                   scenario=scenario,
+                   energy_objective=True,
+                   timesteps=timesteps)
+model_run.build()
+model_run.run(pprint=False,write=False)
+if model_run.model.Status != 2:
+    print('> No duals to compare for: %s (%s)' % (scenario,describe(model_run.model.Status)))
+    sys.exit()
+objective = model_run.model.ObjVal
+
+start_time = time.time()
+results    = model_run.get_results()
+duals_time = time.time() - start_time
+print(results.results_shadow_prices.to_string(index=False))
+print(results.results_connectivity.to_string(index=False))
+
+summary = []
+for factor,sensitivity in results.results_factor_sensitivity.groupby('factor'):
+    value = getattr(model_run,factor)
+    # re-solve at the perturbed value
+    getattr(model_run,FACTOR_SETTERS[factor])(value + step)
+    start_time = time.time()
+    model_run.run(pprint=False,write=False)
+    solve_time = time.time() - start_time
+    solved = model_run.model.Status == 2
+    summary.append({'factor'     : factor,
+                    'value'      : value,
+                    'step'       : step,
+                    'valid_from' : sensitivity.value_low.max(),
+                    'valid_to'   : sensitivity.value_up.min(),
+                    'predicted'  : sensitivity.gradient.sum() * step,
+                    're-solved'  : model_run.model.ObjVal - objective if solved else None,
+                    'status'     : describe(model_run.model.Status),
+                    'results'    : duals_time,
+                    're-solve'   : solve_time})
+    getattr(model_run,FACTOR_SETTERS[factor])(value)
+
+print(pd.DataFrame(summary).to_string(index=False))
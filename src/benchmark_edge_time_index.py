@@ -0,0 +1,81 @@
+'''
+    benchmark_edge_time_index.py
+
+        Benchmark time and memory of adding the time index to edges (i.e. i,j,k,t)
+        against the previous loop-and-append implementation, and check that both
+        produce the same edge indices
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import numpy as np
+import pandas as pd
+
+from infrasim.optimise import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+
+# Params
+horizons = [24,168,8760]
+repeats  = 3
+
+infrasim_init_directories()
+
+
+def add_time_index_to_edges_legacy(self):
+    '''Previous implementation of add_time_index_to_edges (for reference)
+    '''
+    timesteps = self.flows.timestep.max()
+    edges = self.edges.copy()
+    edges['timestep'] = 1
+    new_edges = pd.concat([edges]*timesteps)
+    tt = []
+    for i in range(0,timesteps):
+        t = edges.timestep.to_numpy() + i
+        tt.append(t)
+    new_edges['timestep'] = np.concatenate(tt,axis=0)
+    new_edges = new_edges.reset_index(drop=True)
+    new_edges = map_timesteps_to_date(self.flows,new_edges)
+    col_order = ['from_id','to_id','commodity','timestep',
+                 'date','hour','day','month','year',
+                 'cost','minimum','maximum','capex']
+    return new_edges[col_order]
+
+
+def timed(f,model_run):
+    '''Return result and best time of f(model_run) over repeats
+    '''
+    times = []
+    for r in range(repeats):
+        start_time = time.time()
+        result = f(model_run)
+        times.append(time.time()-start_time)
+    return result,min(times)
+
+
+print('> %8s %12s %12s %12s %12s %8s' % ('T','legacy (s)','new (s)','legacy (MB)','new (MB)','equal'))
+for T in horizons:
+    model_run = nextra(nodes,edges,flows,
+                       scenario='COO',
+                       energy_objective=True,
+                       timesteps=T if T < 8760 else False)
+
+    legacy,legacy_time = timed(add_time_index_to_edges_legacy,model_run)
+    new,new_time       = timed(lambda m: add_time_index_to_edges(m).edge_indices,model_run)
+
+    equal = legacy.reset_index(drop=True).astype(object).equals(new.reset_index(drop=True).astype(object))
+    print('> %8d %12.3f %12.3f %12.1f %12.1f %8s' % (len(model_run.timesteps),
+                                                     legacy_time,new_time,
+                                                     legacy.memory_usage(deep=True).sum()/1e6,
+                                                     new.memory_usage(deep=True).sum()/1e6,
+                                                     equal))
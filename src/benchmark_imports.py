@@ -0,0 +1,104 @@
+'''
+    benchmark_imports.py
+
+        Import time of the NexTra core in a fresh worker process (as started by
+        sweeps and the executor) and check that a worker running a model from
+        csv files (nodes, edges with from_id/to_id, flows) never loads the
+        plotting (matplotlib, seaborn, plotly) or spatial (geopandas, shapely)
+        libraries. The csv files are written from the shapefiles first.
+
+        usage: python benchmark_imports.py [timesteps]
+
+    @amanmajid
+'''
+
+import os
+import sys
+import time
+import multiprocessing
+import concurrent.futures
+sys.path.append('../')
+
+# only the standard library is imported here: spawned workers re-import this module
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+csv_directory = '../outputs/__cache__/csv_network/'
+
+# libraries that a worker should not load
+PLOTTING = ['matplotlib','seaborn','plotly']
+SPATIAL  = ['geopandas','shapely','pyproj']
+
+
+def loaded(modules):
+    '''Return modules (of a list) that are loaded in this process
+    '''
+    return [m for m in modules if m in sys.modules]
+
+
+def run_worker(path_to_nodes,path_to_edges,timesteps):
+    '''Import the core, then run a model in this (fresh) process and report the time
+        of each step and the libraries loaded
+    '''
+    start_time = time.time()
+    from infrasim.optimise import nextra
+    from infrasim.utils import get_solve_status
+    import_time = time.time() - start_time
+
+    start_time = time.time()
+    model_run = nextra(path_to_nodes,path_to_edges,flows,
+                       scenario='COO',
+                       energy_objective=True,
+                       timesteps=timesteps,
+                       cache=False,
+                       profile=False)
+    model_run.build()
+    model_run.run(pprint=False,write=False)
+    if get_solve_status(model_run) == 2:
+        results = model_run.get_results()
+        for table in ['results_edge_flows','results_capacities','results_costs']:
+            getattr(results,table)
+    run_time = time.time() - start_time
+    return {'inputs'   : os.path.splitext(path_to_nodes)[1],
+            'import'   : import_time,
+            'run'      : run_time,
+            'status'   : get_solve_status(model_run),
+            'plotting' : ','.join(loaded(PLOTTING)) or '-',
+            'spatial'  : ','.join(loaded(SPATIAL)) or '-'}
+
+
+def write_csv_network():
+    '''Write nodes and edges (with topology, without geometry) to csv files
+    '''
+    from infrasim.cache import read_network_data
+    os.makedirs(csv_directory,exist_ok=True)
+    network = read_network_data(nodes,edges)
+    paths   = []
+    for name,df in zip(['nodes','edges'],network):
+        paths.append(os.path.join(csv_directory,name + '.csv'))
+        df.drop(columns='geometry').to_csv(paths[-1],index=False)
+    return paths
+
+
+if __name__ == '__main__':
+
+    # Params
+    timesteps = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    # csv inputs, written in a worker so that this process stays lean too
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1,mp_context=context) as executor:
+        csv_nodes,csv_edges = executor.submit(write_csv_network).result()
+
+    summary = []
+    for path_to_nodes,path_to_edges in [(csv_nodes,csv_edges),(nodes,edges)]:
+        # one fresh worker per run
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1,mp_context=context) as executor:
+            summary.append(executor.submit(run_worker,path_to_nodes,path_to_edges,timesteps).result())
+
+    import pandas as pd
+    print(pd.DataFrame(summary).to_string(index=False))
+    if summary[0]['plotting'] != '-' or summary[0]['spatial'] != '-':
+        raise SystemExit('> csv worker loaded ' + summary[0]['plotting'] + ' ' + summary[0]['spatial'])
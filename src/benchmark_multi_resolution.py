@@ -0,0 +1,95 @@
+'''
+    benchmark_multi_resolution.py
+
+        Benchmark solving the hourly NexTra model cold against the multi-resolution
+        solve (see multiresolution.py) of each mode, for the standard scenarios:
+        time of the coarse model and of the hourly passes, simplex and barrier
+        iterations and the objective of each. Scenarios whose cold solve is not
+        optimal (e.g. infeasible over a short horizon) have no objective to compare
+        and are reported as such.
+
+        usage: python benchmark_multi_resolution.py [timesteps] [periods] [period_length]
+
+    @amanmajid
+'''
+
+import sys
+sys.path.append('../')
+
+import time
+import pandas as pd
+
+from infrasim.optimise import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+
+# Params
+timesteps     = int(sys.argv[1]) if len(sys.argv) > 1 else None
+periods       = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+period_length = int(sys.argv[3]) if len(sys.argv) > 3 else 24
+scenarios     = ['BAU','NCO','EAG','COO']
+modes         = [None,'fix','start']
+statuses      = {2 : 'optimal', 3 : 'infeasible', 4 : 'infeasible or unbounded', 5 : 'unbounded'}
+
+
+def describe(status):
+    '''Return name of a gurobi status
+    '''
+    return statuses.get(status,'status %d' % status)
+
+infrasim_init_directories()
+
+summary = []
+for scenario in scenarios:
+    for mode in modes:
+        warm_start = False if mode is None else {'representative_periods' : periods,
+                                                 'period_length'          : period_length,
+                                                 'mode'                   : mode}
+        model_run = nextra(nodes,edges,flows,
+                           scenario=scenario,
+                           energy_objective=True,
+                           timesteps=timesteps,
+                           warm_start=warm_start,
+                           profile=False)
+        model_run.build()
+        model_run.model.setParam('OutputFlag',0)
+        start_time = time.time()
+        model_run.run(pprint=False,write=False)
+        wall  = time.time() - start_time
+        model = model_run.model
+        if mode is None:
+            passes = pd.DataFrame([{'pass'        : 'cold',
+                                    'iterations'  : model.IterCount,
+                                    'barrier_its' : model.BarIterCount,
+                                    'wall'        : wall}])
+        else:
+            passes = model_run.multi_resolution.results_passes
+        hourly = passes[passes['pass'] != 'coarse']
+        summary.append({'scenario'    : scenario,
+                        'mode'        : 'cold' if mode is None else mode,
+                        'status'      : model.Status,
+                        'coarse'      : passes.wall[passes['pass'] == 'coarse'].sum(),
+                        'hourly'      : hourly.wall.sum(),
+                        'total'       : wall,
+                        'iterations'  : hourly.iterations.sum(),
+                        'barrier_its' : hourly.barrier_its.sum(),
+                        'objective'   : model.ObjVal if model.Status == 2 else None})
+        model.dispose()
+
+summary = pd.DataFrame(summary)
+cold = summary[summary['mode'] == 'cold'].set_index('scenario')
+summary['obj_diff'] = (summary.objective / summary.scenario.map(cold.objective) - 1).abs()
+# objectives are only compared with an optimal cold solve
+summary['cold']     = summary.scenario.map(cold.status).map(describe)
+summary['status']   = summary.status.map(describe)
+print(summary.to_string(index=False))
+not_optimal = cold.status[cold.status != 2]
+if len(not_optimal):
+    print('> No objective to compare (cold solve not optimal) for: ' \
+            + ', '.join('%s (%s)' % (scenario,describe(status)) for scenario,status in not_optimal.items()))
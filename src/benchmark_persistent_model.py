@@ -0,0 +1,108 @@
+'''
+    benchmark_persistent_model.py
+
+        Benchmark a parameter sweep solved by building a new model at every point
+        against updating one built model in place (warm starting each re-solve),
+        and check that both give the same results
+
+        usage: python benchmark_persistent_model.py [scenario] [timesteps]
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import numpy as np
+
+from infrasim.optimise import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+
+# Params
+scenario  = sys.argv[1] if len(sys.argv) > 1 else 'COO'
+timesteps = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+# sweep (as in the sensitivity analysis)
+points = [{'self_sufficiency_factor' : s} for s in [0.1,0.3,0.5]] + \
+         [{'coo_res_factor' : c} for c in [0.2,0.4]] + \
+         [{'solar_price_factor' : 0.6, 'wind_price_factor' : 1.4},
+          {'solar_price_factor' : 1.4, 'wind_price_factor' : 0.6}]
+
+infrasim_init_directories()
+
+
+def update_in_place(model_run,point):
+    '''Apply parameters of a sweep point to a built model
+    '''
+    for k,v in point.items():
+        if k == 'self_sufficiency_factor':
+            model_run.set_self_sufficiency_factor(v)
+        elif k == 'coo_res_factor':
+            model_run.set_coo_factor(v)
+        elif k in ['solar_price_factor','wind_price_factor']:
+            model_run.set_price_factors(**{k:v})
+        else:
+            model_run.set_connectivity(**{k:v})
+
+
+def capacities(model_run):
+    '''Return capacity results as an array (nan if not solved to optimality)
+    '''
+    if model_run.model.Status != 2:
+        return np.array([np.nan])
+    return fetch_capacity_results(model_run).value.to_numpy()
+
+
+def objective(model_run):
+    return model_run.model.ObjVal if model_run.model.Status == 2 else np.nan
+
+
+#---
+# Fresh build at each point
+fresh = []
+for point in points:
+    start_time = time.time()
+    kwargs = {}
+    for p in points[:points.index(point)+1]:
+        kwargs.update(p)
+    model_run = nextra(nodes,edges,flows,
+                       scenario=scenario,
+                       energy_objective=True,
+                       timesteps=timesteps,
+                       **kwargs)
+    model_run.build()
+    model_run.run(pprint=False)
+    fresh.append((time.time()-start_time,objective(model_run),capacities(model_run)))
+
+#---
+# Persistent model updated in place
+persistent = []
+start_time = time.time()
+model_run  = nextra(nodes,edges,flows,
+                    scenario=scenario,
+                    energy_objective=True,
+                    timesteps=timesteps)
+model_run.build()
+setup_time = time.time()-start_time
+for point in points:
+    start_time = time.time()
+    update_in_place(model_run,point)
+    model_run.run(pprint=False)
+    persistent.append((time.time()-start_time,objective(model_run),capacities(model_run)))
+
+#---
+# Report
+print('> %-55s %10s %10s %22s %10s %12s' % ('point','fresh (s)','update (s)','objective','obj diff','max cap diff'))
+for point,f,p in zip(points,fresh,persistent):
+    cap_diff = np.max(np.abs(f[2]-p[2])) if len(f[2]) == len(p[2]) else np.nan
+    print('> %-55s %10.2f %10.2f %22.6f %10.2e %12.6f' % (str(point),f[0],p[0],p[1],abs(f[1]-p[1]),cap_diff))
+print('> total: fresh %.2fs, persistent %.2fs (incl. %.2fs initial build)' % \
+      (sum(f[0] for f in fresh),setup_time+sum(p[0] for p in persistent),setup_time))
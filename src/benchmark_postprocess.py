@@ -0,0 +1,60 @@
+'''
+    benchmark_postprocess.py
+
+        Time and peak memory (traced by python) of postprocessing a solved
+        NexTra model: extracting results in nextra_postprocess and building
+        each results table on first access
+
+        usage: python benchmark_postprocess.py [scenario] [timesteps]
+
+    @amanmajid
+'''
+
+import sys
+import time
+import tracemalloc
+sys.path.append('../')
+
+import pandas as pd
+
+from infrasim.optimise import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+
+# Params
+scenario  = sys.argv[1] if len(sys.argv) > 1 else 'COO'
+timesteps = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+infrasim_init_directories()
+
+model_run = nextra(nodes,edges,flows,
+                   scenario=scenario,
+                   energy_objective=True,
+                   timesteps=timesteps)
+model_run.build()
+model_run.run(pprint=False,write=False)
+
+summary = []
+tracemalloc.start()
+start_time = time.time()
+results    = model_run.get_results()
+summary.append({'step'     : 'get_results',
+                'time'     : time.time()-start_time,
+                'peak_mb'  : tracemalloc.get_traced_memory()[1] / 10**6})
+for table in ['results_edge_flows','results_capacity_change','results_costs']:
+    tracemalloc.reset_peak()
+    start_time = time.time()
+    df = getattr(results,table)
+    summary.append({'step'     : table,
+                    'time'     : time.time()-start_time,
+                    'peak_mb'  : tracemalloc.get_traced_memory()[1] / 10**6,
+                    'rows'     : len(df)})
+tracemalloc.stop()
+
+print(pd.DataFrame(summary).to_string(index=False))
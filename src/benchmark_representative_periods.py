@@ -0,0 +1,118 @@
+'''
+    benchmark_representative_periods.py
+
+        Compare a full resolution (hourly) run of the NexTra model against runs built
+        over representative periods: time to build and solve, size of the model and
+        error in objective, capacities and annual flows. As a parity check, a model with
+        every period its own representative must match the objective of the full model
+
+        usage: python benchmark_representative_periods.py [scenario] [period length] [n periods ...]
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import pandas as pd
+
+from infrasim.optimise import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030_low.csv'
+
+# Params
+scenario      = sys.argv[1] if len(sys.argv) > 1 else 'BAS'
+period_length = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+n_periods     = [int(n) for n in sys.argv[3:]] if len(sys.argv) > 3 else [4,8,12,24]
+tolerance     = 1e-6
+
+infrasim_init_directories()
+
+
+def run(**kwargs):
+    '''Build and solve a model run, returning it with the time of each phase
+    '''
+    timings    = {}
+    start_time = time.time()
+    model_run  = nextra(nodes,edges,flows,
+                        scenario=scenario,
+                        energy_objective=scenario!='BAS',
+                        **kwargs)
+    timings['init'] = time.time()-start_time
+    start_time = time.time()
+    model_run.build()
+    model_run.model.update()
+    timings['build'] = time.time()-start_time
+    start_time = time.time()
+    model_run.run(pprint=False)
+    timings['solve'] = time.time()-start_time
+    return model_run,timings
+
+
+#---
+# Full resolution
+full,timings = run()
+if full.model.Status != 2:
+    raise ValueError('Full resolution model could not be solved (status %d)' % full.model.Status)
+full_results = full.get_results()
+
+summary = [dict(periods='full',
+                variables=full.model.NumVars,
+                constraints=full.model.NumConstrs,
+                objective=full.model.ObjVal,
+                **timings)]
+
+#---
+# Representative periods
+for n in n_periods:
+    model_run,timings = run(representative_periods=n,period_length=period_length)
+    row = dict(periods=n,
+               variables=model_run.model.NumVars,
+               constraints=model_run.model.NumConstrs,
+               **timings)
+    if model_run.model.Status == 2:
+        periods = model_run.representative_periods
+        report  = compare_to_full_resolution(full_results,
+                                             model_run.get_results(),
+                                             periods,
+                                             full.model.ObjVal,
+                                             model_run.model.ObjVal)
+        capacities = report['capacities']
+        generation = report['generation']
+        row['objective']          = model_run.model.ObjVal
+        row['objective_error']    = report['objective'].relative_error[0]
+        row['max_capacity_error'] = capacities.error.abs().max()
+        row['total_capacity_error'] = capacities.aggregated.sum()/capacities.full.sum()-1
+        row['max_profile_nrmse']  = periods.profile_error(read_input_data(nodes,edges,flows)[2]).nrmse.max()
+        print('> %s periods of %d timesteps' % (n,period_length))
+        print(periods.summary().to_string(index=False))
+        print(capacities.loc[capacities.full.abs()+capacities.aggregated.abs() > 0].round(2).to_string(index=False))
+    summary.append(row)
+
+#---
+# Parity: every period its own representative (i.e. the full model)
+n    = int((-(-full.time.ref.groupby('year').size() // period_length)).max())
+model_run,timings = run(representative_periods=n,period_length=period_length)
+row  = dict(periods='parity',
+            variables=model_run.model.NumVars,
+            constraints=model_run.model.NumConstrs,
+            **timings)
+if model_run.model.Status == 2:
+    row['objective']       = model_run.model.ObjVal
+    row['objective_error'] = model_run.model.ObjVal/full.model.ObjVal-1
+summary.append(row)
+
+print('')
+summary = pd.DataFrame(summary)
+print(summary.to_string(index=False))
+
+error = summary.objective_error[summary.periods == 'parity'].iloc[0]
+if not abs(error) <= tolerance:
+    raise ValueError('Objective with every period its own representative differs from the full model by %s' % error)
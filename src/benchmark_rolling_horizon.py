@@ -0,0 +1,86 @@
+'''
+    benchmark_rolling_horizon.py
+
+        Compare hourly dispatch of the NexTra model solved as one model over the
+        horizon against rolling-horizon dispatch (windows of window length plus
+        lookahead timesteps), with capacities planned over representative days:
+        time to build and solve, size of the largest model, cost of flow and
+        annual targets violated by the dispatch. The single window is also solved
+        with annual targets carried into it (targets=True)
+
+        usage: python benchmark_rolling_horizon.py [scenario] [timesteps] [window length] [lookahead]
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import pandas as pd
+
+from infrasim.optimise import *
+from infrasim.rolling import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030_low.csv'
+
+# Params
+scenario        = sys.argv[1] if len(sys.argv) > 1 else 'BAS'
+timesteps       = int(sys.argv[2]) if len(sys.argv) > 2 else 8760
+window_length   = int(sys.argv[3]) if len(sys.argv) > 3 else 168
+lookahead       = int(sys.argv[4]) if len(sys.argv) > 4 else 24
+
+infrasim_init_directories()
+
+#---
+# Capacity plan over representative days
+start_time = time.time()
+investment = nextra(nodes,edges,flows,
+                    scenario=scenario,
+                    energy_objective=scenario!='BAS',
+                    representative_periods=12)
+investment.build()
+investment.run(pprint=False)
+if investment.model.Status != 2:
+    raise ValueError('Investment run could not be solved (status %d)' % investment.model.Status)
+plan = get_capacity_plan(investment)
+print('> Capacity plan in %.1fs' % (time.time()-start_time))
+
+#---
+# Dispatch over the horizon as a single window vs. rolling windows
+#   unmet demand is supplied by the super source, as the plan does not see every hour
+summary = []
+for name,length,ahead,targets in [('monolithic',timesteps+1,0,False),
+                                  ('monolithic_targets',timesteps+1,0,True),
+                                  ('rolling',window_length,lookahead,False)]:
+    start_time = time.time()
+    dispatch = rolling_dispatch(nodes,edges,flows,
+                                scenario=scenario,
+                                energy_objective=scenario!='BAS',
+                                capacities=plan,
+                                timesteps=timesteps,
+                                super_source=True,
+                                window_length=length,
+                                lookahead=ahead,
+                                targets=targets)
+    dispatch.run(pprint=False)
+    windows = dispatch.results_windows
+    summary.append({'dispatch'        : name,
+                    'windows'         : len(windows),
+                    'max_variables'   : windows.variables.max(),
+                    'max_constraints' : windows.constraints.max(),
+                    'build'           : windows.build.sum(),
+                    'solve'           : windows.solve.sum(),
+                    'total'           : time.time()-start_time,
+                    'cost'            : dispatch.get_total_cost(),
+                    'targets_violated': windows.targets_violated.iloc[-1]})
+
+summary = pd.DataFrame(summary)
+summary['cost_error'] = summary.cost / summary.cost.iloc[0] - 1
+print(summary.to_string(index=False))
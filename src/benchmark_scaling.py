@@ -0,0 +1,66 @@
+'''
+    benchmark_scaling.py
+
+        Benchmark solving the NexTra model as built (limits of 10**8-10**12 for no
+        limit, emissions in g/kWh) against the scaled model (no-limit bounds as
+        infinity, rows scaled by powers of ten): ranges of the model, solve time
+        and iterations of dual simplex and barrier, and the objective of each
+
+        usage: python benchmark_scaling.py [scenario] [timesteps]
+
+    @amanmajid
+'''
+
+import sys
+sys.path.append('../')
+
+import pandas as pd
+
+from infrasim.optimise import *
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+
+# Params
+scenario  = sys.argv[1] if len(sys.argv) > 1 else 'COO'
+timesteps = int(sys.argv[2]) if len(sys.argv) > 2 else None
+methods   = {'dual simplex' : 1, 'barrier' : 2}
+
+infrasim_init_directories()
+
+summary = []
+for scaling in [False,True]:
+    for method,value in methods.items():
+        model_run = nextra(nodes,edges,flows,
+                           scenario=scenario,
+                           energy_objective=True,
+                           timesteps=timesteps,
+                           scaling=scaling,
+                           profile=False)
+        model_run.build()
+        ranges = get_model_ranges(model_run.model)
+        model_run.model.setParam('OutputFlag',0)
+        model_run.model.setParam('Method',value)
+        model_run.run(pprint=False,write=False)
+        model = model_run.model
+        summary.append({'scaling'     : scaling,
+                        'method'      : method,
+                        'matrix'      : '[%.0e, %.0e]' % tuple(ranges['matrix']),
+                        'rhs'         : '[%.0e, %.0e]' % tuple(ranges['rhs']),
+                        'bounds'      : '[%.0e, %.0e]' % tuple(ranges['bounds']),
+                        'scaled_rows' : len(model_run.row_scales),
+                        'status'      : model.Status,
+                        'time'        : model.Runtime,
+                        'iterations'  : model.IterCount,
+                        'barrier_its' : model.BarIterCount,
+                        'objective'   : model.ObjVal if model.Status == 2 else None})
+        model.dispose()
+
+summary = pd.DataFrame(summary)
+summary['obj_diff'] = (summary.objective / summary.objective.iloc[0] - 1).abs()
+print(summary.to_string(index=False))
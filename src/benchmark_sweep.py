@@ -0,0 +1,69 @@
+'''
+    benchmark_sweep.py
+
+        Benchmark sweeps of the sensitivity analysis (self-sufficiency factor and
+        solar price factor) solved as one multi-scenario model against warm
+        started solves in sequence, and check that both give the same objective
+        (capacities may differ between alternative optima)
+
+        usage: python benchmark_sweep.py [scenario] [timesteps]
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import pandas as pd
+
+from infrasim.optimise import *
+from infrasim.sweep import parameter_sweep
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+
+# Params
+scenario  = sys.argv[1] if len(sys.argv) > 1 else 'COO'
+timesteps = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+# sweeps (as in the sensitivity analysis)
+sweeps = {'ss_factor'          : [i/10 for i in range(11)],
+          'solar_price_factor' : [0.6,0.8,1.0,1.2,1.4]}
+
+infrasim_init_directories()
+
+summary = []
+for parameter,values in sweeps.items():
+    runs = {}
+    for mode in ['multi','sequential']:
+        model_run = nextra(nodes,edges,flows,
+                           scenario=scenario,
+                           energy_objective=True,
+                           timesteps=timesteps)
+        model_run.build()
+        start_time = time.time()
+        try:
+            runs[mode] = (parameter_sweep(model_run,parameter,values,mode=mode).run(pprint=False),
+                          time.time()-start_time)
+        except ValueError as e:
+            print('> %s (%s): %s' % (parameter,mode,e))
+        model_run.model.dispose()
+
+    row = {'parameter' : parameter, 'points' : len(values)}
+    for mode,(sweep,solve_time) in runs.items():
+        row[mode] = solve_time
+        row[mode + '_solved'] = len(sweep.results)
+    if len(runs) == 2:
+        multi,sequential = runs['multi'][0],runs['sequential'][0]
+        objectives = multi.results_sweep.set_index(parameter).objective - \
+                        sequential.results_sweep.set_index(parameter).objective
+        row['max_obj_diff'] = (objectives.abs() / sequential.results_sweep.set_index(parameter).objective).max()
+    summary.append(row)
+
+print(pd.DataFrame(summary).to_string(index=False))
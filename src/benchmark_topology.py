@@ -0,0 +1,81 @@
+'''
+    benchmark_topology.py
+
+        Benchmark adding topology (i,j) to edges by bulk-querying the spatial index
+        of nodes against the previous per-endpoint snkit.network.nearest lookup,
+        on the NexTra network and on synthetic networks of increasing size, and
+        check that both snap edges to the same nodes
+
+        usage: python benchmark_topology.py [max. synthetic edges]
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+import numpy as np
+import geopandas as gpd
+import snkit
+from shapely.geometry import Point, LineString
+
+from infrasim.optimise import *
+from infrasim.spatial import add_toplogy, snap_edges_to_nodes
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+
+# Params
+max_edges = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+legacy_max_edges = 5000         # per-endpoint lookup is too slow beyond this
+
+
+def add_toplogy_legacy(nodes,edges,i='from_id',j='to_id',field_to_read='name'):
+    '''Previous implementation of add_toplogy (for reference)
+    '''
+    edges[i] = edges.geometry.apply(lambda geom: snkit.network.nearest(Point(geom.coords[0]), nodes)[field_to_read])
+    edges[j] = edges.geometry.apply(lambda geom: snkit.network.nearest(Point(geom.coords[-1]), nodes)[field_to_read])
+    return edges
+
+
+def make_synthetic_network(n_edges,seed=1000):
+    '''Return random nodes and edges between them (with endpoints jittered off the nodes)
+    '''
+    rng     = np.random.default_rng(seed)
+    n_nodes = max(2,n_edges//2)
+    xy      = rng.uniform(0,10,size=(n_nodes,2))
+    nodes   = gpd.GeoDataFrame({'name' : ['node_%d' % n for n in range(n_nodes)]},
+                               geometry=gpd.points_from_xy(xy[:,0],xy[:,1]))
+    ends    = rng.integers(0,n_nodes,size=(n_edges,2))
+    jitter  = rng.normal(0,1e-5,size=(n_edges,2,2))
+    lines   = [LineString([xy[a]+jitter[e,0],xy[b]+jitter[e,1]]) for e,(a,b) in enumerate(ends)]
+    edges   = gpd.GeoDataFrame({'commodity' : 'electricity'},index=range(n_edges),geometry=lines)
+    return nodes,edges
+
+
+def timed(f,nodes,edges):
+    start_time = time.time()
+    result = f(nodes,edges.copy())
+    return result,time.time()-start_time
+
+
+networks = [('nextra',read_node_data(nodes),read_edge_data(edges))]
+networks[0][1]['name'] = adjust_nodal_names(networks[0][1].name)
+for n in [1000,5000,10000,max_edges]:
+    networks.append(('synthetic-%d' % n,) + make_synthetic_network(n))
+
+print('> %16s %8s %8s %12s %12s %8s %14s' % ('network','nodes','edges','legacy (s)','index (s)','equal','max dist.'))
+for name,n,e in networks:
+    new,new_time = timed(add_toplogy,n,e)
+    report       = snap_edges_to_nodes(n,e)
+    if len(e) <= legacy_max_edges:
+        legacy,legacy_time = timed(add_toplogy_legacy,n,e)
+        equal = legacy[['from_id','to_id']].equals(new[['from_id','to_id']])
+        print('> %16s %8d %8d %12.3f %12.3f %8s %14.2e' % (name,len(n),len(e),legacy_time,new_time,equal,report.distance.max()))
+    else:
+        print('> %16s %8d %8d %12s %12.3f %8s %14.2e' % (name,len(n),len(e),'-',new_time,'-',report.distance.max()))
@@ -0,0 +1,60 @@
+'''
+    check_build_parity.py
+
+        Build each scenario with the standard (tupledict) and matrix engines and
+        check that both produce an equivalent model
+
+    @amanmajid
+'''
+
+import sys
+import time
+sys.path.append('../')
+
+from infrasim.optimise import *
+from infrasim.matrix import compare_models
+
+import warnings
+warnings.filterwarnings('ignore')
+
+#File paths
+nodes = '../data/nextra/spatial/network/nodes.shp'
+edges = '../data/nextra/spatial/network/edges.shp'
+flows = '../data/nextra/nodal_flows/processed_flows_2030.csv'
+
+# Params
+timesteps = 24
+
+infrasim_init_directories()
+
+scenarios = {'BAS' : False,
+             'BAU' : True,
+             'NCO' : True,
+             'EAG' : True,
+             'COO' : True,
+             'UTO' : True,
+            }
+
+failed = []
+for s in scenarios:
+    runs = {}
+    for engine in ['standard','matrix']:
+        model_run = nextra(nodes,edges,flows,
+                           scenario=s,
+                           energy_objective=scenarios[s],
+                           timesteps=timesteps)
+        start_time = time.time()
+        model_run.build(engine=engine)
+        model_run.model.update()
+        runs[engine] = (model_run,time.time()-start_time)
+
+    report = compare_models(runs['standard'][0].model,runs['matrix'][0].model)
+    print('> ' + s + ': ' + ('equivalent' if report['equivalent'] else 'NOT EQUIVALENT') \
+          + ' (standard: %.2fs, matrix: %.2fs)' % (runs['standard'][1],runs['matrix'][1]))
+    if not report['equivalent']:
+        print(report)
+        failed.append(s)
+
+if failed:
+    sys.exit('> Build parity failed for: ' + ', '.join(failed))
+print('> Done.')